@@ -1,14 +1,136 @@
 import os
 import re
-import csv
-import json
+import logging
 import requests
 from datetime import datetime
-from difflib import get_close_matches
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
+import threading
 import time
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from cache import MISSING, MemoryBackend, ResponseCache, TTLCache, cache_key
+from flight_matrix import DEFAULT_MAX_CELLS, cheapest, flex_dates, top_offers
+from gazetteer import get_gazetteer
+from hotel_rank import HotelRanker, OfferTable
+from token_manager import TokenManager
+from log import get_logger
+from results_store import atomic_write_json
+from ratelimit import RATE_LIMIT_PROFILES, UpstreamLimiter, backoff_delay, endpoint_family, retry_after_seconds
+from singleflight import SingleFlight
+import metrics
+import timing
+
+log = get_logger(__name__)
 
 IATA_RE = re.compile(r"^[A-Z]{3}$")
+TOKEN_PATH = "/v1/security/oauth2/token"
+
+
+def build_session(pool_connections=4, pool_maxsize=32, pool_block=False, max_retries=2, backoff_factor=0.3):
+    """
+    Keep-alive requests.Session for Amadeus calls.
+    - pool_connections: how many per-host pools to keep (test/prod/auth hosts)
+    - pool_maxsize: open connections kept per host; with pool_block=True it is
+      also a hard per-host concurrency limit
+    - max_retries: connection errors and 502/503/504 on idempotent methods
+      are retried with backoff (and Retry-After is respected)
+
+    urllib3's pools are thread-safe and auth headers are passed per request,
+    so one session can be shared by all Flask worker threads.
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=0,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class HotelOffersMerge:
+    """
+    Collects hotel-offer chunks in whatever order they complete and feeds them,
+    in hotel-list (chunk) order, to a HotelRanker. Chunks that finish ahead of
+    their turn wait in `_ready`, so at most the chunks in flight are held besides
+    the ranker's top-K.
+
+    With `early_stop`, `done` turns True once the chunks ranked so far hold
+    `ranker.k` in-budget hotels: the result is then the top-K of the shortest
+    chunk prefix that has enough hotels, the same whichever chunk returned first.
+    Without it every chunk is ranked (true top-K of all fetched hotels).
+    """
+
+    # Reported for the whole offers stage: the worst status of any chunk
+    _STATUS_RANK = {"HIT": 0, "STALE": 1, "MISS": 2}
+
+    def __init__(self, ranker, early_stop=True):
+        self.ranker = ranker
+        self.early_stop = early_stop
+        self._ready = {}             # chunk index -> OfferTable (None for failed chunks)
+        self._next = 0               # next chunk to rank
+        self.ranked_chunks = 0
+        self.statuses = []
+        self.errors = []             # Amadeus error payloads
+        self.exceptions = []
+
+    def add(self, index, payload, status):
+        self.statuses.append(status)
+        if payload.get("errors"):
+            self.errors.append(payload)
+            self._ready[index] = None
+        else:
+            self._ready[index] = OfferTable(payload.get("data") or [])
+        self._advance()
+
+    def add_exception(self, index, exc):
+        self.exceptions.append(exc)
+        self._ready[index] = None
+        self._advance()
+
+    def _advance(self):
+        while self._next in self._ready and not self.done:
+            table = self._ready.pop(self._next)
+            if table is not None:
+                self.ranker.add(self._next, table)
+                self.ranked_chunks += 1
+            self._next += 1
+
+    @property
+    def done(self) -> bool:
+        return self.early_stop and self.ranker.candidates >= self.ranker.k
+
+    @property
+    def failed(self) -> bool:
+        """No chunk came back usable and at least one returned an Amadeus error."""
+        return not self.ranked_chunks and bool(self.errors)
+
+    def raise_if_nothing(self):
+        # Every chunk crashed: surface it like the single call used to
+        if not self.ranked_chunks and not self.errors and self.exceptions:
+            raise self.exceptions[0]
+
+    def ranked(self) -> list:
+        """[(hotel item, cheapest offer), ...] best first."""
+        return self.ranker.top()
+
+    def cache_status(self):
+        return max(self.statuses, key=lambda s: self._STATUS_RANK.get(s, 0), default=None)
 
 
 class AmadeusAPI:
@@ -19,47 +141,182 @@ class AmadeusAPI:
     - Keeps your original: hotels, hotel booking, transfers, transfer booking, city coords, activities, flight booking payload
     """
 
-    def __init__(self, client_id, client_secret, hostname="test", data_dir=None):
+    def __init__(
+        self,
+        client_id,
+        client_secret,
+        hostname="test",
+        data_dir=None,
+        session=None,
+        pool_connections=4,
+        pool_maxsize=32,
+        pool_block=False,
+        max_retries=2,
+        resolution_cache=None,
+        token_refresh_margin=120,
+        flight_cache=None,
+        hotel_list_cache=None,
+        hotel_offers_cache=None,
+        single_flight=True,
+        rate_limits=None,
+        max_throttle_retries=2,
+        hotel_chunk_size=25,
+        hotel_max_ids=100,
+        hotel_offers_concurrency=4,
+        hotel_early_stop=True,
+        flight_matrix_concurrency=4,
+        flight_matrix_max_cells=DEFAULT_MAX_CELLS,
+        search_pool_size=8,
+        nearest_airport_km=150,
+    ):
 
         self._airports_loaded = False
         self._airports = []          # or {} depending on your loader
-        self._airports_path = os.path.join(os.path.dirname(__file__), "data", "airports.csv")
-        self.data_dir = data_dir or os.path.join(os.path.dirname(__file__), "data")
+        self.data_dir = data_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
 
         self.client_id = client_id
         self.client_secret = client_secret
         self.hostname = hostname
 
-        print("client_id loaded:", bool(self.client_id))
-        print("client_secret loaded:", bool(self.client_secret))
-        if self.client_id:
-            print("client_id len:", len(self.client_id))
-        if self.client_secret:
-            print("client_secret len:", len(self.client_secret))
+        # One pooled keep-alive session for every call (token, search, booking)
+        self.session = session or self._build_session(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=max_retries,
+        )
+
+        log.debug(
+            "Amadeus credentials loaded: client id %s (len %d), client secret %s (len %d)",
+            bool(self.client_id), len(self.client_id or ""), bool(self.client_secret), len(self.client_secret or ""),
+        )
+
+        # (normalized query, subtype preference) -> IATA code or None
+        # (an empty TTLCache is falsy, so test for None: the async client shares this one)
+        self.resolution_cache = resolution_cache if resolution_cache is not None else TTLCache(
+            maxsize=2048, ttl=24 * 3600, negative_ttl=600
+        )
+
+        # Canonical flight-offer query -> summarized payload (short TTL, served stale while refreshing)
+        self.flight_cache = flight_cache or ResponseCache(MemoryBackend(maxsize=512), ttl=300, stale_ttl=600, name="flight-offers")
+
+        # Hotels are two-tier: city -> hotelIds barely changes, offers are short-lived
+        self.hotel_list_cache = hotel_list_cache or ResponseCache(
+            MemoryBackend(maxsize=256), ttl=24 * 3600, stale_ttl=7 * 24 * 3600, name="hotel-list"
+        )
+        self.hotel_offers_cache = hotel_offers_cache or ResponseCache(
+            MemoryBackend(maxsize=512), ttl=300, stale_ttl=300, name="hotel-offers"
+        )
+
+        # Token is fetched lazily on first use and refreshed ahead of expiry
+        self._tokens = self._build_token_manager(token_refresh_margin)
+
+        # Identical GETs in flight at the same time share one upstream call
+        self._inflight = SingleFlight() if single_flight else None
+
+        # Client-side rate/concurrency limits: a RATE_LIMIT_PROFILES-style dict,
+        # None for the profile matching `hostname`, False for no throttling
+        if rate_limits is None:
+            rate_limits = RATE_LIMIT_PROFILES["production" if hostname == "production" else "test"]
+        self.rate_limits = rate_limits or None
+        self.limiter = self._make_limiter(rate_limits) if rate_limits else None
+        self.max_throttle_retries = max_throttle_retries
+
+        # Hotel offers: up to `hotel_max_ids` hotels of the city list, requested in
+        # chunks of `hotel_chunk_size` IDs, `hotel_offers_concurrency` chunks at a time.
+        # `hotel_early_stop` stops at the first chunks holding max_results in-budget
+        # hotels; False ranks every chunk (slower, but the best of all hotels fetched)
+        self.hotel_chunk_size = max(1, hotel_chunk_size)
+        self.hotel_max_ids = hotel_max_ids
+        self.hotel_offers_concurrency = max(1, hotel_offers_concurrency)
+        self.hotel_early_stop = hotel_early_stop
+
+        # search_flights_matrix: at most `flight_matrix_max_cells` origin x date
+        # queries per search, `flight_matrix_concurrency` of them at a time
+        self.flight_matrix_concurrency = max(1, flight_matrix_concurrency)
+        self.flight_matrix_max_cells = flight_matrix_max_cells
+
+        # Hotel offer chunks and matrix cells of every search run on one pool of
+        # `search_pool_size` threads, so the per-search caps above add up to a
+        # per-process limit instead of a new pool per search
+        self.search_pool_size = max(1, search_pool_size)
+        self._search_pool = None
+        self._search_pool_lock = threading.Lock()
+
+        # Places without an airport of their own resolve to the nearest one within this distance
+        self.nearest_airport_km = nearest_airport_km
+
+
+
+    def search_pool(self):
+        """The shared pool for hotel offer chunks and matrix cells, started on first use."""
+        if self._search_pool is None:
+            with self._search_pool_lock:
+                if self._search_pool is None:
+                    self._search_pool = ThreadPoolExecutor(
+                        max_workers=self.search_pool_size, thread_name_prefix="amadeus-search"
+                    )
+        return self._search_pool
+
+    def _run_bounded(self, fn, items, limit):
+        """
+        Runs fn(item) on the search pool, at most `limit` of `items` at a time, and
+        yields (index, future) as they complete. Items are submitted as earlier ones
+        complete, so when the caller stops iterating the rest are never started;
+        ones already submitted finish in the background.
+        """
+        pool = self.search_pool()
+        pending = iter(enumerate(items))
+        running = {}
+
+        def submit_next():
+            for i, item in pending:
+                running[timing.submit(pool, fn, item)] = i
+                return
 
-        self.access_token = None
-        self.get_access_token()
+        for _ in range(limit):
+            submit_next()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield running.pop(fut), fut
+                submit_next()
 
+    def _build_session(self, **pool):
+        return build_session(**pool)
 
+    def _build_token_manager(self, refresh_margin):
+        return TokenManager(self._fetch_access_token, refresh_margin=refresh_margin)
 
     # =========================================================
     # AUTH
     # =========================================================
-    def get_access_token(self):
-        base = "https://test.api.amadeus.com" if self.hostname == "test" else "https://api.amadeus.com"
-        url = f"{base}/v1/security/oauth2/token"
+    @property
+    def access_token(self):
+        return self._tokens.get()
 
-        data = {"grant_type": "client_credentials"}
+    def get_access_token(self):
+        """Forces a token refresh and returns the new token."""
+        return self._tokens.refresh()
 
+    def _fetch_access_token(self):
         # Basic Auth carries the client_id/client_secret
-        response = requests.post(
-            url,
-            data=data,
-            auth=HTTPBasicAuth(self.client_id, self.client_secret),
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-            timeout=20,
-        )
+        with metrics.upstream("amadeus", TOKEN_PATH) as call:
+            response = self.session.post(
+                self._token_url(),
+                data={"grant_type": "client_credentials"},
+                auth=HTTPBasicAuth(self.client_id, self.client_secret),
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                timeout=20,
+            )
+            call.status = response.status_code
+        return self._token_from_response(response)
+
+    def _token_url(self):
+        return f"{self._base_url()}{TOKEN_PATH}"
 
+    def _token_from_response(self, response):
+        """(access_token, expires_in) from the token endpoint's response; raises on failure."""
         # Helpful debug if it fails again
         try:
             token_json = response.json()
@@ -69,13 +326,13 @@ class AmadeusAPI:
         if response.status_code != 200 or "access_token" not in token_json:
             raise Exception(f"Failed to get access token: {token_json}")
 
-        self.access_token = token_json["access_token"]
-        print("🪪 AMADEUS ACCESS TOKEN:", self.access_token, flush=True)
+        log.info("🪪 Amadeus access token refreshed (expires_in=%s)", token_json.get("expires_in"))
+        return token_json["access_token"], token_json.get("expires_in")
 
 
-    def _headers(self, json_content=False):
+    def _headers(self, json_content=False, token=None):
         h = {
-            "Authorization": f"Bearer {self.access_token}",
+            "Authorization": f"Bearer {token or self.access_token}",
             "Accept": "application/json",
         }
         if json_content:
@@ -83,44 +340,97 @@ class AmadeusAPI:
         return h
 
     def _base_url(self):
+        # "test" / "production", or a base URL such as a local stand-in server (http://127.0.0.1:9000)
+        if (self.hostname or "").startswith(("http://", "https://")):
+            return self.hostname.rstrip("/")
         return "https://test.api.amadeus.com" if self.hostname == "test" else "https://api.amadeus.com"
     
     def _request(self, method, path, *, params=None, json_body=None, timeout=20):
-
-        print(f"AMADEUS REQ {method} {path} PARAMS:", params, flush=True)
-
-        
-
         """
         Makes an Amadeus request. If token is expired (401), refresh token and retry once.
+        Concurrent identical GETs are coalesced into one upstream call whose
+        response is shared (callers only read it).
         """
+        key = self._inflight_key(method, path, params, json_body)
+        if key is None:
+            return self._send(method, path, params, json_body, timeout)
+
+        resp, shared = self._inflight.do(key, lambda: self._send(method, path, params, json_body, timeout))
+        if shared:
+            metrics.UPSTREAM_COALESCED.inc(service="amadeus", endpoint=path)
+        return resp
+
+    def _inflight_key(self, method, path, params, json_body):
+        """Single-flight key for idempotent requests (GET, no body); None when the call must not be shared."""
+        if self._inflight is None or method != "GET" or json_body is not None:
+            return None
+        return cache_key(f"{method} {path}", params or {})
+
+    def _send(self, method, path, params, json_body, timeout):
+        log.debug("AMADEUS REQ %s %s params=%s", method, path, params)
         url = f"{self._base_url()}{path}"
+        family = endpoint_family(path)
+
+        def do_request(token):
+            # Inside a deadline (see timing.deadline) the call gets only the time left
+            timing.time_left(timeout)
+            with self._throttle(family), metrics.upstream("amadeus", path) as call:
+                resp = self.session.request(
+                    method,
+                    url,
+                    headers=self._headers(json_content=(json_body is not None), token=token),
+                    params=params,
+                    json=json_body,
+                    timeout=timing.time_left(timeout),
+                )
+                call.status = resp.status_code
+            self._observe_status(resp.status_code)
+            return resp
+
+        for attempt in range(self.max_throttle_retries + 1):
+            token = self._tokens.get()
+            resp = do_request(token)
+
+            # If token expired/invalid, refresh and retry once.
+            # Threads that got a 401 with the same token share a single refresh.
+            if resp.status_code == 401:
+                metrics.UPSTREAM_RETRIES.inc(service="amadeus", reason="401")
+                token = self._tokens.invalidate(token)
+                resp = do_request(token)
+
+            delay = self._throttle_retry_delay(resp, path, attempt)
+            if delay is None:
+                break
+            time.sleep(timing.time_left(delay))
 
-        def do_request():
-            return requests.request(
-                method,
-                url,
-                headers=self._headers(json_content=(json_body is not None)),
-                params=params,
-                json=json_body,
-                timeout=timeout,
-            )
+        log.debug("AMADEUS %s %s -> %s", method, url, resp.status_code)
+        return resp
 
-        resp = do_request()
+    # -----------------------------
+    # Throttling (see ratelimit.py)
+    # -----------------------------
+    limiter_class = UpstreamLimiter
 
-        # If token expired/invalid, refresh and retry once
-        if resp.status_code == 401:
-            try:
-                payload = resp.json()
-            except Exception:
-                payload = {}
+    def _make_limiter(self, rate_limits):
+        return self.limiter_class.from_profile("amadeus", rate_limits)
 
-            # Check for token-expired style errors, but even plain 401 we can refresh
-            self.get_access_token()
-            resp = do_request()
+    def _throttle(self, family):
+        return self.limiter.slot(family) if self.limiter is not None else nullcontext()
 
-        print("AMADEUS FINAL URL:", url)
-        return resp
+    def _observe_status(self, status):
+        if self.limiter is not None:
+            self.limiter.observe(status)
+
+    def _throttle_retry_delay(self, resp, path, attempt):
+        """Seconds to wait before retrying a 429 (Retry-After, else jittered backoff); None when done."""
+        if resp.status_code != 429 or attempt >= self.max_throttle_retries:
+            return None
+        metrics.UPSTREAM_RETRIES.inc(service="amadeus", reason="429")
+        delay = retry_after_seconds(resp)
+        if delay is None:
+            delay = backoff_delay(attempt)
+        log.warning("⏳ Amadeus 429 on %s; retry %d in %.2fs", path, attempt + 1, delay)
+        return delay
 
 
     # =========================================================
@@ -130,59 +440,107 @@ class AmadeusAPI:
         if getattr(self, "_airports_loaded", False):
             return
 
-
+        # Shared, pre-indexed copy of airports.dat (built once per process).
+        # If you don't have airports.dat, we can still resolve via Amadeus API
         path = os.path.join(self.data_dir, "airports.dat")
-        if not os.path.exists(path):
-            # If you don't have airports.dat, we can still resolve via Amadeus API
-            self._airports_loaded = True
-            return
-
-        with open(path, newline="", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if len(row) < 5:
-                    continue
-                name, city, country, iata = row[1], row[2], row[3], row[4]
-                if iata and iata != r"\N" and len(iata) == 3:
-                    self._airports.append(
-                        {
-                            "name": name.strip(),
-                            "city": city.strip(),
-                            "country": country.strip(),
-                            "iata": iata.strip().upper(),
-                        }
-                    )
-
+        self._gazetteer = get_gazetteer(path)
+        self._airports = self._gazetteer.airports
         self._airports_loaded = True
 
     def _resolve_iata_local(self, query: str):
         self._load_airports()
-        q = (query or "").strip().lower()
-        if not q:
+        if not (query or "").strip():
             return None
 
-        # Exact city match
-        for a in self._airports:
-            if a["city"].lower() == q:
-                return a["iata"]
+        # Exact city match, nearest airport to a known place, then fuzzy city match
+        return self._gazetteer.resolve_place(query, cutoff=0.8, max_km=self.nearest_airport_km)
 
-        # Fuzzy city match
-        cities = list({a["city"] for a in self._airports})
-        close = get_close_matches(query, cities, n=1, cutoff=0.8)
-        if close:
-            best_city = close[0].lower()
-            for a in self._airports:
-                if a["city"].lower() == best_city:
-                    return a["iata"]
+    def _nearest_airport(self, lat, lon):
+        self._load_airports()
+        nearest = self._gazetteer.nearest_airports(lat, lon, n=1, max_km=self.nearest_airport_km)
+        return nearest[0]["iata"] if nearest else None
 
+    def airports_near(self, query: str, radius_km=100, limit=10):
+        """
+        Airports within radius_km of a place ("lat,lon", IATA code or name), closest
+        first, from airports.dat. Names unknown locally go through resolve_iata.
+        """
+        self._load_airports()
+        point = self._gazetteer.coordinates(query)
+        if point is None:
+            code = self.resolve_iata(query)
+            point = self._gazetteer.coordinates(code) if code else None
+        if point is None:
+            return []
+        return self._gazetteer.airports_within(point[0], point[1], radius_km, limit=limit)
+
+    def _locations_lookup(self, query: str, sub_type: str):
+        """
+        GET /v1/reference-data/locations.
+        Returns (data, ok) where ok means Amadeus actually answered (< 400).
+        """
+        params = self._locations_params(query, sub_type)
+        resp = self._request("GET", "/v1/reference-data/locations", params=params)
+        return self._locations_payload(resp)
+
+    def _locations_params(self, query: str, sub_type: str):
+        return {
+            "keyword": query,
+            "subType": sub_type,
+            "page[limit]": 10,
+        }
+
+    def _locations_payload(self, resp):
+        if resp.status_code >= 400:
+            return [], False
+        return (resp.json() or {}).get("data", []) or [], True
+
+    def _pick_location(self, data, sub_types):
+        for sub_type in sub_types:
+            for x in data:
+                if x.get("subType") == sub_type and x.get("iataCode"):
+                    return x["iataCode"]
+
+        # Amadeus knows the place but it has no code of its own: nearest airport to it
+        for x in data:
+            geo = x.get("geoCode") or {}
+            if geo.get("latitude") is not None and geo.get("longitude") is not None:
+                return self._nearest_airport(geo["latitude"], geo["longitude"])
         return None
 
+    def _cached_resolution(self, query: str, preference: str, resolve):
+        """
+        Memoizes a resolver keyed by (normalized query, subtype preference).
+        `resolve` returns (code, authoritative). Misses are only cached
+        (negatively) when Amadeus actually answered; answers from the local
+        fallback after an API failure are cached for the short negative TTL.
+        """
+        key = self._resolution_key(query, preference)
+        cached = self.resolution_cache.get(key)
+        if cached is not MISSING:
+            return cached
+
+        with timing.stage("resolve"):
+            code, authoritative = resolve()
+        return self._remember_resolution(key, code, authoritative)
+
+    def _resolution_key(self, query: str, preference: str):
+        return (" ".join(query.strip().lower().split()), preference)
+
+    def _remember_resolution(self, key, code, authoritative):
+        if authoritative:
+            self.resolution_cache.set(key, code)
+        elif code:
+            self.resolution_cache.set(key, code, ttl=self.resolution_cache.negative_ttl)
+        return code
+
     def resolve_iata(self, query: str):
         """
         Returns IATA code for a city/airport input:
         - If already a 3-letter IATA, returns it
         - Else tries Amadeus Locations API
         - Else falls back to local airports.dat
+        Results are cached (see resolution_cache).
         """
         if not query:
             return None
@@ -191,29 +549,23 @@ class AmadeusAPI:
         if IATA_RE.match(q):
             return q
 
+        return self._cached_resolution(query, "CITY>AIRPORT", lambda: self._resolve_iata_uncached(query))
+
+    def _resolve_iata_uncached(self, query: str):
         # 1) Try Amadeus Locations API
+        ok = False
         try:
-            url = f"{self._base_url()}/v1/reference-data/locations"
-            params = {
-                "keyword": query,
-                "subType": "CITY,AIRPORT",
-                "page[limit]": 10,
-            }
-            resp = self._request("GET", "/v1/reference-data/locations", params=params)
-            data = (resp.json() or {}).get("data", []) if resp.status_code < 400 else []
+            data, ok = self._locations_lookup(query, "CITY,AIRPORT")
 
             # Prefer CITY then AIRPORT
-            for x in data:
-                if x.get("subType") == "CITY" and x.get("iataCode"):
-                    return x["iataCode"]
-            for x in data:
-                if x.get("subType") == "AIRPORT" and x.get("iataCode"):
-                    return x["iataCode"]
+            code = self._pick_location(data, ("CITY", "AIRPORT"))
+            if code:
+                return code, True
         except Exception:
             pass
 
         # 2) Fallback to local dataset
-        return self._resolve_iata_local(query)
+        return self._resolve_iata_local(query), ok
 
     # =========================================================
     # NEW METHODS — Clean flight summaries
@@ -280,8 +632,7 @@ class AmadeusAPI:
         }
 
     def save_json(self, payload: dict, path: str):
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, indent=2)
+        atomic_write_json(path, payload, indent=2)
 
     def search_flights_clean(
         self,
@@ -310,6 +661,185 @@ class AmadeusAPI:
         if not dest_code:
             return {"error": f"Could not resolve destination '{destination}'"}
 
+        params = self._flight_search_params(
+            origin_code, dest_code, depart_date, return_date, adults, budget, currency, max_results, non_stop
+        )
+
+        payload, age, status = self._cached_flight_offers(params, origin_code, dest_code, depart_date, return_date)
+        return self._flight_result(payload, age, status, results_path)
+
+    def _cached_flight_offers(self, params, origin_code, dest_code, depart_date, return_date):
+        """(payload, age, cache status); served from the offer cache when the same canonical query was seen recently."""
+        return self.flight_cache.get_or_fetch(
+            cache_key("flight-offers", params),
+            lambda: self._fetch_flight_offers(params, origin_code, dest_code, depart_date, return_date),
+            cacheable=lambda v: not v.get("error"),
+        )
+
+    # =========================================================
+    # Flight matrix — several origins x flexible dates
+    # =========================================================
+    def search_flights_matrix(
+        self,
+        origins,
+        destination,
+        depart_date,
+        return_date=None,
+        flex_days=0,
+        adults=1,
+        budget=None,
+        currency="USD",
+        max_results=5,
+        top_k=10,
+        non_stop=None,
+        origin_radius_km=None,
+    ):
+        """
+        "Cheapest within ±flex_days from BOS or PVD": one flight-offers query per
+        origin x departure date (round trips keep their length), each through the
+        offer cache and the rate limiter, flight_matrix_concurrency at a time on
+        the shared search pool.
+        Returns a cheapest-price grid ({origin: {depart_date: price}}) plus the
+        top_k cheapest offers overall. With origin_radius_km, airports within that
+        distance of the origins are searched too (nearest first, as many as fit).
+        """
+        dest_code = self.resolve_iata(destination)
+        origin_codes = [(o, self.resolve_iata(o)) for o in origins]
+        plan = self._flight_matrix_plan(
+            origin_codes, destination, dest_code, depart_date, return_date, flex_days,
+            adults, budget, currency, max_results, non_stop, origin_radius_km,
+        )
+        if plan.get("error"):
+            return plan
+
+        def run(cell):
+            try:
+                payload, _, status = self._cached_flight_offers(
+                    cell["params"], cell["origin"], dest_code, cell["depart_date"], cell["return_date"]
+                )
+                return payload, status
+            except Exception as e:
+                return {"error": f"Flight search crashed: {e}"}, None
+
+        cells = plan["cells"]
+        results = [None] * len(cells)
+        for i, fut in self._run_bounded(run, cells, self.flight_matrix_concurrency):
+            results[i] = fut.result()
+        return self._flight_matrix_result(plan, results, top_k)
+
+    def _flight_matrix_plan(
+        self, origin_codes, destination, dest_code, depart_date, return_date, flex_days,
+        adults, budget, currency, max_results, non_stop, origin_radius_km=None,
+    ):
+        """The cells (one flight-offers query each) of a matrix search, or {"error": ...}."""
+        if not dest_code:
+            return {"error": f"Could not resolve destination '{destination}'"}
+        unresolved = [o for o, code in origin_codes if not code]
+        if unresolved:
+            return {"error": f"Could not resolve origin '{unresolved[0]}'"}
+        codes = list(dict.fromkeys(code for _, code in origin_codes))
+
+        try:
+            dates = flex_dates(depart_date, return_date, flex_days)
+        except ValueError as e:
+            return {"error": str(e)}
+        if not dates:
+            return {"error": "No departure dates left in the window (all in the past)"}
+
+        nearby = []
+        if origin_radius_km:
+            nearby = self._nearby_origins(codes, origin_radius_km, self.flight_matrix_max_cells // len(dates))
+            codes += [a["iata"] for a in nearby]
+        if len(codes) * len(dates) > self.flight_matrix_max_cells:
+            return {
+                "error": f"Search too large: {len(codes)} origins x {len(dates)} dates "
+                         f"(at most {self.flight_matrix_max_cells} combinations)"
+            }
+
+        cells = [
+            {
+                "origin": code,
+                "depart_date": d,
+                "return_date": r,
+                "params": self._flight_search_params(
+                    code, dest_code, d, r, adults, budget, currency, max_results, non_stop
+                ),
+            }
+            for code in codes
+            for d, r in dates
+        ]
+        query = {
+            # Same leading keys as a single search, so results files get a readable name
+            "originLocationCode": "-".join(codes),
+            "destinationLocationCode": dest_code,
+            "departureDate": depart_date,
+            "returnDate": return_date,
+            "flexDays": flex_days,
+            "originRadiusKm": origin_radius_km,
+            "adults": adults,
+            "max": max_results,
+            "maxPrice": cells[0]["params"].get("maxPrice"),
+            "currencyCode": currency,
+        }
+        query = {k: v for k, v in query.items() if v is not None}
+        return {"query": query, "origins": codes, "nearby": nearby, "destination": dest_code, "cells": cells}
+
+    def _nearby_origins(self, codes, radius_km, max_origins):
+        """Airports within radius_km of any of `codes` (not already in it), nearest first, up to max_origins in all."""
+        self._load_airports()
+        found = []
+        for code in codes:
+            point = self._gazetteer.coordinates(code)
+            if point is not None:
+                found.extend(self._gazetteer.airports_within(point[0], point[1], radius_km))
+
+        nearby, seen = [], set(codes)
+        for airport in sorted(found, key=lambda a: a["distance_km"]):
+            if len(codes) + len(nearby) >= max_origins:
+                break
+            if airport["iata"] not in seen:
+                seen.add(airport["iata"])
+                nearby.append({k: airport[k] for k in ("iata", "name", "city", "distance_km")})
+        return nearby
+
+    def _flight_matrix_result(self, plan, results, top_k):
+        grid = {code: {} for code in plan["origins"]}
+        cells, priced = [], []
+        errors = []
+        for cell, (payload, status) in zip(plan["cells"], results):
+            out = {"origin": cell["origin"], "depart_date": cell["depart_date"], "return_date": cell["return_date"]}
+            if payload.get("error"):
+                errors.append(payload)
+                out["error"] = payload.get("error")
+                price = None
+            else:
+                offers = payload.get("offers") or []
+                price, _ = cheapest(offers)
+                out.update({"cheapest": price, "offers": len(offers), "cache": status})
+                priced.append((out, offers))
+            grid[cell["origin"]][cell["depart_date"]] = price
+            cells.append(out)
+
+        if not priced:
+            return {"error": "Amadeus request failed", "details": errors[0].get("details") or errors[0]}
+
+        best = min((c for c in cells if c.get("cheapest") is not None), key=lambda c: c["cheapest"], default=None)
+        return {
+            "query": plan["query"],
+            "origins": plan["origins"],
+            "nearby_origins": plan["nearby"],
+            "destination": plan["destination"],
+            "dates": sorted({c["depart_date"] for c in plan["cells"]}),
+            "grid": grid,
+            "cheapest": best,
+            "offers": top_offers(priced, top_k),
+            "cells": cells,
+            "saved_at": datetime.now().isoformat(),
+        }
+
+    def _flight_search_params(
+        self, origin_code, dest_code, depart_date, return_date, adults, budget, currency, max_results, non_stop
+    ):
         params = {
             "originLocationCode": origin_code,
             "destinationLocationCode": dest_code,
@@ -334,57 +864,88 @@ class AmadeusAPI:
         if non_stop is not None:
             params["nonStop"] = "true" if bool(non_stop) else "false"
 
-        def _do_call(p):
-            print("✈️ FLIGHT PARAMS SENT:", sorted(list(p)), flush=True)
-            assert "originLocationCode" in p and "destinationLocationCode" in p, f"Bad keys: {list(p)}"
+        return params
 
-            resp = self._request("GET", "/v2/shopping/flight-offers", params=p)
+    def _flight_result(self, payload, age, status, results_path=None):
+        if payload.get("error"):
+            return payload
 
-            try:
-                payload = resp.json()
-            except Exception:
-                payload = {"raw": getattr(resp, "text", ""), "status_code": resp.status_code}
+        # Copy so the cached entry itself is never mutated; cache age sits next to saved_at
+        result_payload = dict(payload)
+        result_payload["cache"] = status
+        result_payload["cache_age_s"] = round(age, 1)
 
-            # (3) full error logging
-            if resp.status_code >= 400:
-                print("❌ AMADEUS FLIGHT ERROR STATUS:", resp.status_code, flush=True)
-                print("❌ AMADEUS FLIGHT ERROR PAYLOAD:", payload, flush=True)
+        if results_path:
+            self.save_json(result_payload, results_path)
+
+        return result_payload
 
-            return resp, payload
+    def _fetch_flight_offers(self, params, origin_code, dest_code, depart_date, return_date):
+        """
+        Calls /v2/shopping/flight-offers (with retry-on-141) and returns the
+        summarized payload, or {"error": ...}.
+        """
+        def _do_call(p):
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("✈️ FLIGHT PARAMS SENT: %s", sorted(p))
+            assert "originLocationCode" in p and "destinationLocationCode" in p, f"Bad keys: {list(p)}"
+
+            resp = self._request("GET", "/v2/shopping/flight-offers", params=p)
+            return resp, self._flight_response_payload(resp)
 
         # First attempt
         resp, payload = _do_call(dict(params))
 
         # (4) retry-on-141 with (2) narrowing
-        if resp.status_code >= 400:
-            # detect Amadeus error code 141 if present
-            code = None
-            try:
-                errs = (payload or {}).get("errors") or []
-                if errs and isinstance(errs[0], dict):
-                    code = errs[0].get("code")
-            except Exception:
-                code = None
+        if resp.status_code >= 400 and self._amadeus_error_code(payload) == "141":
+            log.warning("🔁 Amadeus returned code 141. Retrying once with narrowing filters...")
+            metrics.UPSTREAM_RETRIES.inc(service="amadeus", reason="141")
 
-            if str(code) == "141":
-                print("🔁 Amadeus returned code 141. Retrying once with narrowing filters...", flush=True)
+            narrowed = self._narrow_flight_params(params)
 
-                narrowed = dict(params)
+            time.sleep(backoff_delay(1))  # jittered, up to 0.5s
+            resp, payload = _do_call(narrowed)
 
-                # (2) Narrow the search to reduce timeouts / generic queries
-                # Force nonstop for retry (you can remove if you don't want this)
-                narrowed["nonStop"] = "true"
+            # Use narrowed params if it succeeded
+            if resp.status_code < 400:
+                params = narrowed
 
-                # Optional extra narrowing (uncomment if needed):
-                # narrowed["travelClass"] = "ECONOMY"
+        return self._flight_offers_payload(resp, payload, params, origin_code, dest_code, depart_date, return_date)
 
-                time.sleep(0.5)  # small backoff
-                resp, payload = _do_call(narrowed)
+    def _flight_response_payload(self, resp):
+        try:
+            payload = resp.json()
+        except Exception:
+            payload = {"raw": getattr(resp, "text", ""), "status_code": resp.status_code}
 
-                # Use narrowed params if it succeeded
-                if resp.status_code < 400:
-                    params = narrowed
+        # (3) full error logging
+        if resp.status_code >= 400:
+            log.error("❌ AMADEUS FLIGHT ERROR %s: %s", resp.status_code, payload)
+
+        return payload
 
+    def _amadeus_error_code(self, payload):
+        """Code of the first Amadeus error (e.g. "141" SYSTEM ERROR), as a string, or None."""
+        try:
+            errs = (payload or {}).get("errors") or []
+            if errs and isinstance(errs[0], dict) and errs[0].get("code") is not None:
+                return str(errs[0].get("code"))
+        except Exception:
+            pass
+        return None
+
+    def _narrow_flight_params(self, params):
+        narrowed = dict(params)
+
+        # (2) Narrow the search to reduce timeouts / generic queries
+        # Force nonstop for retry (you can remove if you don't want this)
+        narrowed["nonStop"] = "true"
+
+        # Optional extra narrowing (uncomment if needed):
+        # narrowed["travelClass"] = "ECONOMY"
+        return narrowed
+
+    def _flight_offers_payload(self, resp, payload, params, origin_code, dest_code, depart_date, return_date):
         if resp.status_code >= 400:
             return {"error": "Amadeus request failed", "details": payload}
 
@@ -393,7 +954,7 @@ class AmadeusAPI:
 
         summarized = [self._summarize_offer(o, dictionaries) for o in data]
 
-        result_payload = {
+        return {
             "query": params,
             "origin": origin_code,
             "destination": dest_code,
@@ -403,11 +964,6 @@ class AmadeusAPI:
             "saved_at": datetime.now().isoformat(),
         }
 
-        if results_path:
-            self.save_json(result_payload, results_path)
-
-        return result_payload
-
 
     # =========================================================
     # ORIGINAL METHODS (kept) — Flights booking
@@ -427,32 +983,26 @@ class AmadeusAPI:
         if re.match(r"^[A-Z]{3}$", q):
             return q
 
+        return self._cached_resolution(
+            query, "AIRPORT>CITY", lambda: self._resolve_iata_airport_first_uncached(query)
+        )
+
+    def _resolve_iata_airport_first_uncached(self, query: str):
         # 1) Try Amadeus Locations API
+        ok = False
         try:
-            params = {
-                "keyword": query,
-                "subType": "AIRPORT,CITY",
-                "page[limit]": 10,
-            }
-
-            resp = self._request("GET", "/v1/reference-data/locations", params=params)
-            data = (resp.json() or {}).get("data", [])
-
-            # Prefer AIRPORT codes first (critical for flights)
-            for x in data:
-                if x.get("subType") == "AIRPORT" and x.get("iataCode"):
-                    return x["iataCode"]
+            data, ok = self._locations_lookup(query, "AIRPORT,CITY")
 
-            # Then fall back to CITY
-            for x in data:
-                if x.get("subType") == "CITY" and x.get("iataCode"):
-                    return x["iataCode"]
+            # Prefer AIRPORT codes first (critical for flights), then fall back to CITY
+            code = self._pick_location(data, ("AIRPORT", "CITY"))
+            if code:
+                return code, True
 
         except Exception:
             pass
 
         # 2) Final fallback: local airports.dat
-        return self._resolve_iata_local(query)
+        return self._resolve_iata_local(query), ok
 
     def find_best_flights(self, origin, destination, departure_date, adults, currency="USD", non_stop=True):
         """
@@ -467,7 +1017,7 @@ class AmadeusAPI:
             "nonStop": non_stop,
             "currencyCode": currency,
         }
-        response = requests.get(url, headers=self._headers(), params=params)
+        response = self.session.get(url, headers=self._headers(), params=params)
         return response.json()
 
     def confirm_flight_details(self, flight_offer):
@@ -478,7 +1028,7 @@ class AmadeusAPI:
                 "flightOffers": [flight_offer],
             }
         }
-        response = requests.post(pricing_url, headers=self._headers(json_content=True), json=body)
+        response = self.session.post(pricing_url, headers=self._headers(json_content=True), json=body)
         return response.json()
 
     # FIXED: added self
@@ -549,72 +1099,22 @@ class AmadeusAPI:
             phone_number,
             documents=documents,  # FIXED: actually pass documents through
         )
-        response = requests.post(booking_url, headers=self._headers(json_content=True), json=body)
+        response = self.session.post(booking_url, headers=self._headers(json_content=True), json=body)
         return response.json()
 
-    # =========================================================
-    # ORIGINAL METHODS (kept) — Hotels
-    # =========================================================
-    
-    def search_hotels(self, city_code):
-        print("right serch 2")
-        resp = self._request(
-            "GET",
-            "/v1/reference-data/locations/hotels/by-city",
-            params={"cityCode": city_code, "radius": 20, "radiusUnit": "KM"},
-            timeout=25,
-        )
-        return resp.json()
-
-
-
     # gets the IATA city code for a given city name
 
     def get_city_code(self, city_name):
-        # Get the path to airports.dat (it's in ../data/ relative to apis/)
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        airports_file = os.path.join(current_dir, '..', 'data', 'airports.dat')
-        
-        # Normalize city name for comparison (case-insensitive, strip whitespace)
-        city_name_lower = city_name.strip().lower()
-        
-        try:
-            with open(airports_file, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    if len(row) >= 5:
-                        # Field 2 is the city name, Field 4 is the IATA code
-                        airport_city = row[2].strip().lower()
-                        iata_code = row[4].strip()
-                        
-                        # Check for exact match or if city name contains the search term
-                        if airport_city == city_name_lower or city_name_lower in airport_city:
-                            # Skip if IATA code is \N (not available)
-                            if iata_code and iata_code != '\\N':
-                                return iata_code
-            
-            # If no match found, return None or raise an exception
-            return None
-        except FileNotFoundError:
-            raise FileNotFoundError(f"Could not find airports.dat at {airports_file}")
-        except Exception as e:
-            raise Exception(f"Error reading airports.dat: {str(e)}")
-
-
-    def filter_hotels(self, hotel_ids, check_in_date, check_out_date, adults, room_quantity, price_range=None, currency="USD"):
-        print("filter hotels called 2")
-        params = {
-            "hotelIds": ",".join(hotel_ids),
-            "checkInDate": check_in_date,
-            "checkOutDate": check_out_date,
-            "adults": adults,
-            "roomQuantity": room_quantity,
-            "currency": currency,
-        }
-        resp = self._request("GET", "/v3/shopping/hotel-offers", params=params, timeout=35)
-        return resp.json()
-
+        # airports.dat lives in ../data/ relative to apis/
+        self._load_airports()
+        if not os.path.exists(self._gazetteer.path):
+            raise FileNotFoundError(f"Could not find airports.dat at {self._gazetteer.path}")
 
+        # Exact match, or the first city whose name contains the search term
+        city_key = self._gazetteer.city_containing(city_name)
+        if city_key:
+            return self._gazetteer.by_city[city_key][0]["iata"]
+        return None
 
 
     # FIXED: added self
@@ -681,7 +1181,7 @@ class AmadeusAPI:
             card_number,
             card_expiry_date,
         )
-        response = requests.post(booking_url, headers=self._headers(json_content=True), json=body)
+        response = self.session.post(booking_url, headers=self._headers(json_content=True), json=body)
         return response.json()
      # =========================================================
     # ORIGINAL METHODS (kept) — Hotels
@@ -691,7 +1191,7 @@ class AmadeusAPI:
         #print("right one serch")
         hotels_url = f"{self._base_url()}/v3/shopping/hotels/by-city"
         params = {"cityCode": city_code}
-        response = requests.get(hotels_url, headers=self._headers(), params=params, timeout=20)
+        response = self.session.get(hotels_url, headers=self._headers(), params=params, timeout=20)
         return response.json()
 
     def filter_hotels(self, hotel_ids, check_in_date, check_out_date, adults, room_quantity, price_range):
@@ -705,7 +1205,7 @@ class AmadeusAPI:
             "roomQuantity": room_quantity,
             "priceRange": price_range,
         }
-        response = requests.get(hotel_info_url, headers=self._headers(), params=params, timeout=20)
+        response = self.session.get(hotel_info_url, headers=self._headers(), params=params, timeout=20)
         return response.json()
     
 
@@ -773,7 +1273,7 @@ class AmadeusAPI:
             card_number,
             card_expiry_date,
         )
-        response = requests.post(booking_url, headers=self._headers(json_content=True), json=body, timeout=20)
+        response = self.session.post(booking_url, headers=self._headers(json_content=True), json=body, timeout=20)
         return response.json()
     
         # =========================================================
@@ -805,58 +1305,35 @@ class AmadeusAPI:
     room_quantity=1,
     budget=None,          # overall trip budget max (ex: 4000)
     currency="USD",
-    max_results=8
+    max_results=8,
+    rank_by="price",      # "price" | "rating" | "value" (price per star)
     ):
-        print("✅ search_hotels_clean CALLED", destination, check_in, check_out)
+        log.debug("✅ search_hotels_clean CALLED %s %s %s", destination, check_in, check_out)
+        # Ranks by price, rating or value; raises ValueError for anything else
+        ranker = HotelRanker(max_results, rank_by=rank_by, budget=self._hotel_budget_total(budget))
 
         # Convert destination -> city code (PAR for Paris)
         city_code = self.resolve_iata(destination.split(",")[0].strip())
-        print("✅ resolved city_code:", city_code)
+        log.debug("✅ resolved city_code: %s", city_code)
 
         if not city_code:
             return {"error": f"Could not resolve destination '{destination}'"}
 
-        # Optional: reserve ~40% of trip budget for hotels (total stay)
-        hotel_budget_total = None
-        if budget:
-            try:
-                hotel_budget_total = float(budget) * 0.4
-            except Exception:
-                hotel_budget_total = None
-
         # ---------------------------------------------------------
         # 1) HOTEL LIST (MUST BE v1) -> get hotelIds
+        #    Nearly static per city, so it sits in a long-lived cache
         # ---------------------------------------------------------
         list_params = {"cityCode": city_code, "radius": 20, "radiusUnit": "KM"}
-        print("✅ HOTEL LIST PARAMS SENT:", list_params)
-
-        list_resp = self._request(
-            "GET",
-            "/v1/reference-data/locations/hotels/by-city",
-            params=list_params,
-            timeout=25,
+        hotel_list_payload, _, list_cache = self.hotel_list_cache.get_or_fetch(
+            cache_key("hotels-by-city", list_params),
+            lambda: self._fetch_hotel_ids(list_params),
+            cacheable=lambda v: not v.get("errors"),
         )
-        hotel_list_payload = list_resp.json() if list_resp is not None else {}
-
-        print("✅ HOTEL LIST status:", getattr(list_resp, "status_code", None))
-        print("✅ HOTEL LIST keys:", list(hotel_list_payload.keys()))
-        print("✅ HOTEL LIST errors:", hotel_list_payload.get("errors"))
 
         if hotel_list_payload.get("errors"):
             return {"error": "Amadeus request failed", "details": hotel_list_payload}
 
-        hotel_list = hotel_list_payload.get("data") or []
-        if not hotel_list:
-            return {
-                "destination": destination,
-                "city_code": city_code,
-                "check_in": check_in,
-                "check_out": check_out,
-                "hotels": [],
-            }
-
-        hotel_ids = [h.get("hotelId") for h in hotel_list if h.get("hotelId")]
-        hotel_ids = hotel_ids[:25]  # keep request reasonable
+        hotel_ids = (hotel_list_payload.get("hotelIds") or [])[: self.hotel_max_ids]
 
         if not hotel_ids:
             return {
@@ -869,16 +1346,137 @@ class AmadeusAPI:
 
         # ---------------------------------------------------------
         # 2) HOTEL OFFERS (MUST BE v3) -> requires hotelIds
+        #    Chunks of IDs fetched concurrently; each chunk has its own
+        #    short-TTL cache entry since prices move
+        # 3) Budget filter + top-K ranking as chunks arrive (see hotel_rank.py)
         # ---------------------------------------------------------
-        offers_params = {
-            "hotelIds": ",".join(hotel_ids),
-            "checkInDate": check_in,
-            "checkOutDate": check_out,
-            "adults": adults,
-            "roomQuantity": room_quantity,
-            "currency": currency,
+        chunks = self._hotel_offer_chunks(hotel_ids, check_in, check_out, adults, room_quantity, currency)
+        merge = HotelOffersMerge(ranker, early_stop=self.hotel_early_stop)
+        self._fetch_hotel_offer_chunks(chunks, merge)
+
+        if merge.failed:
+            return {"error": "Amadeus request failed", "details": merge.errors[0]}
+
+        return self._hotel_results(destination, city_code, check_in, check_out, merge, list_cache)
+
+    def _hotel_results(self, destination, city_code, check_in, check_out, merge, list_cache):
+        return {
+            "destination": destination,
+            "city_code": city_code,
+            "check_in": check_in,
+            "check_out": check_out,
+            "hotels": [self._hotel_summary(item, offer, check_in, check_out) for item, offer in merge.ranked()],
+            "ranked_by": merge.ranker.rank_by,
+            "cache": {"hotel_list": list_cache, "offers": merge.cache_status()},
         }
-        print("✅ HOTEL OFFERS PARAMS SENT:", offers_params)
+
+    def _hotel_offer_chunks(self, hotel_ids, check_in, check_out, adults, room_quantity, currency):
+        """/v3/shopping/hotel-offers params for each chunk of `hotel_chunk_size` IDs, in hotel-list order."""
+        size = self.hotel_chunk_size
+        return [
+            {
+                "hotelIds": ",".join(hotel_ids[i:i + size]),
+                "checkInDate": check_in,
+                "checkOutDate": check_out,
+                "adults": adults,
+                "roomQuantity": room_quantity,
+                "currency": currency,
+            }
+            for i in range(0, len(hotel_ids), size)
+        ]
+
+    def _cached_hotel_offers(self, offers_params):
+        """One chunk through hotel_offers_cache -> (payload, cache status)."""
+        payload, _, status = self.hotel_offers_cache.get_or_fetch(
+            cache_key("hotel-offers", offers_params),
+            lambda: self._fetch_hotel_offers(offers_params),
+            cacheable=lambda v: not v.get("errors"),
+        )
+        return payload, status
+
+    def _fetch_hotel_offer_chunks(self, chunks, merge):
+        """
+        Feeds `merge` the chunks as they complete, at most hotel_offers_concurrency
+        in flight on the shared search pool. Once it is done, chunks not submitted yet are
+        dropped; ones already submitted finish in the background (and still fill the cache).
+        """
+        if len(chunks) == 1:
+            try:
+                merge.add(0, *self._cached_hotel_offers(chunks[0]))
+            except Exception as e:
+                merge.add_exception(0, e)
+            merge.raise_if_nothing()
+            return
+
+        completed = self._run_bounded(self._cached_hotel_offers, chunks, self.hotel_offers_concurrency)
+        try:
+            for i, fut in completed:
+                try:
+                    merge.add(i, *fut.result())
+                except Exception as e:
+                    merge.add_exception(i, e)
+                if merge.done:
+                    break
+        finally:
+            completed.close()
+        merge.raise_if_nothing()
+
+    def _hotel_budget_total(self, budget):
+        # Optional: reserve ~40% of trip budget for hotels (total stay)
+        if budget:
+            try:
+                return float(budget) * 0.4
+            except Exception:
+                return None
+        return None
+
+    def _hotel_summary(self, item, cheapest, check_in, check_out):
+        hotel = item.get("hotel") or {}
+        return {
+            "id": hotel.get("hotelId"),
+            "name": hotel.get("name"),
+            "rating": hotel.get("rating"),
+            "address": hotel.get("address"),
+            "cheapestOffer": {
+                "checkInDate": cheapest.get("checkInDate") or check_in,
+                "checkOutDate": cheapest.get("checkOutDate") or check_out,
+                "rateType": cheapest.get("rateType"),
+                "boardType": cheapest.get("boardType"),
+                "roomType": ((cheapest.get("room") or {}).get("typeEstimated") or {}).get("category"),
+                "price": cheapest.get("price"),
+            }
+        }
+
+    def _fetch_hotel_ids(self, list_params):
+        """/v1/reference-data/locations/hotels/by-city -> {"hotelIds": [...]} (or the error payload)."""
+        log.debug("✅ HOTEL LIST PARAMS SENT: %s", list_params)
+
+        list_resp = self._request(
+            "GET",
+            "/v1/reference-data/locations/hotels/by-city",
+            params=list_params,
+            timeout=25,
+        )
+        return self._hotel_ids_payload(list_resp)
+
+    def _hotel_ids_payload(self, list_resp):
+        hotel_list_payload = list_resp.json() if list_resp is not None else {}
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                "✅ HOTEL LIST status=%s keys=%s errors=%s",
+                getattr(list_resp, "status_code", None), list(hotel_list_payload), hotel_list_payload.get("errors"),
+            )
+
+        if hotel_list_payload.get("errors"):
+            return hotel_list_payload
+
+        hotel_list = hotel_list_payload.get("data") or []
+        return {"hotelIds": [h.get("hotelId") for h in hotel_list if h.get("hotelId")]}
+
+    def _fetch_hotel_offers(self, offers_params):
+        """/v3/shopping/hotel-offers -> {"data": [...]} (or the error payload)."""
+        log.debug("✅ HOTEL OFFERS PARAMS SENT: %s", offers_params)
 
         offers_resp = self._request(
             "GET",
@@ -886,73 +1484,21 @@ class AmadeusAPI:
             params=offers_params,
             timeout=35,
         )
+        return self._hotel_offers_payload(offers_resp)
+
+    def _hotel_offers_payload(self, offers_resp):
         offers_payload = offers_resp.json() if offers_resp is not None else {}
 
-        print("✅ HOTEL OFFERS status:", getattr(offers_resp, "status_code", None))
-        print("✅ HOTEL OFFERS keys:", list(offers_payload.keys()))
-        print("✅ HOTEL OFFERS errors:", offers_payload.get("errors"))
-        print("✅ HOTEL OFFERS data length:", len(offers_payload.get("data") or []))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                "✅ HOTEL OFFERS status=%s keys=%s errors=%s data=%d",
+                getattr(offers_resp, "status_code", None), list(offers_payload),
+                offers_payload.get("errors"), len(offers_payload.get("data") or []),
+            )
 
         if offers_payload.get("errors"):
-            return {"error": "Amadeus request failed", "details": offers_payload}
-
-        data = offers_payload.get("data") or []
-
-        # ---------------------------------------------------------
-        # 3) Summarize + budget filter
-        # ---------------------------------------------------------
-        results = []
-        for item in data:
-            hotel = item.get("hotel") or {}
-            offers = item.get("offers") or []
-            if not offers:
-                continue
-
-            # choose cheapest offer
-            cheapest = None
-            cheapest_val = None
-            for o in offers:
-                total = (o.get("price") or {}).get("total")
-                try:
-                    val = float(total)
-                except Exception:
-                    continue
-                if cheapest_val is None or val < cheapest_val:
-                    cheapest_val = val
-                    cheapest = o
-
-            if not cheapest:
-                continue
-
-            # budget filter (compare total stay cost vs reserved hotel budget)
-            if hotel_budget_total is not None and cheapest_val is not None and cheapest_val > hotel_budget_total:
-                continue
-
-            results.append({
-                "id": hotel.get("hotelId"),
-                "name": hotel.get("name"),
-                "rating": hotel.get("rating"),
-                "address": hotel.get("address"),
-                "cheapestOffer": {
-                    "checkInDate": cheapest.get("checkInDate") or check_in,
-                    "checkOutDate": cheapest.get("checkOutDate") or check_out,
-                    "rateType": cheapest.get("rateType"),
-                    "boardType": cheapest.get("boardType"),
-                    "roomType": ((cheapest.get("room") or {}).get("typeEstimated") or {}).get("category"),
-                    "price": cheapest.get("price"),
-                }
-            })
-
-            if len(results) >= max_results:
-                break
-
-        return {
-            "destination": destination,
-            "city_code": city_code,
-            "check_in": check_in,
-            "check_out": check_out,
-            "hotels": results,
-        }
+            return offers_payload
+        return {"data": offers_payload.get("data") or []}
 
 
 
@@ -980,22 +1526,11 @@ class AmadeusAPI:
         if IATA_RE.match(q):
             return q
 
-        params = {
-            "keyword": city_query,
-            "subType": "CITY",
-            "page[limit]": 10,
-        }
-
-        resp = self._request("GET", "/v1/reference-data/locations", params=params)
-        if resp.status_code >= 400:
-            return None
-
-        data = (resp.json() or {}).get("data", []) or []
-        for x in data:
-            if x.get("subType") == "CITY" and x.get("iataCode"):
-                return x["iataCode"]
+        return self._cached_resolution(city_query, "CITY", lambda: self._resolve_city_code_uncached(city_query))
 
-        return None
+    def _resolve_city_code_uncached(self, city_query: str):
+        data, ok = self._locations_lookup(city_query, "CITY")
+        return self._pick_location(data, ("CITY",)), ok
 
     def _summarize_hotel_offer(self, offer: dict):
         # Amadeus hotel offers payloads vary a bit, so we defensively read fields
@@ -1052,7 +1587,7 @@ class AmadeusAPI:
             "transferType": transfer_type,
             "currency": currency,
         }
-        response = requests.get(url, headers=self._headers(), params=params)
+        response = self.session.get(url, headers=self._headers(), params=params)
         return response.json()
 
     # FIXED: added self
@@ -1105,7 +1640,7 @@ class AmadeusAPI:
             phone_country_code,
             phone_number,
         )
-        response = requests.post(booking_url, headers=self._headers(json_content=True), json=body)
+        response = self.session.post(booking_url, headers=self._headers(json_content=True), json=body)
         return response.json()
     
     def search_transfers_clean(self, start_iata, end_iata, start_datetime, passengers=1,
@@ -1120,7 +1655,9 @@ class AmadeusAPI:
         }
 
         r = self._request("GET", "/v1/shopping/transfers", params=params)
+        return self._transfers_payload(r, start_iata, end_iata, start_datetime, max_results)
 
+    def _transfers_payload(self, r, start_iata, end_iata, start_datetime, max_results):
         if r.status_code >= 400:
             return {"error": "Amadeus transfer request failed", "details": r.text}
 
@@ -1148,7 +1685,7 @@ class AmadeusAPI:
     def get_city_coordinates(self, city_name):
         url = f"{self._base_url()}/v1/reference-data/locations/cities"
         params = {"keyword": city_name}
-        response = requests.get(url, headers=self._headers(), params=params)
+        response = self.session.get(url, headers=self._headers(), params=params)
         return response.json()
 
     def find_activities(self, north, south, east, west, categories=None, limit=20):
@@ -1163,5 +1700,5 @@ class AmadeusAPI:
         if categories:
             params["categories"] = categories
 
-        response = requests.get(url, headers=self._headers(), params=params)
+        response = self.session.get(url, headers=self._headers(), params=params)
         return response.json()
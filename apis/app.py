@@ -1,36 +1,43 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Blueprint, Flask, Response, request, jsonify, send_from_directory, stream_with_context
 import os
 import json
 import re
-from dotenv import load_dotenv, dotenv_values
+import atexit
+import hashlib
+import threading
+import time
+from dotenv import dotenv_values
 import requests
 from amadeus_api import AmadeusAPI
-import os, json
-from groq import Groq
+from cache import MISSING, make_response_cache
+from llm_json import parse_llm_json
+from llm_stream import ItineraryDayScanner, iter_sse_content
+from planner import ParallelItineraryPlanner, normalize_day, provider_data_block, user_input_block
+from prompt_compact import compact_provider_data, compact_results, drop_empty, dumps_compact
+from hotel_rank import RANK_KEYS
+from ratelimit import RATE_LIMIT_PROFILES
+from results_store import ResultsWriter
+from log import configure as configure_logging, get_logger
+import metrics
+import timing
 from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-print("✅ RUNNING FILE:", __file__)
-print("✅ CWD:", os.getcwd())
+# .env is read once, here: every setting below comes from os.environ (values in
+# .env win, as before). ITINERARY_ENV_FILE points at another file; "off" skips it
+# so tests and the benchmark only see the environment they set up.
+env_path = os.getenv("ITINERARY_ENV_FILE") or os.path.join(os.path.dirname(__file__), "..", ".env")
+_env_values = {} if env_path == "off" else dotenv_values(env_path)
+os.environ.update({k: v for k, v in _env_values.items() if v is not None})
 
-env_path = os.path.join(os.path.dirname(__file__), "..", ".env")
-print("env_path:", env_path)
-print("exists:", os.path.exists(env_path))
-print("dotenv_values keys:", list(dotenv_values(env_path).keys()))
-
-
-load_dotenv(dotenv_path=env_path, override=True)
+# After .env, so LOG_LEVEL etc. can come from it
+configure_logging()
+log = get_logger(__name__)
+log.debug("env file: %s keys=%s", env_path, list(_env_values))
 
 GROQ_API_KEY = (os.getenv("GROQ_API_KEY") or "").strip()
 GROQ_MODEL = (os.getenv("GROQ_MODEL") or "llama-3.3-70b-versatile").strip()
 
-print("✅ GROQ_API_KEY loaded:", bool(GROQ_API_KEY))
-print("✅ GROQ_API_KEY prefix:", GROQ_API_KEY[:4])   # should print 'gsk_'
-print("✅ GROQ_MODEL:", GROQ_MODEL)
-print("GROQ key len:", len(GROQ_API_KEY))
-print("GROQ key last4:", GROQ_API_KEY[-4:])
-
-
-from datetime import datetime
 
 def trip_length_days(depart_date: str, return_date: str) -> int:
     try:
@@ -62,11 +69,16 @@ def parse_dates(dates_str: str):
         return found[0], None
     return None, None
 
-def groq_json(prompt: str) -> dict:
+# Point at a local stand-in (standin_server.py) with GROQ_BASE_URL=http://127.0.0.1:9000/openai/v1
+GROQ_BASE_URL = (os.getenv("GROQ_BASE_URL") or "https://api.groq.com/openai/v1").strip().rstrip("/")
+GROQ_CHAT_URL = f"{GROQ_BASE_URL}/chat/completions"
+
+
+def groq_request(prompt: str, stream=False):
+    """(headers, body) for a Groq chat completion; shared by the sync and async clients."""
     if not GROQ_API_KEY:
         raise RuntimeError("Missing GROQ_API_KEY env var")
 
-    url = "https://api.groq.com/openai/v1/chat/completions"
     headers = {"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"}
     body = {
         "model": GROQ_MODEL,
@@ -76,26 +88,124 @@ def groq_json(prompt: str) -> dict:
         ],
         "temperature": 0.7,
     }
+    if stream:
+        body["stream"] = True
+    return headers, body
 
-    r = requests.post(url, headers=headers, json=body, timeout=45)
 
+def raise_for_groq_status(r, text=None):
+    text = r.text if text is None else text
     if r.status_code == 401:
         # shows EXACT reason from Groq without exposing your key
-        raise RuntimeError(f"Groq 401 Unauthorized: {r.text}")
+        raise RuntimeError(f"Groq 401 Unauthorized: {text}")
 
     if r.status_code >= 400:
-        raise RuntimeError(f"Groq HTTP {r.status_code}: {r.text}")
+        raise RuntimeError(f"Groq HTTP {r.status_code}: {text}")
+
+
+def groq_json(prompt: str) -> dict:
+    headers, body = groq_request(prompt)
+    with metrics.upstream("groq", "chat/completions") as call:
+        r = requests.post(GROQ_CHAT_URL, headers=headers, json=body, timeout=45)
+        call.status = r.status_code
+    raise_for_groq_status(r)
+
+    response = r.json()
+    metrics.record_llm_usage(GROQ_MODEL, response.get("usage"))
+    content = response["choices"][0]["message"]["content"]
+    return parse_llm_json(content)
+
+
+def groq_stream(prompt: str):
+    """Same request as groq_json with stream=True; yields content deltas as they arrive."""
+    headers, body = groq_request(prompt, stream=True)
+    usage = {}
+
+    # (connect, per-chunk read) timeouts: the whole stream may take longer than 45s
+    with metrics.upstream("groq", "chat/completions:stream") as call, \
+            requests.post(GROQ_CHAT_URL, headers=headers, json=body, stream=True, timeout=(10, 45)) as r:
+        call.status = r.status_code
+        raise_for_groq_status(r)
+
+        yield from iter_sse_content(r, usage)
+
+    metrics.record_llm_usage(GROQ_MODEL, usage)
+
 
-    content = r.json()["choices"][0]["message"]["content"]
 
-    # Strip accidental code fences if the model adds them
-    content = content.strip()
-    if content.startswith("```"):
-        content = content.split("```", 2)[1].strip()
+# ---------------------------
+# LLM response cache
+# ---------------------------
+# Identical (after normalization) plans come back from here instead of Groq.
+# Set LLM_CACHE_TTL_S=0 to disable, LLM_CACHE_DIR to keep entries on disk.
+llm_cache = make_response_cache(
+    "llm",
+    ttl=int(os.getenv("LLM_CACHE_TTL_S") or 6 * 3600),
+    directory=os.getenv("LLM_CACHE_DIR") or None,
+    maxsize=256,
+)
+metrics.track_cache(llm_cache)
+
+# Fields that change on every fetch without changing what the planner sees
+VOLATILE_META_KEYS = {"saved_at", "cache", "cache_age_s"}
+
+
+def _strip_volatile(obj):
+    if isinstance(obj, dict):
+        return {k: _strip_volatile(v) for k, v in obj.items() if k not in VOLATILE_META_KEYS}
+    if isinstance(obj, list):
+        return [_strip_volatile(v) for v in obj]
+    return obj
+
+
+def _normalize_input_value(v):
+    if isinstance(v, str):
+        return " ".join(v.lower().split())
+    if isinstance(v, (list, tuple)):
+        # Mixed types (["art", null, 1]) have no natural order; sort by their JSON
+        return sorted((_normalize_input_value(x) for x in v), key=lambda x: json.dumps(x, sort_keys=True, default=str))
+    return v
+
 
-    return json.loads(content)
+def meta_fingerprint(*metas) -> str:
+    payload = json.dumps(_strip_volatile(list(metas)), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
+def llm_cache_key(model: str, user_input: dict, *metas) -> str:
+    """
+    Hash of model + normalized user input (case, whitespace and interest order
+    ignored) + a fingerprint of the provider metas the prompt embeds.
+    """
+    normalized = {k: _normalize_input_value(v) for k, v in sorted(user_input.items())}
+    raw = json.dumps([model, normalized, meta_fingerprint(*metas)], sort_keys=True, default=str)
+    return "llm:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def cached_llm_call(key: str, generate, use_cache=True, cacheable=None):
+    """Any plan-producing `generate()` through llm_cache. Returns (llm_out, cache_status)."""
+    with timing.stage("llm"):
+        if not use_cache:
+            return generate(), "BYPASS"
+        llm_out, _, status = llm_cache.get_or_fetch(key, generate, cacheable=cacheable)
+        return llm_out, status
+
+
+# Approximate token budget for the provider data embedded in a prompt
+PROMPT_DATA_TOKEN_BUDGET = int(os.getenv("PROMPT_DATA_TOKEN_BUDGET") or 1500)
+
+# Longest itinerary one request plans; longer date ranges get the first N days
+MAX_ITINERARY_DAYS = int(os.getenv("MAX_ITINERARY_DAYS") or 14)
+
+# Long trips: skeleton first, then day batches in parallel (see planner.py)
+PARALLEL_PLANNER_MIN_DAYS = int(os.getenv("PARALLEL_PLANNER_MIN_DAYS") or 6)
+parallel_planner = ParallelItineraryPlanner(
+    llm=lambda prompt: groq_json(prompt),
+    batch_size=int(os.getenv("PLANNER_BATCH_DAYS") or 2),
+    max_concurrency=int(os.getenv("PLANNER_CONCURRENCY") or 4),
+    max_day_retries=int(os.getenv("PLANNER_DAY_RETRIES") or 2),
+)
+
 
 def build_itinerary_prompt(user_input: dict, results: list[dict]) -> str:
     return f"""
@@ -107,10 +217,10 @@ If flights or transfers are missing/errored, estimate plausible options instead.
 Whenever you estimate, label it clearly as "ESTIMATE" and explain assumptions.
 
 USER INPUT:
-{json.dumps(user_input, indent=2)}
+{dumps_compact(drop_empty(user_input))}
 
 API RESULTS (each entry is either ok:true with data, or ok:false with error):
-{json.dumps(results, indent=2)}
+{dumps_compact(compact_results(results, PROMPT_DATA_TOKEN_BUDGET))}
 
 OUTPUT FORMAT (JSON ONLY, no markdown):
 {{
@@ -163,77 +273,41 @@ Hard rules:
 """.strip()
 
 
-
-
-ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-RESULTS_PATH = os.path.join(ROOT_DIR, "flight_results.json")
-
-app = Flask(__name__)
-
-print("ENV ID loaded:", bool(os.getenv("AMADEUS_CLIENT_ID")))
-print("ENV SECRET loaded:", bool(os.getenv("AMADEUS_CLIENT_SECRET")))
-
-cid = (os.getenv("AMADEUS_CLIENT_ID") or "").strip()
-cs = (os.getenv("AMADEUS_CLIENT_SECRET") or "").strip()
-print("ID length:", len(cid))
-print("SECRET length:", len(cs))
-
-
-# Create API client ONCE
-api = AmadeusAPI(
-    client_id=os.getenv("AMADEUS_CLIENT_ID"),
-    client_secret=os.getenv("AMADEUS_CLIENT_SECRET")
-)
-
-
-
-# Optional: clear results file on startup (same behavior as before)
-with open(RESULTS_PATH, "w", encoding="utf-8") as f:
-    json.dump({"query": {}, "results": []}, f, indent=2)
-
 # ---------------------------
-# Frontend routes
+# Provider fan-out (hotels / flights / transfers)
 # ---------------------------
-@app.route("/")
-def home():
-    return send_from_directory(ROOT_DIR, "index.html")
+# Per-branch deadline for the provider stage, counted from when the branch starts
+# running. Branches still running when it expires degrade to ESTIMATE so the LLM
+# step can start anyway; their Amadeus calls get only the time left (see
+# timing.deadline), so an abandoned branch gives its worker back soon after.
+PROVIDER_DEADLINE_S = float(os.getenv("PROVIDER_DEADLINE_S") or 40)
 
-@app.route("/main.js")
-def serve_main_js():
-    return send_from_directory(ROOT_DIR, "main.js")
+# Requests the server handles at once (e.g. the WSGI server's thread count)
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS") or 16)
 
-@app.route("/style.css")
-def serve_style_css():
-    return send_from_directory(ROOT_DIR, "style.css")
+# Shared across requests so a slow upstream never blocks the request thread
+# on executor shutdown; one worker per provider branch of every concurrent request.
+PROVIDER_POOL_SIZE = int(os.getenv("PROVIDER_POOL_SIZE") or 3 * MAX_CONCURRENT_REQUESTS)
+_provider_pool = ThreadPoolExecutor(max_workers=PROVIDER_POOL_SIZE, thread_name_prefix="provider")
+# A branch only goes to the pool when a worker is free; a saturated pool fails
+# fast to ESTIMATE instead of queueing behind other requests' branches
+_provider_slots = threading.BoundedSemaphore(PROVIDER_POOL_SIZE)
 
-# ---------------------------
-# API route
-# ---------------------------
-@app.post("/api/generate-itinerary")
-def generate_itinerary():
 
+# Hotels have always said "estimates"
+PROVIDER_ERROR_NOTES = {"Hotel": "Hotel API error; using estimates."}
 
-    body = request.get_json(force=True) or {}
 
-    destination = (body.get("destination") or "").strip()
-    dates = (body.get("dates") or "").strip()
-    budget = (body.get("budget") or "").strip()
-    transport = (body.get("transport") or "").strip()
-    interests = body.get("interests") or []
-    message = (body.get("message") or "").strip()
+def _provider_meta(payload, label: str) -> dict:
+    if isinstance(payload, dict) and payload.get("error"):
+        notes = PROVIDER_ERROR_NOTES.get(label) or f"{label} API error; using estimate."
+        return {"source": "ESTIMATE", "data": payload, "notes": notes}
+    return {"source": "REAL", "data": payload, "notes": "From Amadeus."}
 
-    depart_date, return_date = parse_dates(dates)
-    num_days = trip_length_days(depart_date, return_date)
-    if not destination or not depart_date or not return_date:
-        return jsonify({"error": "Missing/invalid destination or dates"}), 400
-    num_days = days_between(depart_date, return_date)
 
-    # -------------------------
-    # 1) Hotels
-    # -------------------------
-    hotels_meta = {"source": "ESTIMATE", "data": {}, "notes": "Hotel API not called."}
+def fetch_hotels_meta(destination, depart_date, return_date, budget) -> dict:
     try:
-        hotels_payload = api.search_hotels_clean(
+        hotels_payload = get_api().search_hotels_clean(
             destination=destination,
             check_in=depart_date,
             check_out=return_date,
@@ -242,20 +316,14 @@ def generate_itinerary():
             budget=budget if budget else None,
             max_results=8,
         )
-        if isinstance(hotels_payload, dict) and hotels_payload.get("error"):
-            hotels_meta = {"source": "ESTIMATE", "data": hotels_payload, "notes": "Hotel API error; using estimates."}
-        else:
-            hotels_meta = {"source": "REAL", "data": hotels_payload, "notes": "From Amadeus."}
+        return _provider_meta(hotels_payload, "Hotel")
     except Exception as e:
-        hotels_meta = {"source": "ESTIMATE", "data": {}, "notes": f"Hotel API crashed: {e}"}
+        return {"source": "ESTIMATE", "data": {}, "notes": f"Hotel API crashed: {e}"}
 
-    # -------------------------
-    # 2) Flights
-    # -------------------------
-    flights_meta = {"source": "ESTIMATE", "data": {}, "notes": "Flight API unavailable; using estimated guidance."}
+
+def fetch_flights_meta(origin, destination, depart_date, return_date, budget) -> dict:
     try:
-        origin = (body.get("origin") or "BOS").strip()
-        flight_payload = api.search_flights_clean(
+        flight_payload = get_api().search_flights_clean(
             origin=origin,
             destination=destination,
             depart_date=depart_date,
@@ -264,66 +332,155 @@ def generate_itinerary():
             adults=1,
             max_results=5,
         )
-        if isinstance(flight_payload, dict) and flight_payload.get("error"):
-            flights_meta = {"source": "ESTIMATE", "data": flight_payload, "notes": "Flight API error; using estimate."}
-        else:
-            flights_meta = {"source": "REAL", "data": flight_payload, "notes": "From Amadeus."}
+        return _provider_meta(flight_payload, "Flight")
     except Exception as e:
-        flights_meta = {"source": "ESTIMATE", "data": {}, "notes": f"Flight API crashed: {e}"}
+        return {"source": "ESTIMATE", "data": {}, "notes": f"Flight API crashed: {e}"}
 
-    # -------------------------
-    # 3) Transfers
-    # -------------------------
-    transfers_meta = {"source": "ESTIMATE", "data": {}, "notes": "Transfers API unavailable; using estimated local transport."}
+
+def fetch_transfers_meta(start_location, destination, depart_date) -> dict:
     try:
-        start_iata = (body.get("start_location") or "BOS").strip()
-        end_iata = destination
-        start_datetime = f"{depart_date}T12:00:00"
+        api = get_api()
         transfer_payload = api.search_transfers_clean(
-            start_iata=api.resolve_iata(start_iata) or "BOS",
-            end_iata=api.resolve_iata(end_iata) or "",
-            start_datetime=start_datetime,
+            start_iata=api.resolve_iata(start_location) or "BOS",
+            end_iata=api.resolve_iata(destination) or "",
+            start_datetime=f"{depart_date}T12:00:00",
             passengers=1,
         )
-        if isinstance(transfer_payload, dict) and transfer_payload.get("error"):
-            transfers_meta = {"source": "ESTIMATE", "data": transfer_payload, "notes": "Transfers API error; using estimate."}
-        else:
-            transfers_meta = {"source": "REAL", "data": transfer_payload, "notes": "From Amadeus."}
+        return _provider_meta(transfer_payload, "Transfers")
     except Exception as e:
-        transfers_meta = {"source": "ESTIMATE", "data": {}, "notes": f"Transfers API crashed: {e}"}
+        return {"source": "ESTIMATE", "data": {}, "notes": f"Transfers API crashed: {e}"}
 
-    # -------------------------
-    # 4) Build hotel name hints for LLM
-    # -------------------------
-    hotel_names = []
+
+PROVIDER_LABELS = {"hotels": "Hotel", "flights": "Flight", "transfers": "Transfers"}
+
+
+def fan_out_providers(tasks: dict, deadline_s: float = None) -> dict:
+    """
+    Runs the provider lookups in parallel and returns {name: meta}.
+    Each task returns its own REAL/ESTIMATE meta and never raises; a task
+    still running `deadline_s` after it started is reported as an ESTIMATE
+    timeout, and one that finds the pool full as an ESTIMATE busy.
+    """
+    deadline_s = PROVIDER_DEADLINE_S if deadline_s is None else deadline_s
+    started = {}
+    results = {}
+
+    def branch(name, fn):
+        try:
+            started[name] = time.monotonic()
+            with timing.deadline(deadline_s):
+                return timing.timed(name, fn)()
+        finally:
+            _provider_slots.release()
+
+    futures = {}
+    for name, fn in tasks.items():
+        if _provider_slots.acquire(blocking=False):
+            futures[name] = timing.submit(_provider_pool, branch, name, fn)
+        else:
+            log.warning("⚠️ provider pool full (%d workers); %s uses an estimate", PROVIDER_POOL_SIZE, name)
+            results[name] = provider_busy_meta(name)
+
+    pending = dict(futures)
+    while pending:
+        now = time.monotonic()
+        # A branch not picked up yet has its whole deadline ahead of it
+        expires = {name: started.get(name, now) + deadline_s for name in pending}
+        for name in [n for n, at in expires.items() if at <= now]:
+            if pending.pop(name).cancel():
+                _provider_slots.release()     # never ran, so branch() won't release it
+            results[name] = provider_timeout_meta(name, deadline_s)
+        if not pending:
+            break
+        done, _ = wait(pending.values(), timeout=min(expires[n] for n in pending) - now, return_when=FIRST_COMPLETED)
+        for name in [n for n, fut in pending.items() if fut in done]:
+            results[name] = pending.pop(name).result()
+
+    return {name: results[name] for name in tasks}
+
+
+def provider_timeout_meta(name: str, deadline_s: float) -> dict:
+    label = PROVIDER_LABELS.get(name, name.title())
+    return {
+        "source": "ESTIMATE",
+        "data": {},
+        "notes": f"{label} API timed out after {deadline_s:.0f}s; using estimate.",
+    }
+
+
+def provider_busy_meta(name: str) -> dict:
+    label = PROVIDER_LABELS.get(name, name.title())
+    return {"source": "ESTIMATE", "data": {}, "notes": f"{label} API skipped (server busy); using estimate."}
+
+
+# ---------------------------
+# Itinerary pipeline pieces (shared by the JSON and streaming routes)
+# ---------------------------
+def parse_itinerary_request(body: dict):
+    """Returns (req, None) with the validated inputs, or (None, error message)."""
+    destination = (body.get("destination") or "").strip()
+    dates = (body.get("dates") or "").strip()
+    budget = (body.get("budget") or "").strip()
+    transport = (body.get("transport") or "").strip()
+    interests = body.get("interests") or []
+    message = (body.get("message") or "").strip()
+
+    depart_date, return_date = parse_dates(dates)
+    if not destination or not depart_date or not return_date:
+        return None, "Missing/invalid destination or dates"
     try:
-        hotel_list = (hotels_meta.get("data") or {}).get("hotels") or []
-        for h in hotel_list[:6]:
-            name = h.get("name")
-            if name:
-                hotel_names.append(name)
-    except Exception:
-        pass
+        num_days = days_between(depart_date, return_date)
+    except ValueError:
+        return None, "Missing/invalid destination or dates"
+    if num_days < 1:
+        return None, "Return date must be on or after the departure date"
 
-    # -------------------------
-    # 5) Groq prompt
-    # -------------------------
-    prompt = f"""
+    return {
+        "destination": destination,
+        "budget": budget,
+        "transport": transport,
+        "interests": interests,
+        "message": message,
+        "depart_date": depart_date,
+        "return_date": return_date,
+        "num_days": min(num_days, MAX_ITINERARY_DAYS),
+        "origin": (body.get("origin") or "BOS").strip(),
+        "start_location": (body.get("start_location") or "BOS").strip(),
+        # Per-request opt-out: {"no_cache": true}
+        "use_llm_cache": not body.get("no_cache"),
+        # "single" | "parallel" | "auto" (parallel for trips of PARALLEL_PLANNER_MIN_DAYS+)
+        "mode": (body.get("mode") or "auto").strip().lower(),
+    }, None
+
+
+def use_parallel_planner(req) -> bool:
+    if req["mode"] == "parallel":
+        return True
+    if req["mode"] == "single":
+        return False
+    return req["num_days"] >= PARALLEL_PLANNER_MIN_DAYS
+
+
+def gather_provider_meta(req) -> dict:
+    """Hotels, flights, transfers for a parsed request (concurrent fan-out)."""
+    return fan_out_providers({
+        "hotels": lambda: fetch_hotels_meta(req["destination"], req["depart_date"], req["return_date"], req["budget"]),
+        "flights": lambda: fetch_flights_meta(
+            req["origin"], req["destination"], req["depart_date"], req["return_date"], req["budget"]
+        ),
+        "transfers": lambda: fetch_transfers_meta(req["start_location"], req["destination"], req["depart_date"]),
+    })
+
+
+def build_groq_prompt(req, flights_meta, hotels_meta, transfers_meta) -> str:
+    # Only the fields the planner uses, no nulls, compact JSON, capped size
+    data = compact_provider_data(flights_meta, hotels_meta, transfers_meta, PROMPT_DATA_TOKEN_BUDGET)
+    return f"""
 You are a travel planner. Output STRICT JSON only (no markdown, no code fences).
 
-USER INPUT:
-destination: {destination}
-origin: {(body.get("origin") or "BOS").strip()}
-dates: {depart_date} to {return_date}
-budget_max_usd: {budget or "unknown"}
-transport_preference: {transport or "any"}
-interests: {interests if interests else []}
-notes: {message or "none"}
-
-AVAILABLE DATA (may be empty if API failed):
-flights_meta: {json.dumps(flights_meta, indent=2)}
-hotels_meta: {json.dumps(hotels_meta, indent=2)}
-transfers_meta: {json.dumps(transfers_meta, indent=2)}
+{user_input_block(req)}
+
+{provider_data_block(data)}
 
 OUTPUT JSON SCHEMA (must match exactly):
 {{
@@ -365,64 +522,504 @@ OUTPUT JSON SCHEMA (must match exactly):
 HARD RULES:
 - If flights_meta.source == "REAL", use those prices/options as REAL. If not, create ESTIMATE ranges and state assumptions.
 - If hotels_meta.source == "REAL", use those hotels as REAL. If not, create ESTIMATE ranges and state assumptions.
-- itinerary length MUST match number of days between depart_date and return_date (inclusive of each overnight day). If 5 days, output 5 day objects.
+- itinerary MUST contain exactly {req['num_days']} day objects, day 1 to day {req['num_days']}.
 - Each day.items MUST contain EXACTLY 6 entries with realistic times, meals, transit, and rest.
 - At least 3 of 6 items per day should reflect the interests (if any).
 """.strip()
 
 
+def itinerary_llm_key(req, flights_meta, hotels_meta, transfers_meta) -> str:
+    return llm_cache_key(
+        GROQ_MODEL,
+        {
+            "destination": req["destination"],
+            "origin": req["origin"],
+            "dates": f"{req['depart_date']} to {req['return_date']}",
+            "budget": req["budget"],
+            "transport": req["transport"],
+            "interests": req["interests"],
+            "message": req["message"],
+            "planner": "parallel" if use_parallel_planner(req) else "single",
+        },
+        # fingerprint what the model actually sees, so irrelevant field changes still hit
+        compact_provider_data(flights_meta, hotels_meta, transfers_meta, PROMPT_DATA_TOKEN_BUDGET),
+    )
+
+
+def itinerary_response(req, itinerary, llm_cache_status, missing_days, provider_meta) -> dict:
+    """Body of /api/generate-itinerary (both serving modes)."""
+    return {
+        "destination": req["destination"],
+        "dates": f"{req['depart_date']} to {req['return_date']}",
+        "interests": req["interests"],
+        "itinerary": [to_frontend_day(d) for d in itinerary],
+        "llm_cache": llm_cache_status,
+        "missing_days": missing_days,
+        "travel_data": {
+            "flights": provider_meta["flights"],
+            "transfers": provider_meta["transfers"],
+            "hotels": provider_meta["hotels"],
+        }
+    }
+
+
+def travel_data_event(req, provider_meta) -> dict:
+    """First event of the streaming route."""
+    return {
+        "type": "travel_data",
+        "destination": req["destination"],
+        "dates": f"{req['depart_date']} to {req['return_date']}",
+        "interests": req["interests"],
+        "travel_data": {
+            "flights": provider_meta["flights"],
+            "transfers": provider_meta["transfers"],
+            "hotels": provider_meta["hotels"],
+        },
+    }
+
+
+def itinerary_is_complete(llm_out, num_days) -> bool:
+    itinerary = (llm_out or {}).get("itinerary")
+    return isinstance(itinerary, list) and len(itinerary) == num_days
+
+
+def to_frontend_day(d: dict) -> dict:
+    """LLM day {day, title, items[start/end/text]} -> frontend {day, title, schedule[time/activity]}."""
+    items = d.get("items", []) or []
+    schedule = []
+    for it in items:
+        start = (it.get("start") or "").strip()
+        end = (it.get("end") or "").strip()
+        text = (it.get("text") or "").strip()
+        time = f"{start} - {end}".strip(" -")
+        schedule.append({"time": time, "activity": text})
+
+    return {
+        "day": d.get("day"),
+        "title": d.get("title", f"Day {d.get('day')}"),
+        "schedule": schedule
+    }
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_PATH = os.getenv("FLIGHT_RESULTS_PATH") or os.path.join(ROOT_DIR, "flight_results.json")
+RESULTS_DIR = os.getenv("FLIGHT_RESULTS_DIR") or os.path.join(ROOT_DIR, "flight_results")
+
+# Flight search results: one file per query under RESULTS_DIR (plus the latest one at
+# RESULTS_PATH), written by a background thread. FLIGHT_RESULTS_DIR=off turns it off.
+results_writer = None if RESULTS_DIR == "off" else ResultsWriter(
+    RESULTS_DIR,
+    latest_path=RESULTS_PATH,
+    max_files=int(os.getenv("FLIGHT_RESULTS_MAX_FILES") or 200),
+    max_age_s=int(os.getenv("FLIGHT_RESULTS_MAX_AGE_S") or 7 * 24 * 3600),
+)
+if results_writer is not None:
+    atexit.register(results_writer.flush)
+
+# Routes and hooks live on a blueprint; create_app() (bottom of this file) builds the app
+bp = Blueprint("itinerary", __name__)
+
+
+# Per-stage timings of each API request, reported in the Server-Timing header
+@bp.before_app_request
+def start_stage_timings():
+    timing.begin()
+
+
+@bp.after_app_request
+def add_server_timing(response):
+    timings = timing.current()
+    if timings is not None:
+        observe_request(request.url_rule, request.method, response.status_code, timings)
+        if not response.is_streamed:
+            response.headers["Server-Timing"] = timings.server_timing()
+    return response
+
+
+def observe_request(url_rule, method, status, timings):
+    route = url_rule.rule if url_rule is not None else "unmatched"
+    metrics.REQUEST_SECONDS.observe(
+        time.perf_counter() - timings.started, route=route, method=method, status=status
+    )
+
+
+@bp.get("/metrics")
+def metrics_route():
+    return Response(metrics.REGISTRY.render(), mimetype=metrics.CONTENT_TYPE)
+
+
+def amadeus_rate_limits(hostname: str):
+    """
+    Client-side Amadeus limits (see ratelimit.py). AMADEUS_RATE_LIMIT_PROFILE picks
+    "test", "production" or "off" (default: the profile matching the hostname);
+    AMADEUS_RATE_LIMIT_RPS and AMADEUS_MAX_CONCURRENCY override the host-wide numbers.
+    """
+    name = (os.getenv("AMADEUS_RATE_LIMIT_PROFILE") or "").strip().lower()
+    if not name:
+        name = "production" if hostname == "production" else "test"
+    if name == "off":
+        return False
+
+    profile = dict(RATE_LIMIT_PROFILES[name])
+    if os.getenv("AMADEUS_RATE_LIMIT_RPS"):
+        profile["rate"] = float(os.getenv("AMADEUS_RATE_LIMIT_RPS"))
+    if os.getenv("AMADEUS_MAX_CONCURRENCY"):
+        profile["max_concurrency"] = int(os.getenv("AMADEUS_MAX_CONCURRENCY"))
+        profile["concurrency"] = min(profile["concurrency"], profile["max_concurrency"])
+    return profile
+
+
+# "test", "production", or a base URL (e.g. the local stand-in: http://127.0.0.1:9000)
+AMADEUS_HOSTNAME = (os.getenv("AMADEUS_HOSTNAME") or "test").strip()
+
+# ---------------------------
+# Amadeus client (built on first use)
+# ---------------------------
+_api = None
+_api_lock = threading.Lock()
+
+
+def get_api() -> AmadeusAPI:
+    """The process-wide Amadeus client. Built by the first request that needs it, not at import."""
+    global _api
+    if _api is None:
+        with _api_lock:
+            if _api is None:
+                _api = build_amadeus_api()
+    return _api
+
+
+def build_amadeus_api() -> AmadeusAPI:
+    # No network here: the OAuth token is fetched by the first Amadeus call
+    api = AmadeusAPI(
+        client_id=os.getenv("AMADEUS_CLIENT_ID"),
+        client_secret=os.getenv("AMADEUS_CLIENT_SECRET"),
+        hostname=AMADEUS_HOSTNAME,
+        pool_maxsize=int(os.getenv("AMADEUS_POOL_MAXSIZE") or 32),
+        max_retries=int(os.getenv("AMADEUS_MAX_RETRIES") or 2),
+        # Coalesce identical in-flight GETs (AMADEUS_SINGLE_FLIGHT=0 to turn off)
+        single_flight=(os.getenv("AMADEUS_SINGLE_FLIGHT") or "1") != "0",
+        # Token buckets per host/endpoint family + AIMD concurrency; 429s retried with jittered backoff
+        rate_limits=amadeus_rate_limits(AMADEUS_HOSTNAME),
+        # Flight offers: short TTL + stale-while-revalidate; set FLIGHT_CACHE_DIR for an on-disk store
+        flight_cache=make_response_cache(
+            "flight-offers",
+            ttl=int(os.getenv("FLIGHT_CACHE_TTL_S") or 300),
+            stale_ttl=int(os.getenv("FLIGHT_CACHE_STALE_S") or 600),
+            directory=os.getenv("FLIGHT_CACHE_DIR") or None,
+        ),
+        # Hotels: long-lived city -> hotelIds list, short-lived offers
+        hotel_list_cache=make_response_cache(
+            "hotel-list",
+            ttl=int(os.getenv("HOTEL_LIST_CACHE_TTL_S") or 24 * 3600),
+            stale_ttl=int(os.getenv("HOTEL_LIST_CACHE_STALE_S") or 7 * 24 * 3600),
+            directory=os.getenv("HOTEL_CACHE_DIR") or None,
+        ),
+        hotel_offers_cache=make_response_cache(
+            "hotel-offers",
+            ttl=int(os.getenv("HOTEL_OFFERS_CACHE_TTL_S") or 300),
+            stale_ttl=int(os.getenv("HOTEL_OFFERS_CACHE_STALE_S") or 300),
+        ),
+        # Offers for up to HOTEL_OFFERS_MAX_HOTELS hotels, in chunks fetched in parallel;
+        # stops once max_results in-budget hotels are found
+        hotel_chunk_size=int(os.getenv("HOTEL_OFFERS_CHUNK_SIZE") or 25),
+        hotel_max_ids=int(os.getenv("HOTEL_OFFERS_MAX_HOTELS") or 100),
+        hotel_offers_concurrency=int(os.getenv("HOTEL_OFFERS_CONCURRENCY") or 4),
+        # HOTEL_OFFERS_EARLY_STOP=0: rank every chunk (best of all hotels, slower)
+        hotel_early_stop=(os.getenv("HOTEL_OFFERS_EARLY_STOP") or "1") != "0",
+        # Multi-origin / flexible-date searches (/api/flights with "origins" or "flex_days")
+        flight_matrix_concurrency=int(os.getenv("FLIGHT_MATRIX_CONCURRENCY") or 4),
+        flight_matrix_max_cells=int(os.getenv("FLIGHT_MATRIX_MAX_CELLS") or 21),
+        # Threads shared by all hotel offer chunks and matrix cells in flight
+        search_pool_size=int(os.getenv("AMADEUS_SEARCH_POOL_SIZE") or 8),
+        # Towns without an airport resolve to the nearest one within this distance
+        nearest_airport_km=float(os.getenv("NEAREST_AIRPORT_KM") or 150),
+    )
+
+    # Exported on /metrics
+    for cache in (api.flight_cache, api.hotel_list_cache, api.hotel_offers_cache):
+        metrics.track_cache(cache)
+    metrics.track_cache(api.resolution_cache, name="iata-resolution")
+    metrics.track_tokens("amadeus", api._tokens)
+    if api.limiter is not None:
+        metrics.track_limiter("amadeus", api.limiter)
+    return api
+
+
+def __getattr__(name):
+    # `app.api` keeps working for scripts written before the client became lazy
+    if name == "api":
+        return get_api()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# ---------------------------
+# Frontend routes
+# ---------------------------
+@bp.route("/")
+def home():
+    return send_from_directory(ROOT_DIR, "index.html")
+
+@bp.route("/main.js")
+def serve_main_js():
+    return send_from_directory(ROOT_DIR, "main.js")
+
+@bp.route("/style.css")
+def serve_style_css():
+    return send_from_directory(ROOT_DIR, "style.css")
+
+# ---------------------------
+# API route
+# ---------------------------
+@bp.post("/api/generate-itinerary")
+def generate_itinerary():
+
+
+    body = request.get_json(force=True) or {}
+
+    req, error = parse_itinerary_request(body)
+    if error:
+        return jsonify({"error": error}), 400
+    num_days = req["num_days"]
+
+    # -------------------------
+    # 1-3) Hotels, flights, transfers (concurrent fan-out)
+    # -------------------------
+    provider_meta = gather_provider_meta(req)
+    hotels_meta = provider_meta["hotels"]
+    flights_meta = provider_meta["flights"]
+    transfers_meta = provider_meta["transfers"]
+
+    # -------------------------
+    # 4) Groq prompt
+    # -------------------------
+    prompt = build_groq_prompt(req, flights_meta, hotels_meta, transfers_meta)
 
     # -------------------------
-    # 6) Call Groq, fallback if it fails
+    # 5) Call Groq, fallback if it fails
     # -------------------------
+    llm_key = itinerary_llm_key(req, flights_meta, hotels_meta, transfers_meta)
+    llm_cache_status = None
+    missing_days = []
+
     try:
-        llm_out = groq_json(prompt)
+        if use_parallel_planner(req):
+            # Long trip: skeleton + concurrent day batches; good days are kept even if some fail
+            data = compact_provider_data(flights_meta, hotels_meta, transfers_meta, PROMPT_DATA_TOKEN_BUDGET)
+            llm_out, llm_cache_status = cached_llm_call(
+                llm_key,
+                lambda: parallel_planner.plan(req, data),
+                use_cache=req["use_llm_cache"],
+                cacheable=lambda out: itinerary_is_complete(out, num_days),
+            )
+        else:
+            # One call for the whole plan; only days that fail validation are regenerated
+            llm_out, llm_cache_status = cached_llm_call(
+                llm_key,
+                lambda: parallel_planner.repair(req, groq_json(prompt)),
+                use_cache=req["use_llm_cache"],
+                # only complete plans are worth replaying
+                cacheable=lambda out: itinerary_is_complete(out, num_days),
+            )
         itinerary = llm_out.get("itinerary", [])
-        if not isinstance(itinerary, list) or len(itinerary) != num_days:
-            raise ValueError(f"LLM itinerary invalid length: got {len(itinerary)} expected {num_days}")
+        missing_days = llm_out.get("missing_days") or []
     except Exception as e:
-        print("❌ GROQ ITINERARY FAILED:", str(e), flush=True)
+        log.error("❌ GROQ ITINERARY FAILED: %s", e)
         itinerary = []
 
 
     # -------------------------
     # ✅ ALWAYS convert to frontend-friendly schedule[]
     # -------------------------
-    fixed_itinerary = []
-    for d in itinerary:
-        items = d.get("items", []) or []
-        schedule = []
-        for it in items:
-            start = (it.get("start") or "").strip()
-            end = (it.get("end") or "").strip()
-            text = (it.get("text") or "").strip()
-            time = f"{start} - {end}".strip(" -")
-            schedule.append({"time": time, "activity": text})
-
-        fixed_itinerary.append({
-            "day": d.get("day"),
-            "title": d.get("title", f"Day {d.get('day')}"),
-            "schedule": schedule
+    with timing.stage("post"):
+        return jsonify(itinerary_response(req, itinerary, llm_cache_status, missing_days, provider_meta)), 200
+
+
+@bp.post("/api/generate-itinerary/stream")
+def generate_itinerary_stream():
+    """
+    Streaming variant of /api/generate-itinerary (NDJSON, one event per line):
+      {"type": "travel_data", ...}   as soon as the provider fan-out finishes
+      {"type": "day", "day": {...}}  each valid itinerary day as it parses out of the Groq stream
+                                     (malformed/missing days follow once repaired)
+      {"type": "done", ...}          full itinerary (same shape as the JSON route)
+      {"type": "error", "error": str}
+    """
+    body = request.get_json(force=True) or {}
+
+    req, error = parse_itinerary_request(body)
+    if error:
+        return jsonify({"error": error}), 400
+    # Day-by-day delivery comes from the token stream of one completion
+    req["mode"] = "single"
+
+    def events():
+        provider_meta = gather_provider_meta(req)
+        flights_meta = provider_meta["flights"]
+        hotels_meta = provider_meta["hotels"]
+        transfers_meta = provider_meta["transfers"]
+
+        yield ndjson(travel_data_event(req, provider_meta))
+
+        llm_key = itinerary_llm_key(req, flights_meta, hotels_meta, transfers_meta)
+        llm_cache_status = "BYPASS"
+        days = []
+        missing_days = []
+        good = {}
+
+        try:
+            llm_out = llm_cache.get(llm_key) if req["use_llm_cache"] else MISSING
+            if llm_out is not MISSING:
+                llm_cache_status = "HIT"
+                for d in llm_out.get("itinerary", []):
+                    days.append(d)
+                    yield ndjson({"type": "day", "day": to_frontend_day(d)})
+            else:
+                if req["use_llm_cache"]:
+                    llm_cache_status = "MISS"
+                scanner = ItineraryDayScanner()
+                prompt = build_groq_prompt(req, flights_meta, hotels_meta, transfers_meta)
+                stream_failed = False
+                try:
+                    for chunk in groq_stream(prompt):
+                        for d in scanner.feed(chunk):
+                            # Malformed days are held back and repaired after the stream ends
+                            n = _day_number(d)
+                            fixed = normalize_day(d, n) if n is not None else None
+                            if fixed is not None and n not in good and 1 <= n <= req["num_days"]:
+                                good[n] = fixed
+                                yield ndjson({"type": "day", "day": to_frontend_day(fixed)})
+                except Exception as e:
+                    # Days already sent stay; repair() regenerates the rest
+                    log.error("❌ GROQ STREAM FAILED after %d day(s): %s", len(good), e)
+                    stream_failed = True
+
+                try:
+                    llm_out = parse_llm_json(scanner.text)
+                except ValueError:
+                    llm_out = {}
+                llm_out["itinerary"] = list(good.values())
+                llm_out = parallel_planner.repair(req, llm_out)
+                for d in llm_out["itinerary"]:
+                    if _day_number(d) not in good:
+                        yield ndjson({"type": "day", "day": to_frontend_day(d)})
+                days = llm_out["itinerary"]
+                missing_days = llm_out["missing_days"]
+
+                # A cut-off stream has no summary/costs; do not cache it
+                if req["use_llm_cache"] and not stream_failed and itinerary_is_complete(llm_out, req["num_days"]):
+                    llm_cache.put(llm_key, llm_out)
+
+            if len(days) != req["num_days"]:
+                raise ValueError(f"LLM itinerary invalid length: got {len(days)} expected {req['num_days']}")
+        except Exception as e:
+            log.error("❌ GROQ STREAM FAILED: %s", e)
+            yield ndjson({"type": "error", "error": str(e)})
+            if not days and good:
+                # Failed before repair finished: report the days the client already has
+                days = [good[n] for n in sorted(good)]
+                missing_days = [n for n in range(1, req["num_days"] + 1) if n not in good]
+
+        yield ndjson({
+            "type": "done",
+            "itinerary": [to_frontend_day(d) for d in days],
+            "llm_cache": llm_cache_status,
+            "missing_days": missing_days,
         })
 
+    return Response(
+        stream_with_context(events()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def ndjson(event: dict) -> str:
+    return json.dumps(event, separators=(",", ":")) + "\n"
 
-    return jsonify({
-        "destination": destination,
-        "dates": f"{depart_date} to {return_date}",
-        "interests": interests,
-        "itinerary": fixed_itinerary,  # ✅ return the converted format
-        "travel_data": {
-            "flights": flights_meta,
-            "transfers": transfers_meta,
-            "hotels": hotels_meta,
-        }
-    }), 200
 
-@app.post("/api/flights")
+def _day_number(d):
+    try:
+        return int(d.get("day"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+@bp.post("/api/flights")
 def flights_route():
-    print("🔥🔥🔥 FLIGHTS ROUTE HIT 🔥🔥🔥", flush=True)
-    body = request.get_json(force=True)
-    print("🔥 body:", body, flush=True)
+    body = request.get_json(force=True) or {}
+    log.debug("🔥 /api/flights body: %s", body)
+
+    # {"origins": [...], "flex_days": N} -> price grid + top offers; otherwise one search
+    matrix_args, error = parse_flight_matrix_request(body)
+    if matrix_args is None and error is None:
+        args, error = parse_flights_request(body)
+    if error:
+        return jsonify({"error": error}), 400
+
+    with timing.stage("flights"):
+        if matrix_args is not None:
+            payload = get_api().search_flights_matrix(**matrix_args)
+        else:
+            payload = get_api().search_flights_clean(**args)
+
+    if isinstance(payload, dict) and payload.get("error"):
+        return jsonify(payload), 400
+
+    if results_writer is not None:
+        results_writer.submit(payload)
+    return jsonify(payload), 200
+
+
+@bp.post("/api/hotels")
+def hotels_route():
+    body = request.get_json(force=True) or {}
+    log.debug("✅ /api/hotels body: %s", body)
+
+    args, error = parse_hotels_request(body)
+    if error:
+        return jsonify({"error": error}), 400
+
+    with timing.stage("hotels"):
+        payload = get_api().search_hotels_clean(**args)
+
+    # If backend returns an error object
+    if isinstance(payload, dict) and payload.get("error"):
+        return jsonify(payload), 400
+
+    return jsonify(payload), 200
+
+@bp.post("/api/transfers")
+def transfers():
+    body = request.get_json(force=True) or {}
+    log.debug("➡️ /api/transfers body: %s", body)
+
+    args, error = parse_transfers_request(body)
+    if error:
+        return jsonify(error), 400
+
+    # Transfers are ground transport: start is usually an AIRPORT code
+    api = get_api()
+    start_iata = api.resolve_iata(args["start_input"]) or "BOS"
+    start_datetime = f"{args['depart_date']}T12:00:00"
+    transfer_body = transfer_offers_body(start_iata, args["end_input"], start_datetime)
+
+    try:
+        with timing.stage("transfers"):
+            resp = api._request("POST", "/v1/shopping/transfer-offers", json_body=transfer_body)
+    except Exception as e:
+        log.exception("❌ TRANSFER CRASH: %s", e)
+        return jsonify({"error": "Transfer request crashed", "message": str(e)}), 500
+
+    payload, status = transfer_offers_result(resp, start_iata, start_datetime, transfer_body)
+    return jsonify(payload), status
+
+
+# ---------------------------
+# Request parsing / response shaping for the provider routes
+# (shared with the async app, asgi_app.py)
+# ---------------------------
+def parse_flights_request(body: dict):
+    """Returns (search_flights_clean kwargs, None) or (None, error message)."""
     origin = body.get("origin", "JFK")
     destination = body.get("destination", "LAX")
     dates = (body.get("dates") or "").strip()
@@ -441,32 +1038,75 @@ def flights_route():
         depart_date = dates
 
     if not depart_date:
-        return jsonify({"error": "Missing/invalid dates. Expected 'YYYY-MM-DD to YYYY-MM-DD'."}), 400
-
-    payload = api.search_flights_clean(
-        origin=origin,
-        destination=destination,
-        depart_date=depart_date,
-        return_date=return_date,
-        budget=budget,
-        adults=1,
-        max_results=5,
-        results_path=RESULTS_PATH,
-    )
-
-    if isinstance(payload, dict) and payload.get("error"):
-        return jsonify(payload), 400
-
-    return jsonify(payload), 200
+        return None, "Missing/invalid dates. Expected 'YYYY-MM-DD to YYYY-MM-DD'."
 
+    return {
+        "origin": origin,
+        "destination": destination,
+        "depart_date": depart_date,
+        "return_date": return_date,
+        "budget": budget,
+        "adults": 1,
+        "max_results": 5,
+    }, None
+
+
+FLIGHT_MATRIX_MAX_FLEX_DAYS = 7
+FLIGHT_MATRIX_MAX_RADIUS_KM = 300
+
+
+def parse_flight_matrix_request(body: dict):
+    """
+    Matrix shape of /api/flights: "origins" (list, or "BOS, PVD" / "BOS or PVD"),
+    "flex_days" (search departures ± that many days) and/or "origin_radius_km"
+    (also search airports that close to the origins). Returns
+    (search_flights_matrix kwargs, None), (None, None) for a plain single
+    search, or (None, error message).
+    """
+    if not {"origins", "flex_days", "origin_radius_km"} & body.keys():
+        return None, None
+
+    args, error = parse_flights_request(body)
+    if error:
+        return None, error
+
+    raw = body.get("origins") or [args["origin"]]
+    if isinstance(raw, str):
+        raw = re.split(r",|\bor\b", raw)
+    origins = [str(o).strip() for o in raw if str(o).strip()]
+    if not origins:
+        return None, "Missing origins."
 
-@app.post("/api/hotels")
-def hotels_route():
-    print("✅ /api/hotels HIT")
+    try:
+        flex_days = int(body.get("flex_days") or 0)
+    except (TypeError, ValueError):
+        return None, "flex_days must be a whole number of days."
+    if not 0 <= flex_days <= FLIGHT_MATRIX_MAX_FLEX_DAYS:
+        return None, f"flex_days must be between 0 and {FLIGHT_MATRIX_MAX_FLEX_DAYS}."
 
-    body = request.get_json(force=True) or {}
-    print("✅ body:", body)
+    try:
+        radius_km = float(body.get("origin_radius_km") or 0)
+    except (TypeError, ValueError):
+        return None, "origin_radius_km must be a number."
+    if not 0 <= radius_km <= FLIGHT_MATRIX_MAX_RADIUS_KM:
+        return None, f"origin_radius_km must be between 0 and {FLIGHT_MATRIX_MAX_RADIUS_KM}."
 
+    return {
+        "origins": origins,
+        "destination": args["destination"],
+        "depart_date": args["depart_date"],
+        "return_date": args["return_date"],
+        "flex_days": flex_days,
+        "budget": args["budget"],
+        "adults": args["adults"],
+        "max_results": args["max_results"],
+        "top_k": 10,
+        "origin_radius_km": radius_km or None,
+    }, None
+
+
+def parse_hotels_request(body: dict):
+    """Returns (search_hotels_clean kwargs, None) or (None, error message)."""
     destination = (body.get("destination") or "").strip()
     dates = (body.get("dates") or "").strip()
 
@@ -487,58 +1127,52 @@ def hotels_route():
         if len(parts) == 2:
             check_in, check_out = parts[0], parts[1]
     else:
-        return jsonify({"error": "Missing/invalid dates. Expected 'YYYY-MM-DD to YYYY-MM-DD'."}), 400
+        return None, "Missing/invalid dates. Expected 'YYYY-MM-DD to YYYY-MM-DD'."
 
     if not destination or not check_in or not check_out:
-        return jsonify({"error": "Missing destination or dates."}), 400
-
-    print("✅ search_hotels_clean CALLED", destination, check_in, check_out, "budget:", budget)
-
-    payload = api.search_hotels_clean(
-        destination=destination,
-        check_in=check_in,
-        check_out=check_out,
-        adults=1,
-        room_quantity=1,
-        budget=budget,
-        max_results=8,
-    )
-
-    # If backend returns an error object
-    if isinstance(payload, dict) and payload.get("error"):
-        return jsonify(payload), 400
+        return None, "Missing destination or dates."
 
-    return jsonify(payload), 200
-
-@app.post("/api/transfers")
-def transfers():
-    print("✅ /api/transfers HIT", flush=True)
-    body = request.get_json(force=True) or {}
-    print("➡️ transfers body:", body, flush=True)
+    # "price" (default), "rating" or "value" (price per star)
+    rank_by = (body.get("sort") or "price").strip().lower()
+    if rank_by not in RANK_KEYS:
+        return None, f"Invalid sort. Expected one of: {', '.join(RANK_KEYS)}."
 
+    return {
+        "destination": destination,
+        "check_in": check_in,
+        "check_out": check_out,
+        "adults": 1,
+        "room_quantity": 1,
+        "budget": budget,
+        "max_results": 8,
+        "rank_by": rank_by,
+    }, None
+
+
+def parse_transfers_request(body: dict):
+    """Returns ({start_input, end_input, depart_date}, None) or (None, error payload)."""
     start_input = (body.get("start_location") or "BOS").strip()
     end_input = (body.get("end_location") or "").strip()
     dates = (body.get("dates") or "").strip()
 
     depart_date, _ = parse_dates(dates)
     if not depart_date:
-        return jsonify({"error": "Dates must include YYYY-MM-DD"}), 400
-
-    # Transfers are ground transport: start is usually an AIRPORT code
-    start_iata = api.resolve_iata(start_input) or "BOS"
+        return None, {"error": "Dates must include YYYY-MM-DD"}
 
     if not end_input:
-        return jsonify({
+        return None, {
             "error": "Missing end_location for transfer search.",
             "hint": "Use an address or city name (e.g., '200 N Spring St, Los Angeles, CA' or 'Los Angeles')."
-        }), 400
+        }
+
+    return {"start_input": start_input, "end_input": end_input, "depart_date": depart_date}, None
 
-    start_datetime = f"{depart_date}T12:00:00"
 
+def transfer_offers_body(start_iata, end_input, start_datetime) -> dict:
     # --- Build Transfers Search BODY (POST /v1/shopping/transfer-offers) ---
     # We don't use endLocationCode; we use destination address fields.
     # Minimal approach: treat end_input as a city and also as the address line if needed.
-    transfer_body = {
+    return {
         "startLocationCode": start_iata,
         "transferType": "PRIVATE",
         "startDateTime": start_datetime,
@@ -557,29 +1191,24 @@ def transfers():
         ],
     }
 
-    print("➡️ transfers body keys:", sorted(transfer_body.keys()), flush=True)
-
-    try:
-        resp = api._request("POST", "/v1/shopping/transfer-offers", json_body=transfer_body)
-    except Exception as e:
-        print("❌ TRANSFER CRASH:", e, flush=True)
-        return jsonify({"error": "Transfer request crashed", "message": str(e)}), 500
 
+def transfer_offers_result(resp, start_iata, start_datetime, transfer_body):
+    """(payload, HTTP status) for a transfer-offers response."""
     if resp.status_code >= 400:
         try:
             details = resp.json()
         except Exception:
             details = resp.text
-        print("❌ TRANSFER HTTP ERROR:", details, flush=True)
-        return jsonify({
+        log.error("❌ TRANSFER HTTP ERROR: %s", details)
+        return {
             "error": "Amadeus transfer request failed",
             "details": details,
             "query": transfer_body
-        }), 502
+        }, 502
 
     payload = resp.json() or {}
     data = payload.get("data", []) or []
-    print(f"✅ Transfers found: {len(data)}", flush=True)
+    log.debug("✅ Transfers found: %d", len(data))
 
     # summarize (lightweight)
     summarized = []
@@ -595,14 +1224,14 @@ def transfers():
             "currency": quotation.get("currency"),
         })
 
-    return jsonify({
+    return {
         "start": start_iata,
         "startDateTime": start_datetime,
         "query": transfer_body,
         "transfers": summarized
-    }), 200
+    }, 200
 
-@app.post("/api/activities")
+@bp.post("/api/activities")
 def activities():
     body = request.get_json(force=True) or {}
     destination = (body.get("destination") or "").strip()
@@ -679,6 +1308,29 @@ def summarize_poi(p):
 
 
 
+# ---------------------------
+# App factory
+# ---------------------------
+def create_app() -> Flask:
+    """
+    Builds the Flask app. Cheap and side-effect free: no network, no file writes;
+    the Amadeus client and its token are created by the first request that needs them.
+    """
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    log.info(
+        "✅ app created: GROQ_API_KEY loaded: %s, GROQ_MODEL: %s, AMADEUS_CLIENT_ID loaded: %s, "
+        "AMADEUS_CLIENT_SECRET loaded: %s, AMADEUS_HOSTNAME: %s",
+        bool(GROQ_API_KEY), GROQ_MODEL, bool((os.getenv("AMADEUS_CLIENT_ID") or "").strip()),
+        bool((os.getenv("AMADEUS_CLIENT_SECRET") or "").strip()), AMADEUS_HOSTNAME,
+    )
+    return app
+
+
+# For `gunicorn app:app` / `flask --app app run`
+app = create_app()
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8000, debug=False)
 
@@ -0,0 +1,504 @@
+"""
+ASGI serving mode for the itinerary API.
+
+Same routes, request bodies and response payloads as app.py (the Flask app),
+but every upstream call (Amadeus, Groq) is awaited instead of blocking a worker
+thread, so one process can hold hundreds of in-flight itinerary requests.
+
+    cd apis && hypercorn asgi_app:app --bind 0.0.0.0:8000
+    (or, one app per worker: hypercorn "asgi_app:create_app()")
+    (or: python asgi_app.py)
+
+Request parsing, prompts, cache keys and response shaping are imported from
+app.py; caches are shared with its (sync) Amadeus client.
+"""
+import os
+import asyncio
+import threading
+
+import httpx
+from quart import Blueprint, Quart, Response, request, jsonify, send_from_directory
+
+import app as wsgi
+from app import (
+    GROQ_CHAT_URL,
+    GROQ_MODEL,
+    PROMPT_DATA_TOKEN_BUDGET,
+    PROVIDER_DEADLINE_S,
+    ROOT_DIR,
+    build_groq_prompt,
+    groq_request,
+    itinerary_is_complete,
+    itinerary_llm_key,
+    itinerary_response,
+    llm_cache,
+    ndjson,
+    observe_request,
+    parse_flight_matrix_request,
+    parse_flights_request,
+    parse_hotels_request,
+    parse_itinerary_request,
+    parse_transfers_request,
+    provider_timeout_meta,
+    raise_for_groq_status,
+    to_frontend_day,
+    transfer_offers_body,
+    transfer_offers_result,
+    travel_data_event,
+    use_parallel_planner,
+    _day_number,
+    _provider_meta,
+)
+from async_amadeus import AsyncAmadeusAPI
+from cache import MISSING
+from llm_json import parse_llm_json
+from llm_stream import ItineraryDayScanner, aiter_sse_content
+from planner import AsyncItineraryPlanner, normalize_day
+from prompt_compact import compact_provider_data
+from log import get_logger
+import metrics
+import timing
+
+log = get_logger(__name__)
+
+bp = Blueprint("itinerary", __name__)
+
+# Async Amadeus client sharing the sync client's caches (resolution, flights, hotels);
+# built on first use like app.get_api()
+_api = None
+_api_lock = threading.Lock()
+
+
+def get_api() -> AsyncAmadeusAPI:
+    global _api
+    if _api is None:
+        with _api_lock:
+            if _api is None:
+                _api = build_async_amadeus_api()
+    return _api
+
+
+def build_async_amadeus_api() -> AsyncAmadeusAPI:
+    shared = wsgi.get_api()
+    api = AsyncAmadeusAPI(
+        client_id=os.getenv("AMADEUS_CLIENT_ID"),
+        client_secret=os.getenv("AMADEUS_CLIENT_SECRET"),
+        hostname=shared.hostname,
+        max_connections=int(os.getenv("AMADEUS_ASYNC_MAX_CONNECTIONS") or 100),
+        resolution_cache=shared.resolution_cache,
+        flight_cache=shared.flight_cache,
+        hotel_list_cache=shared.hotel_list_cache,
+        hotel_offers_cache=shared.hotel_offers_cache,
+        single_flight=shared._inflight is not None,
+        rate_limits=shared.rate_limits or False,
+        hotel_chunk_size=shared.hotel_chunk_size,
+        hotel_max_ids=shared.hotel_max_ids,
+        hotel_offers_concurrency=shared.hotel_offers_concurrency,
+        hotel_early_stop=shared.hotel_early_stop,
+        flight_matrix_concurrency=shared.flight_matrix_concurrency,
+        flight_matrix_max_cells=shared.flight_matrix_max_cells,
+        nearest_airport_km=shared.nearest_airport_km,
+    )
+    metrics.track_tokens("amadeus-async", api._tokens)
+    if api.limiter is not None:
+        metrics.track_limiter("amadeus-async", api.limiter)
+    return api
+
+# One pooled client for Groq; streams hold a connection, not a thread
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_ASYNC_MAX_CONNECTIONS") or 200)
+_groq_client = None
+
+
+def groq_client():
+    global _groq_client
+    if _groq_client is None:
+        _groq_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=GROQ_MAX_CONNECTIONS, max_keepalive_connections=GROQ_MAX_CONNECTIONS),
+        )
+    return _groq_client
+
+
+async def agroq_json(prompt: str) -> dict:
+    headers, body = groq_request(prompt)
+    with metrics.upstream("groq", "chat/completions") as call:
+        r = await groq_client().post(GROQ_CHAT_URL, headers=headers, json=body, timeout=45)
+        call.status = r.status_code
+    raise_for_groq_status(r)
+
+    response = r.json()
+    metrics.record_llm_usage(GROQ_MODEL, response.get("usage"))
+    content = response["choices"][0]["message"]["content"]
+    return parse_llm_json(content)
+
+
+async def agroq_stream(prompt: str):
+    headers, body = groq_request(prompt, stream=True)
+    timeout = httpx.Timeout(45, connect=10)
+    usage = {}
+
+    with metrics.upstream("groq", "chat/completions:stream") as call:
+        async with groq_client().stream("POST", GROQ_CHAT_URL, headers=headers, json=body, timeout=timeout) as r:
+            call.status = r.status_code
+            if r.status_code >= 400:
+                text = (await r.aread()).decode("utf-8", "replace")
+                raise_for_groq_status(r, text)
+
+            async for delta in aiter_sse_content(r, usage):
+                yield delta
+
+    metrics.record_llm_usage(GROQ_MODEL, usage)
+
+
+planner = AsyncItineraryPlanner(
+    llm=lambda prompt: agroq_json(prompt),
+    batch_size=wsgi.parallel_planner.batch_size,
+    max_concurrency=wsgi.parallel_planner.max_concurrency,
+    max_day_retries=wsgi.parallel_planner.max_day_retries,
+)
+
+
+@bp.before_app_request
+async def start_stage_timings():
+    timing.begin()
+
+
+@bp.after_app_request
+async def add_server_timing(response):
+    timings = timing.current()
+    if timings is not None:
+        observe_request(request.url_rule, request.method, response.status_code, timings)
+        if response.mimetype != "application/x-ndjson":
+            response.headers["Server-Timing"] = timings.server_timing()
+    return response
+
+
+@bp.get("/metrics")
+async def metrics_route():
+    return Response(metrics.REGISTRY.render(), mimetype=metrics.CONTENT_TYPE)
+
+
+@bp.after_app_serving
+async def close_clients():
+    if _api is not None:
+        await _api.aclose()
+    if _groq_client is not None:
+        await _groq_client.aclose()
+    if wsgi.results_writer is not None:
+        await asyncio.to_thread(wsgi.results_writer.flush)
+
+
+# ---------------------------
+# Provider fan-out
+# ---------------------------
+async def _meta(coro, label, stage_name):
+    try:
+        with timing.stage(stage_name):
+            return _provider_meta(await coro, label)
+    except Exception as e:
+        return {"source": "ESTIMATE", "data": {}, "notes": f"{label} API crashed: {e}"}
+
+
+async def afetch_transfers(start_location, destination, depart_date):
+    api = get_api()
+    start_iata, end_iata = await asyncio.gather(api.aresolve_iata(start_location), api.aresolve_iata(destination))
+    return await api.asearch_transfers_clean(
+        start_iata=start_iata or "BOS",
+        end_iata=end_iata or "",
+        start_datetime=f"{depart_date}T12:00:00",
+        passengers=1,
+    )
+
+
+async def agather_provider_meta(req, deadline_s=None) -> dict:
+    """gather_provider_meta() as tasks: a provider past the deadline becomes an ESTIMATE timeout."""
+    deadline_s = PROVIDER_DEADLINE_S if deadline_s is None else deadline_s
+    budget = req["budget"] if req["budget"] else None
+    tasks = {
+        "hotels": asyncio.ensure_future(_meta(get_api().asearch_hotels_clean(
+            destination=req["destination"],
+            check_in=req["depart_date"],
+            check_out=req["return_date"],
+            adults=1,
+            room_quantity=1,
+            budget=budget,
+            max_results=8,
+        ), "Hotel", "hotels")),
+        "flights": asyncio.ensure_future(_meta(get_api().asearch_flights_clean(
+            origin=req["origin"],
+            destination=req["destination"],
+            depart_date=req["depart_date"],
+            return_date=req["return_date"],
+            budget=budget,
+            adults=1,
+            max_results=5,
+        ), "Flight", "flights")),
+        "transfers": asyncio.ensure_future(_meta(
+            afetch_transfers(req["start_location"], req["destination"], req["depart_date"]), "Transfers", "transfers"
+        )),
+    }
+    done, _ = await asyncio.wait(tasks.values(), timeout=deadline_s)
+
+    results = {}
+    for name, task in tasks.items():
+        if task in done:
+            results[name] = task.result()
+        else:
+            task.cancel()
+            results[name] = provider_timeout_meta(name, deadline_s)
+    return results
+
+
+async def acached_llm_call(key: str, generate, use_cache=True, cacheable=None):
+    with timing.stage("llm"):
+        if not use_cache:
+            return await generate(), "BYPASS"
+        llm_out, _, status = await llm_cache.aget_or_fetch(key, generate, cacheable=cacheable)
+        return llm_out, status
+
+
+# ---------------------------
+# Frontend routes
+# ---------------------------
+@bp.route("/")
+async def home():
+    return await send_from_directory(ROOT_DIR, "index.html")
+
+@bp.route("/main.js")
+async def serve_main_js():
+    return await send_from_directory(ROOT_DIR, "main.js")
+
+@bp.route("/style.css")
+async def serve_style_css():
+    return await send_from_directory(ROOT_DIR, "style.css")
+
+
+# ---------------------------
+# API routes
+# ---------------------------
+@bp.post("/api/generate-itinerary")
+async def generate_itinerary():
+    body = await request.get_json(force=True) or {}
+
+    req, error = parse_itinerary_request(body)
+    if error:
+        return jsonify({"error": error}), 400
+    num_days = req["num_days"]
+
+    provider_meta = await agather_provider_meta(req)
+    flights_meta = provider_meta["flights"]
+    hotels_meta = provider_meta["hotels"]
+    transfers_meta = provider_meta["transfers"]
+
+    llm_key = itinerary_llm_key(req, flights_meta, hotels_meta, transfers_meta)
+    llm_cache_status = None
+    missing_days = []
+
+    try:
+        if use_parallel_planner(req):
+            data = compact_provider_data(flights_meta, hotels_meta, transfers_meta, PROMPT_DATA_TOKEN_BUDGET)
+            generate = lambda: planner.plan(req, data)
+        else:
+            prompt = build_groq_prompt(req, flights_meta, hotels_meta, transfers_meta)
+
+            async def generate():
+                return await planner.repair(req, await agroq_json(prompt))
+
+        llm_out, llm_cache_status = await acached_llm_call(
+            llm_key,
+            generate,
+            use_cache=req["use_llm_cache"],
+            cacheable=lambda out: itinerary_is_complete(out, num_days),
+        )
+        itinerary = llm_out.get("itinerary", [])
+        missing_days = llm_out.get("missing_days") or []
+    except Exception as e:
+        log.error("❌ GROQ ITINERARY FAILED: %s", e)
+        itinerary = []
+
+    with timing.stage("post"):
+        return jsonify(itinerary_response(req, itinerary, llm_cache_status, missing_days, provider_meta)), 200
+
+
+@bp.post("/api/generate-itinerary/stream")
+async def generate_itinerary_stream():
+    body = await request.get_json(force=True) or {}
+
+    req, error = parse_itinerary_request(body)
+    if error:
+        return jsonify({"error": error}), 400
+    req["mode"] = "single"
+
+    async def events():
+        provider_meta = await agather_provider_meta(req)
+        flights_meta = provider_meta["flights"]
+        hotels_meta = provider_meta["hotels"]
+        transfers_meta = provider_meta["transfers"]
+
+        yield ndjson(travel_data_event(req, provider_meta))
+
+        llm_key = itinerary_llm_key(req, flights_meta, hotels_meta, transfers_meta)
+        llm_cache_status = "BYPASS"
+        days = []
+        missing_days = []
+        good = {}
+
+        try:
+            llm_out = await llm_cache.aget(llm_key) if req["use_llm_cache"] else MISSING
+            if llm_out is not MISSING:
+                llm_cache_status = "HIT"
+                for d in llm_out.get("itinerary", []):
+                    days.append(d)
+                    yield ndjson({"type": "day", "day": to_frontend_day(d)})
+            else:
+                if req["use_llm_cache"]:
+                    llm_cache_status = "MISS"
+                scanner = ItineraryDayScanner()
+                prompt = build_groq_prompt(req, flights_meta, hotels_meta, transfers_meta)
+                stream_failed = False
+                try:
+                    async for chunk in agroq_stream(prompt):
+                        for d in scanner.feed(chunk):
+                            n = _day_number(d)
+                            fixed = normalize_day(d, n) if n is not None else None
+                            if fixed is not None and n not in good and 1 <= n <= req["num_days"]:
+                                good[n] = fixed
+                                yield ndjson({"type": "day", "day": to_frontend_day(fixed)})
+                except Exception as e:
+                    # Days already sent stay; repair() regenerates the rest
+                    log.error("❌ GROQ STREAM FAILED after %d day(s): %s", len(good), e)
+                    stream_failed = True
+
+                try:
+                    llm_out = parse_llm_json(scanner.text)
+                except ValueError:
+                    llm_out = {}
+                llm_out["itinerary"] = list(good.values())
+                llm_out = await planner.repair(req, llm_out)
+                for d in llm_out["itinerary"]:
+                    if _day_number(d) not in good:
+                        yield ndjson({"type": "day", "day": to_frontend_day(d)})
+                days = llm_out["itinerary"]
+                missing_days = llm_out["missing_days"]
+
+                # A cut-off stream has no summary/costs; do not cache it
+                if req["use_llm_cache"] and not stream_failed and itinerary_is_complete(llm_out, req["num_days"]):
+                    await llm_cache.aput(llm_key, llm_out)
+
+            if len(days) != req["num_days"]:
+                raise ValueError(f"LLM itinerary invalid length: got {len(days)} expected {req['num_days']}")
+        except Exception as e:
+            log.error("❌ GROQ STREAM FAILED: %s", e)
+            yield ndjson({"type": "error", "error": str(e)})
+            if not days and good:
+                # Failed before repair finished: report the days the client already has
+                days = [good[n] for n in sorted(good)]
+                missing_days = [n for n in range(1, req["num_days"] + 1) if n not in good]
+
+        yield ndjson({
+            "type": "done",
+            "itinerary": [to_frontend_day(d) for d in days],
+            "llm_cache": llm_cache_status,
+            "missing_days": missing_days,
+        })
+
+    return Response(
+        events(),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bp.post("/api/flights")
+async def flights_route():
+    body = await request.get_json(force=True) or {}
+
+    matrix_args, error = parse_flight_matrix_request(body)
+    if matrix_args is None and error is None:
+        args, error = parse_flights_request(body)
+    if error:
+        return jsonify({"error": error}), 400
+
+    with timing.stage("flights"):
+        if matrix_args is not None:
+            payload = await get_api().asearch_flights_matrix(**matrix_args)
+        else:
+            payload = await get_api().asearch_flights_clean(**args)
+
+    if isinstance(payload, dict) and payload.get("error"):
+        return jsonify(payload), 400
+
+    if wsgi.results_writer is not None:
+        wsgi.results_writer.submit(payload)
+    return jsonify(payload), 200
+
+
+@bp.post("/api/hotels")
+async def hotels_route():
+    body = await request.get_json(force=True) or {}
+
+    args, error = parse_hotels_request(body)
+    if error:
+        return jsonify({"error": error}), 400
+
+    with timing.stage("hotels"):
+        payload = await get_api().asearch_hotels_clean(**args)
+
+    if isinstance(payload, dict) and payload.get("error"):
+        return jsonify(payload), 400
+
+    return jsonify(payload), 200
+
+
+@bp.post("/api/transfers")
+async def transfers():
+    body = await request.get_json(force=True) or {}
+
+    args, error = parse_transfers_request(body)
+    if error:
+        return jsonify(error), 400
+
+    api = get_api()
+    start_iata = await api.aresolve_iata(args["start_input"]) or "BOS"
+    start_datetime = f"{args['depart_date']}T12:00:00"
+    transfer_body = transfer_offers_body(start_iata, args["end_input"], start_datetime)
+
+    try:
+        with timing.stage("transfers"):
+            resp = await api._arequest("POST", "/v1/shopping/transfer-offers", json_body=transfer_body)
+    except Exception as e:
+        log.exception("❌ TRANSFER CRASH: %s", e)
+        return jsonify({"error": "Transfer request crashed", "message": str(e)}), 500
+
+    payload, status = transfer_offers_result(resp, start_iata, start_datetime, transfer_body)
+    return jsonify(payload), status
+
+
+@bp.post("/api/activities")
+async def activities():
+    body = await request.get_json(force=True) or {}
+    destination = (body.get("destination") or "").strip()
+    interests = body.get("interests", [])
+
+    if not destination:
+        return jsonify({"error": "Missing destination"}), 400
+
+    return jsonify({
+        "error": "Activities/POI lookup is unavailable via Amadeus (endpoint is decommissioned).",
+        "suggestion": "Use Google Places API (Text Search + Nearby Search) for activities.",
+        "destination": destination,
+        "interests": interests
+    }), 501
+
+
+def create_app() -> Quart:
+    """Builds the Quart app; like app.create_app(), no network or file writes until requests arrive."""
+    app = Quart(__name__)
+    app.register_blueprint(bp)
+    return app
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=8000, debug=False)
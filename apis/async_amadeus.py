@@ -0,0 +1,412 @@
+import asyncio
+import logging
+import weakref
+
+import httpx
+
+from amadeus_api import IATA_RE, TOKEN_PATH, AmadeusAPI, HotelOffersMerge
+from hotel_rank import HotelRanker
+from cache import MISSING, cache_key
+from log import get_logger
+from ratelimit import AsyncUpstreamLimiter, backoff_delay, endpoint_family
+from singleflight import AsyncSingleFlight
+from token_manager import AsyncTokenManager
+import metrics
+import timing
+
+log = get_logger(__name__)
+
+
+class AsyncAmadeusAPI(AmadeusAPI):
+    """
+    asyncio flavor of AmadeusAPI for the ASGI app (asgi_app.py).
+    Request/response handling, summaries and caches are inherited; only the I/O
+    is async (one pooled httpx.AsyncClient), so an in-flight search holds no thread.
+    The a* methods mirror their sync counterparts and return the same payloads;
+    there is no requests.Session, so the sync request methods are not available.
+    """
+
+    limiter_class = AsyncUpstreamLimiter
+
+    def __init__(self, client_id, client_secret, max_connections=100, client=None, **kwargs):
+        super().__init__(client_id, client_secret, **kwargs)
+        self.max_connections = max_connections
+        self._aclient = client
+        self._ainflight = AsyncSingleFlight() if self._inflight is not None else None
+        # The search pool is a semaphore per event loop here; tasks left running
+        # by a search that stopped early are kept referenced until they finish
+        self._search_semaphores = weakref.WeakKeyDictionary()
+        self._background = set()
+
+    def _build_session(self, **pool):
+        return None
+
+    def _build_token_manager(self, refresh_margin):
+        return AsyncTokenManager(self._afetch_access_token, refresh_margin=refresh_margin)
+
+    @property
+    def aclient(self):
+        # Created on first use so it binds to the serving event loop
+        if self._aclient is None:
+            self._aclient = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=httpx.AsyncHTTPTransport(retries=1),
+            )
+        return self._aclient
+
+    async def aclose(self):
+        for task in list(self._background):
+            task.cancel()
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+
+    def search_semaphore(self) -> asyncio.Semaphore:
+        """search_pool for the event loop: search_pool_size calls at a time, shared by all searches."""
+        loop = asyncio.get_running_loop()
+        sem = self._search_semaphores.get(loop)
+        if sem is None:
+            sem = self._search_semaphores[loop] = asyncio.Semaphore(self.search_pool_size)
+        return sem
+
+    async def _arun_bounded(self, fn, items, limit):
+        """
+        _run_bounded for the event loop, with the same stop semantics: items not
+        submitted yet are never started, submitted ones finish in the background.
+        """
+        shared = self.search_semaphore()
+
+        async def run(item):
+            async with shared:
+                return await fn(item)
+
+        pending = iter(enumerate(items))
+        running = {}
+
+        def submit_next():
+            for i, item in pending:
+                running[asyncio.ensure_future(run(item))] = i
+                return
+
+        for _ in range(limit):
+            submit_next()
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=running.get):
+                    yield running.pop(task), task
+                    submit_next()
+        finally:
+            for task in running:
+                self._background.add(task)
+                task.add_done_callback(self._background_done)
+
+    def _background_done(self, task):
+        self._background.discard(task)
+        if not task.cancelled():
+            task.exception()  # nobody awaits it; retrieve so asyncio does not warn
+
+    # =========================================================
+    # AUTH + REQUESTS
+    # =========================================================
+    async def _afetch_access_token(self):
+        with metrics.upstream("amadeus", TOKEN_PATH) as call:
+            response = await self.aclient.post(
+                self._token_url(),
+                data={"grant_type": "client_credentials"},
+                auth=(self.client_id or "", self.client_secret or ""),
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                timeout=20,
+            )
+            call.status = response.status_code
+        return self._token_from_response(response)
+
+    async def _arequest(self, method, path, *, params=None, json_body=None, timeout=20):
+        """Async _request: same 401 -> single-flight refresh -> retry once, same GET coalescing."""
+        key = self._inflight_key(method, path, params, json_body)
+        if key is None:
+            return await self._asend(method, path, params, json_body, timeout)
+
+        resp, shared = await self._ainflight.do(key, lambda: self._asend(method, path, params, json_body, timeout))
+        if shared:
+            metrics.UPSTREAM_COALESCED.inc(service="amadeus", endpoint=path)
+        return resp
+
+    async def _asend(self, method, path, params, json_body, timeout):
+        log.debug("AMADEUS REQ %s %s params=%s", method, path, params)
+        url = f"{self._base_url()}{path}"
+        family = endpoint_family(path)
+
+        async def do_request(token):
+            async with self._throttle(family):
+                with metrics.upstream("amadeus", path) as call:
+                    resp = await self.aclient.request(
+                        method,
+                        url,
+                        headers=self._headers(json_content=(json_body is not None), token=token),
+                        params=params,
+                        json=json_body,
+                        timeout=timeout,
+                    )
+                    call.status = resp.status_code
+            self._observe_status(resp.status_code)
+            return resp
+
+        for attempt in range(self.max_throttle_retries + 1):
+            token = await self._tokens.get()
+            resp = await do_request(token)
+
+            if resp.status_code == 401:
+                metrics.UPSTREAM_RETRIES.inc(service="amadeus", reason="401")
+                token = await self._tokens.invalidate(token)
+                resp = await do_request(token)
+
+            delay = self._throttle_retry_delay(resp, path, attempt)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+
+        return resp
+
+    # =========================================================
+    # IATA resolution
+    # =========================================================
+    async def _acached_resolution(self, query: str, preference: str, resolve):
+        key = self._resolution_key(query, preference)
+        cached = self.resolution_cache.get(key)
+        if cached is not MISSING:
+            return cached
+
+        with timing.stage("resolve"):
+            code, authoritative = await resolve()
+        return self._remember_resolution(key, code, authoritative)
+
+    async def _alocations_lookup(self, query: str, sub_type: str):
+        params = self._locations_params(query, sub_type)
+        resp = await self._arequest("GET", "/v1/reference-data/locations", params=params)
+        return self._locations_payload(resp)
+
+    async def aresolve_iata(self, query: str):
+        if not query:
+            return None
+
+        q = query.strip().upper()
+        if IATA_RE.match(q):
+            return q
+
+        return await self._acached_resolution(query, "CITY>AIRPORT", lambda: self._aresolve_iata_uncached(query))
+
+    async def _aresolve_iata_uncached(self, query: str):
+        ok = False
+        try:
+            data, ok = await self._alocations_lookup(query, "CITY,AIRPORT")
+            code = self._pick_location(data, ("CITY", "AIRPORT"))
+            if code:
+                return code, True
+        except Exception:
+            pass
+
+        return self._resolve_iata_local(query), ok
+
+    # =========================================================
+    # Flights
+    # =========================================================
+    async def asearch_flights_clean(
+        self,
+        origin,
+        destination,
+        depart_date,
+        return_date=None,
+        adults=1,
+        budget=None,
+        currency="USD",
+        max_results=5,
+        results_path=None,
+        non_stop=None,
+    ):
+        origin_code, dest_code = await asyncio.gather(self.aresolve_iata(origin), self.aresolve_iata(destination))
+        origin_code = origin_code or "JFK"
+
+        if not dest_code:
+            return {"error": f"Could not resolve destination '{destination}'"}
+
+        params = self._flight_search_params(
+            origin_code, dest_code, depart_date, return_date, adults, budget, currency, max_results, non_stop
+        )
+
+        payload, age, status = await self._acached_flight_offers(params, origin_code, dest_code, depart_date, return_date)
+
+        result_payload = self._flight_result(payload, age, status)
+        if results_path and not result_payload.get("error"):
+            await asyncio.to_thread(self.save_json, result_payload, results_path)
+        return result_payload
+
+    async def _acached_flight_offers(self, params, origin_code, dest_code, depart_date, return_date):
+        return await self.flight_cache.aget_or_fetch(
+            cache_key("flight-offers", params),
+            lambda: self._afetch_flight_offers(params, origin_code, dest_code, depart_date, return_date),
+            cacheable=lambda v: not v.get("error"),
+        )
+
+    async def asearch_flights_matrix(
+        self,
+        origins,
+        destination,
+        depart_date,
+        return_date=None,
+        flex_days=0,
+        adults=1,
+        budget=None,
+        currency="USD",
+        max_results=5,
+        top_k=10,
+        non_stop=None,
+        origin_radius_km=None,
+    ):
+        codes = await asyncio.gather(self.aresolve_iata(destination), *(self.aresolve_iata(o) for o in origins))
+        dest_code, origin_codes = codes[0], list(zip(origins, codes[1:]))
+        plan = self._flight_matrix_plan(
+            origin_codes, destination, dest_code, depart_date, return_date, flex_days,
+            adults, budget, currency, max_results, non_stop, origin_radius_km,
+        )
+        if plan.get("error"):
+            return plan
+
+        async def run(cell):
+            try:
+                payload, _, status = await self._acached_flight_offers(
+                    cell["params"], cell["origin"], dest_code, cell["depart_date"], cell["return_date"]
+                )
+                return payload, status
+            except Exception as e:
+                return {"error": f"Flight search crashed: {e}"}, None
+
+        cells = plan["cells"]
+        results = [None] * len(cells)
+        async for i, task in self._arun_bounded(run, cells, self.flight_matrix_concurrency):
+            results[i] = task.result()
+        return self._flight_matrix_result(plan, results, top_k)
+
+    async def _afetch_flight_offers(self, params, origin_code, dest_code, depart_date, return_date):
+        async def _do_call(p):
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("✈️ FLIGHT PARAMS SENT: %s", sorted(p))
+            resp = await self._arequest("GET", "/v2/shopping/flight-offers", params=p)
+            return resp, self._flight_response_payload(resp)
+
+        resp, payload = await _do_call(dict(params))
+
+        if resp.status_code >= 400 and self._amadeus_error_code(payload) == "141":
+            log.warning("🔁 Amadeus returned code 141. Retrying once with narrowing filters...")
+            metrics.UPSTREAM_RETRIES.inc(service="amadeus", reason="141")
+            narrowed = self._narrow_flight_params(params)
+
+            await asyncio.sleep(backoff_delay(1))  # jittered, up to 0.5s
+            resp, payload = await _do_call(narrowed)
+
+            if resp.status_code < 400:
+                params = narrowed
+
+        return self._flight_offers_payload(resp, payload, params, origin_code, dest_code, depart_date, return_date)
+
+    # =========================================================
+    # Hotels
+    # =========================================================
+    async def asearch_hotels_clean(
+        self,
+        destination,
+        check_in,
+        check_out,
+        adults=1,
+        room_quantity=1,
+        budget=None,
+        currency="USD",
+        max_results=8,
+        rank_by="price",
+    ):
+        ranker = HotelRanker(max_results, rank_by=rank_by, budget=self._hotel_budget_total(budget))
+        city_code = await self.aresolve_iata(destination.split(",")[0].strip())
+        if not city_code:
+            return {"error": f"Could not resolve destination '{destination}'"}
+
+        list_params = {"cityCode": city_code, "radius": 20, "radiusUnit": "KM"}
+        hotel_list_payload, _, list_cache = await self.hotel_list_cache.aget_or_fetch(
+            cache_key("hotels-by-city", list_params),
+            lambda: self._afetch_hotel_ids(list_params),
+            cacheable=lambda v: not v.get("errors"),
+        )
+
+        if hotel_list_payload.get("errors"):
+            return {"error": "Amadeus request failed", "details": hotel_list_payload}
+
+        hotel_ids = (hotel_list_payload.get("hotelIds") or [])[: self.hotel_max_ids]
+        if not hotel_ids:
+            return {
+                "destination": destination,
+                "city_code": city_code,
+                "check_in": check_in,
+                "check_out": check_out,
+                "hotels": [],
+            }
+
+        chunks = self._hotel_offer_chunks(hotel_ids, check_in, check_out, adults, room_quantity, currency)
+        merge = HotelOffersMerge(ranker, early_stop=self.hotel_early_stop)
+        await self._afetch_hotel_offer_chunks(chunks, merge)
+
+        if merge.failed:
+            return {"error": "Amadeus request failed", "details": merge.errors[0]}
+
+        return self._hotel_results(destination, city_code, check_in, check_out, merge, list_cache)
+
+    async def _acached_hotel_offers(self, offers_params):
+        payload, _, status = await self.hotel_offers_cache.aget_or_fetch(
+            cache_key("hotel-offers", offers_params),
+            lambda: self._afetch_hotel_offers(offers_params),
+            cacheable=lambda v: not v.get("errors"),
+        )
+        return payload, status
+
+    async def _afetch_hotel_offer_chunks(self, chunks, merge):
+        """
+        _fetch_hotel_offer_chunks for the event loop: once `merge` is done, chunks not
+        submitted yet are dropped and ones already submitted finish in the background.
+        """
+        completed = self._arun_bounded(self._acached_hotel_offers, chunks, self.hotel_offers_concurrency)
+        try:
+            async for i, task in completed:
+                try:
+                    merge.add(i, *task.result())
+                except Exception as e:
+                    merge.add_exception(i, e)
+                if merge.done:
+                    break
+        finally:
+            await completed.aclose()
+        merge.raise_if_nothing()
+
+    async def _afetch_hotel_ids(self, list_params):
+        resp = await self._arequest("GET", "/v1/reference-data/locations/hotels/by-city", params=list_params, timeout=25)
+        return self._hotel_ids_payload(resp)
+
+    async def _afetch_hotel_offers(self, offers_params):
+        resp = await self._arequest("GET", "/v3/shopping/hotel-offers", params=offers_params, timeout=35)
+        return self._hotel_offers_payload(resp)
+
+    # =========================================================
+    # Transfers
+    # =========================================================
+    async def asearch_transfers_clean(self, start_iata, end_iata, start_datetime, passengers=1,
+                                      transfer_type="PRIVATE", currency="USD", max_results=10):
+        params = {
+            "startLocationCode": start_iata,
+            "endLocationCode": end_iata,
+            "startDateTime": start_datetime,
+            "passengers": passengers,
+            "transferType": transfer_type,
+            "currency": currency,
+        }
+        r = await self._arequest("GET", "/v1/shopping/transfers", params=params)
+        return self._transfers_payload(r, start_iata, end_iata, start_datetime, max_results)
@@ -0,0 +1,510 @@
+"""
+End-to-end benchmark for the itinerary API against the offline stand-in backend.
+
+Starts standin_server.py and the app in-process (Flask/WSGI by default, or the
+ASGI app with --server asgi), drives /api/generate-itinerary, /api/flights,
+/api/hotels and /api/transfers at the requested concurrency and reports, per
+scenario:
+  - latency p50/p95/p99/mean/max and throughput (req/s)
+  - per-stage breakdown from the Server-Timing header
+    (resolve, hotels, flights, transfers, llm, post, total)
+  - peak RSS of the serving process while the scenario ran
+With --startup N it also starts the app N times in fresh interpreters and
+reports cold-start time: module import, create_app(), and the first request
+(which builds the Amadeus client and fetches its token).
+Results are written as JSON (--out) and can be diffed against an earlier run
+with --compare.
+
+    cd apis && python benchmark.py --concurrency 16 --requests 200 --out ../bench_results/baseline.json
+    cd apis && python benchmark.py --compare ../bench_results/baseline.json --out ../bench_results/new.json
+    cd apis && python benchmark.py --scenarios= --startup 20
+
+Use --target URL (and optionally --target-pid) to benchmark an app that is
+already running against a stand-in.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import platform
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+SCENARIOS = ("itinerary", "flights", "hotels", "transfers")
+ROUTES = {
+    "itinerary": "/api/generate-itinerary",
+    "flights": "/api/flights",
+    "hotels": "/api/hotels",
+    "transfers": "/api/transfers",
+}
+CITIES = [
+    ("Paris", "CDG"), ("London", "LHR"), ("Rome", "FCO"), ("Tokyo", "NRT"), ("Lisbon", "LIS"),
+    ("Berlin", "BER"), ("Madrid", "MAD"), ("Chicago", "ORD"), ("Sydney", "SYD"), ("Toronto", "YYZ"),
+    ("Dublin", "DUB"), ("Vienna", "VIE"), ("Prague", "PRG"), ("Athens", "ATH"), ("Seoul", "ICN"),
+    ("Bangkok", "BKK"),
+]
+
+
+# ---------------------------
+# Stats helpers
+# ---------------------------
+def percentile(sorted_values, p):
+    """Linear-interpolated percentile (p in 0..100) of an already sorted list."""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize_ms(values) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 2),
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "max": round(values[-1], 2),
+    }
+
+
+def parse_server_timing(header) -> dict:
+    """'llm;dur=840.1, total;dur=901.2' -> {"llm": 840.1, "total": 901.2}"""
+    stages = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                try:
+                    stages[name] = float(value)
+                except ValueError:
+                    pass
+    return stages
+
+
+def rss_mb(pid=None):
+    """Current resident set size of `pid` (default: this process) in MB, from /proc; None if unavailable."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        return None
+    return None
+
+
+class RssSampler:
+    """Tracks the peak RSS of a process while a scenario runs."""
+
+    def __init__(self, pid=None, interval=0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak = rss_mb(pid)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            current = rss_mb(self.pid)
+            if current is not None and (self.peak is None or current > self.peak):
+                self.peak = current
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# ---------------------------
+# Workload
+# ---------------------------
+def request_bodies(scenario, n, distinct, days, no_llm_cache):
+    """n request bodies cycling over `distinct` destinations/date windows (controls cache hit ratio)."""
+    base = datetime(2026, 11, 2)
+    bodies = []
+    for i in range(n):
+        k = i % max(1, distinct)
+        city, airport = CITIES[k % len(CITIES)]
+        start = base + timedelta(days=7 * (k // len(CITIES)))
+        end = start + timedelta(days=days - 1)
+        dates = f"{start:%Y-%m-%d} to {end:%Y-%m-%d}"
+        if scenario == "itinerary":
+            body = {"destination": city, "dates": dates, "origin": "BOS", "start_location": "BOS",
+                    "budget": "4000", "interests": ["🏛️ Sightseeing", "🍽️ Food"], "no_cache": no_llm_cache}
+        elif scenario == "flights":
+            body = {"origin": "BOS", "destination": city, "dates": dates, "budget": 2500}
+        elif scenario == "hotels":
+            body = {"destination": city, "dates": dates, "budget": "4000"}
+        else:
+            body = {"start_location": airport, "end_location": city, "dates": f"{start:%Y-%m-%d}"}
+        bodies.append(body)
+    return bodies
+
+
+def run_scenario(base_url, scenario, bodies, concurrency, timeout, pid=None) -> dict:
+    local = threading.local()
+
+    def session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    def one(body):
+        t0 = time.perf_counter()
+        try:
+            r = session().post(base_url + ROUTES[scenario], json=body, timeout=timeout)
+            status, timing_header = r.status_code, r.headers.get("Server-Timing")
+            _ = r.content
+        except requests.RequestException as e:
+            status, timing_header = type(e).__name__, None
+        return (time.perf_counter() - t0) * 1000.0, status, parse_server_timing(timing_header)
+
+    with RssSampler(pid) as sampler:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as pool:
+            results = list(pool.map(one, bodies))
+        wall_s = time.perf_counter() - t0
+
+    statuses = {}
+    for _, status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    ok = [lat for lat, status, _ in results if isinstance(status, int) and status < 400]
+
+    stage_values = {}
+    for _, _, stages in results:
+        for name, dur in stages.items():
+            stage_values.setdefault(name, []).append(dur)
+
+    return {
+        "route": ROUTES[scenario],
+        "requests": len(results),
+        "concurrency": concurrency,
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(results) / wall_s, 2) if wall_s else None,
+        "errors": len(results) - len(ok),
+        "status_codes": statuses,
+        "latency_ms": summarize_ms([lat for lat, _, _ in results]),
+        "latency_ok_ms": summarize_ms(ok),
+        "stages_ms": {name: summarize_ms(vals) for name, vals in sorted(stage_values.items())},
+        "peak_rss_mb": round(sampler.peak, 1) if sampler.peak is not None else None,
+    }
+
+
+# ---------------------------
+# In-process servers
+# ---------------------------
+def configure_environment(standin_url, args):
+    """Env for the app under test; must run before app.py is imported."""
+    os.environ.update({
+        "AMADEUS_HOSTNAME": standin_url,
+        "GROQ_BASE_URL": f"{standin_url}/openai/v1",
+        "GROQ_API_KEY": "standin",
+        "AMADEUS_CLIENT_ID": "standin",
+        "AMADEUS_CLIENT_SECRET": "standin",
+        # Only what is set here: a developer's .env must not point the app at real APIs
+        "ITINERARY_ENV_FILE": "off",
+        # Keep benchmark flights out of the checked-in flight_results.json
+        "FLIGHT_RESULTS_PATH": os.path.join(tempfile.gettempdir(), "bench_flight_results.json"),
+        "FLIGHT_RESULTS_DIR": os.path.join(tempfile.gettempdir(), "bench_flight_results"),
+        "AMADEUS_RATE_LIMIT_PROFILE": args.rate_limits,
+    })
+    if args.cold:
+        # Every request goes upstream: no response caches, no LLM cache
+        for var in ("FLIGHT_CACHE_TTL_S", "HOTEL_LIST_CACHE_TTL_S", "HOTEL_OFFERS_CACHE_TTL_S", "LLM_CACHE_TTL_S"):
+            os.environ[var] = "0"
+
+
+def serve_wsgi():
+    from werkzeug.serving import make_server
+    import app as wsgi_app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, wsgi_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-wsgi", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server.shutdown
+
+
+def serve_asgi():
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    import asgi_app
+
+    config = Config()
+    config.bind = ["127.0.0.1:0"]
+    config.loglevel = "ERROR"
+    ready = threading.Event()
+    state = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        stop = asyncio.Event()
+        state["loop"], state["stop"] = loop, stop
+
+        async def main():
+            # Bind ourselves so the chosen port is known
+            import socket
+            sock = socket.socket()
+            sock.bind(("127.0.0.1", 0))
+            state["port"] = sock.getsockname()[1]
+            sock.close()
+            config.bind = [f"127.0.0.1:{state['port']}"]
+            ready.set()
+            await serve(asgi_app.app, config, shutdown_trigger=stop.wait)
+
+        loop.run_until_complete(main())
+
+    threading.Thread(target=run, name="bench-asgi", daemon=True).start()
+    ready.wait()
+    base = f"http://127.0.0.1:{state['port']}"
+    for _ in range(100):
+        try:
+            requests.get(base + "/main.js", timeout=1)
+            break
+        except requests.RequestException:
+            time.sleep(0.05)
+    return base, lambda: state["loop"].call_soon_threadsafe(state["stop"].set)
+
+
+# ---------------------------
+# Cold start
+# ---------------------------
+# Runs in a fresh interpreter; prints one JSON line of timings
+STARTUP_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module} as target
+t1 = time.perf_counter()
+app = target.create_app()
+t2 = time.perf_counter()
+{first_request}
+t3 = time.perf_counter()
+print(json.dumps({{"import_ms": (t1 - t0) * 1000, "create_app_ms": (t2 - t1) * 1000,
+                  "first_request_ms": (t3 - t2) * 1000, "status": status}}))
+"""
+FIRST_REQUEST = {
+    "wsgi": 'status = app.test_client().post("/api/flights", json=json.loads(sys.argv[1])).status_code',
+    "asgi": (
+        "import asyncio\n"
+        "async def first():\n"
+        '    return (await app.test_client().post("/api/flights", json=json.loads(sys.argv[1]))).status_code\n'
+        "status = asyncio.run(first())"
+    ),
+}
+
+
+def measure_startup(server, runs, timeout) -> dict:
+    """Cold-start timings of `runs` fresh processes (env must already point at the stand-in)."""
+    probe = STARTUP_PROBE.format(
+        module="asgi_app" if server == "asgi" else "app", first_request=FIRST_REQUEST[server],
+    )
+    body = json.dumps(request_bodies("flights", 1, 1, 3, True)[0])
+    samples = {"process_ms": [], "import_ms": [], "create_app_ms": [], "first_request_ms": []}
+    errors = 0
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", probe, body], capture_output=True, text=True, timeout=timeout,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        wall_ms = (time.perf_counter() - t0) * 1000
+        try:
+            timings = json.loads(proc.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            errors += 1
+            print(f"startup probe failed (exit {proc.returncode}): {proc.stderr.strip()[-500:]}", file=sys.stderr)
+            continue
+        if timings.pop("status") >= 400:
+            errors += 1
+        samples["process_ms"].append(wall_ms)
+        for name, value in timings.items():
+            samples[name].append(value)
+
+    return {"runs": runs, "errors": errors, **{name: summarize_ms(values) for name, values in samples.items()}}
+
+
+# ---------------------------
+# Reporting
+# ---------------------------
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def pct_delta(new, old):
+    if new is None or not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def print_report(report, baseline=None, out=sys.stderr):
+    base_scenarios = (baseline or {}).get("scenarios", {})
+    print(f"\nbenchmark {report['meta']['revision']} ({report['meta']['server']}, "
+          f"concurrency {report['meta']['concurrency']})", file=out)
+    for name, r in report["scenarios"].items():
+        lat = r["latency_ms"]
+        line = (f"  {name:<10} {r['throughput_rps']:>8} req/s  p50 {lat.get('p50')}ms  p95 {lat.get('p95')}ms  "
+                f"p99 {lat.get('p99')}ms  errors {r['errors']}/{r['requests']}  peak RSS {r['peak_rss_mb']}MB")
+        print(line, file=out)
+        stages = "  ".join(f"{k} {v.get('p50')}" for k, v in r["stages_ms"].items())
+        if stages:
+            print(f"  {'':<10} stages p50 (ms): {stages}", file=out)
+
+        b = base_scenarios.get(name)
+        if b:
+            print(f"  {'':<10} vs baseline: throughput {pct_delta(r['throughput_rps'], b['throughput_rps'])}  "
+                  f"p50 {pct_delta(lat.get('p50'), b['latency_ms'].get('p50'))}  "
+                  f"p95 {pct_delta(lat.get('p95'), b['latency_ms'].get('p95'))}  "
+                  f"p99 {pct_delta(lat.get('p99'), b['latency_ms'].get('p99'))}", file=out)
+
+    startup = report.get("startup")
+    if startup:
+        base_startup = (baseline or {}).get("startup") or {}
+        print(f"  startup ({startup['runs']} runs, errors {startup['errors']}):", file=out)
+        for name in ("process_ms", "import_ms", "create_app_ms", "first_request_ms"):
+            s = startup[name]
+            line = f"    {name:<17} p50 {s.get('p50')}ms  max {s.get('max')}ms"
+            if base_startup.get(name):
+                line += f"  vs baseline p50 {pct_delta(s.get('p50'), base_startup[name].get('p50'))}"
+            print(line, file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark for the itinerary API")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests per scenario")
+    parser.add_argument("--distinct", type=int, default=8, help="distinct queries per scenario (lower = more cache hits)")
+    parser.add_argument("--days", type=int, default=4, help="trip length in days")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--cold", action="store_true", help="disable response and LLM caches in the app under test")
+    parser.add_argument("--llm-cache", action="store_true", help="let itinerary requests use the LLM cache")
+    parser.add_argument("--server", choices=("wsgi", "asgi"), default="wsgi")
+    parser.add_argument("--target", help="benchmark an already running app at this URL instead")
+    parser.add_argument("--target-pid", type=int, help="pid of --target, for RSS sampling")
+    parser.add_argument("--latency-ms", type=float, default=120.0, help="stand-in Amadeus latency")
+    parser.add_argument("--groq-latency-ms", type=float, default=400.0, help="stand-in Groq time to first token")
+    parser.add_argument("--groq-tokens-per-s", type=float, default=600.0)
+    parser.add_argument("--error-141-rate", type=float, default=0.0)
+    parser.add_argument("--error-401-rate", type=float, default=0.0)
+    parser.add_argument("--quota-rps", type=float, help="stand-in answers 429 above this many Amadeus requests/s")
+    parser.add_argument("--rate-limits", choices=("test", "production", "off"), default="production",
+                        help="client-side Amadeus rate limit profile of the app under test")
+    parser.add_argument("--startup", type=int, default=0, metavar="N",
+                        help="also measure cold start (import, create_app, first request) over N fresh processes")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's own LOG_LEVEL (default: WARNING)")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to diff against")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    # The app logs at INFO; keep per-request logging out of the measurements unless asked
+    if not args.verbose:
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+    stop_server = None
+    pid = args.target_pid
+    if args.target:
+        base_url = args.target.rstrip("/")
+        standin_config = None
+    else:
+        import standin_server
+
+        standin_config = standin_server.StandInConfig(
+            latency_ms=args.latency_ms,
+            groq_latency_ms=args.groq_latency_ms,
+            groq_tokens_per_s=args.groq_tokens_per_s,
+            error_141_rate=args.error_141_rate,
+            error_401_rate=args.error_401_rate,
+            quota_rps=args.quota_rps,
+        )
+        _, standin_url = standin_server.start_in_thread(standin_config)
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        configure_environment(standin_url, args)
+        base_url, stop_server = serve_asgi() if args.server == "asgi" else serve_wsgi()
+        pid = os.getpid()
+
+    results = {}
+    for scenario in scenarios:
+        warm = request_bodies(scenario, args.warmup, args.distinct, args.days, not args.llm_cache)
+        if warm:
+            run_scenario(base_url, scenario, warm, args.concurrency, args.timeout)
+        bodies = request_bodies(scenario, args.requests, args.distinct, args.days, not args.llm_cache)
+        results[scenario] = run_scenario(base_url, scenario, bodies, args.concurrency, args.timeout, pid=pid)
+
+    if stop_server:
+        stop_server()
+
+    startup = None
+    if args.startup and not args.target:
+        startup = measure_startup(args.server, args.startup, args.timeout)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "server": "external" if args.target else args.server,
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "distinct_queries": args.distinct,
+            "trip_days": args.days,
+            "cold": args.cold,
+            "llm_cache": args.llm_cache,
+            "rate_limits": None if args.target else args.rate_limits,
+            "standin": standin_config.as_dict() if standin_config else None,
+            # Lifetime peak of the benchmark process (harness + stand-in + in-process app)
+            "process_max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+        },
+        "scenarios": results,
+    }
+    if startup:
+        report["startup"] = startup
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    print_report(report, baseline)
+    if not args.out:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+from log import get_logger
+
+log = get_logger(__name__)
+
+# Returned by get() on a miss, so a cached None (negative result) is distinguishable
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache with per-entry expiry.
+    - values expire after `ttl` seconds; None values ("not found") use `negative_ttl`
+    - the least recently used entry is evicted once `maxsize` is reached
+    - hit/miss counters are exposed through stats()
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600, negative_ttl=300, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=MISSING):
+        now = self._clock()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            if value is None:
+                self.negative_hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (self._clock() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+# =========================================================
+# Response caches (stale-while-revalidate, pluggable storage)
+# =========================================================
+def cache_key(prefix: str, params) -> str:
+    """Canonical key for a params dict: same params in any order -> same key."""
+    return f"{prefix}:{json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)}"
+
+
+class MemoryBackend:
+    """In-process LRU store of key -> (stored_at, value)."""
+
+    blocking = False
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, stored_at, value):
+        with self._lock:
+            self._data[key] = (stored_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskBackend:
+    """
+    One JSON file per key under `directory`, so entries survive restarts and
+    are shared between worker processes. Values must be JSON-serializable.
+    Async callers of ResponseCache run its file I/O in a worker thread (`blocking`).
+    """
+
+    blocking = True
+
+    def __init__(self, directory, max_age=24 * 3600):
+        self.directory = directory
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        stored_at = entry.get("stored_at") or 0
+        if time.time() - stored_at > self.max_age:
+            self.delete(key)
+            return None
+        return stored_at, entry.get("value")
+
+    def set(self, key, stored_at, value):
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "stored_at": stored_at, "value": value}, f, separators=(",", ":"))
+            os.replace(tmp, path)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def __len__(self):
+        return sum(1 for n in os.listdir(self.directory) if n.endswith(".json"))
+
+
+class ResponseCache:
+    """
+    TTL cache for upstream responses with stale-while-revalidate.
+    - age < ttl: served as-is ("HIT")
+    - ttl <= age < ttl + stale_ttl: served immediately ("STALE") while one
+      background thread refetches the entry
+    - older / absent: fetched synchronously ("MISS")
+    A ttl of 0 disables caching ("BYPASS").
+    """
+
+    def __init__(self, backend=None, ttl=300, stale_ttl=600, name="cache"):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.name = name
+
+        self._refreshing = set()
+        self._tasks = set()          # strong refs to async revalidation tasks
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    def get_or_fetch(self, key, fetch, cacheable=None):
+        """
+        Returns (value, age_seconds, status). `fetch()` produces a fresh value;
+        `cacheable(value)` decides whether it is stored (e.g. skip error payloads).
+        """
+        if not self.enabled:
+            return fetch(), 0.0, "BYPASS"
+
+        entry = self.backend.get(key)
+        now = time.time()
+        if entry is not None:
+            stored_at, value = entry
+            age = max(0.0, now - stored_at)
+            if age < self.ttl:
+                self._count("hits")
+                return value, age, "HIT"
+            if age < self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                self._revalidate(key, fetch, cacheable)
+                return value, age, "STALE"
+
+        self._count("misses")
+        value = fetch()
+        self._store(key, value, cacheable)
+        return value, 0.0, "MISS"
+
+    async def aget_or_fetch(self, key, fetch, cacheable=None):
+        """
+        get_or_fetch() for async callers: `fetch` is a coroutine function, revalidation
+        runs as a task, and a blocking backend is read/written off the event loop.
+        """
+        if not self.enabled:
+            return await fetch(), 0.0, "BYPASS"
+
+        entry = await self._abackend("get", key)
+        now = time.time()
+        if entry is not None:
+            stored_at, value = entry
+            age = max(0.0, now - stored_at)
+            if age < self.ttl:
+                self._count("hits")
+                return value, age, "HIT"
+            if age < self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                self._arevalidate(key, fetch, cacheable)
+                return value, age, "STALE"
+
+        self._count("misses")
+        value = await fetch()
+        await self._astore(key, value, cacheable)
+        return value, 0.0, "MISS"
+
+    def get(self, key):
+        """Fresh value for `key` (age < ttl), or MISSING. No background refresh."""
+        if not self.enabled:
+            return MISSING
+        return self._fresh(self.backend.get(key))
+
+    async def aget(self, key):
+        if not self.enabled:
+            return MISSING
+        return self._fresh(await self._abackend("get", key))
+
+    def put(self, key, value):
+        if self.enabled:
+            self._store(key, value, None)
+
+    async def aput(self, key, value):
+        if self.enabled:
+            await self._astore(key, value, None)
+
+    def invalidate(self, key):
+        self.backend.delete(key)
+
+    def _fresh(self, entry):
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            self._count("hits")
+            return entry[1]
+        self._count("misses")
+        return MISSING
+
+    def _store(self, key, value, cacheable):
+        if cacheable is not None and not cacheable(value):
+            return
+        try:
+            self.backend.set(key, time.time(), value)
+        except Exception as e:
+            log.warning("⚠️ %s: could not store entry: %s", self.name, e)
+
+    async def _astore(self, key, value, cacheable):
+        if cacheable is not None and not cacheable(value):
+            return
+        try:
+            await self._abackend("set", key, time.time(), value)
+        except Exception as e:
+            log.warning("⚠️ %s: could not store entry: %s", self.name, e)
+
+    async def _abackend(self, method, *args):
+        """Backend call from async code; file-backed stores run in a worker thread."""
+        call = getattr(self.backend, method)
+        if getattr(self.backend, "blocking", False):
+            return await asyncio.to_thread(call, *args)
+        return call(*args)
+
+    def _revalidate(self, key, fetch, cacheable):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self._store(key, fetch(), cacheable)
+                self._count("refreshes")
+            except Exception as e:
+                self._count("refresh_failures")
+                log.warning("⚠️ %s: background refresh failed: %s", self.name, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name=f"{self.name}-revalidate", daemon=True).start()
+
+    def _arevalidate(self, key, fetch, cacheable):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        async def run():
+            try:
+                await self._astore(key, await fetch(), cacheable)
+                self._count("refreshes")
+            except Exception as e:
+                self._count("refresh_failures")
+                log.warning("⚠️ %s: background refresh failed: %s", self.name, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _count(self, counter):
+        # Lookups and refreshes run on many threads; += on an attribute is not atomic
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, stale_hits, misses = self.hits, self.stale_hits, self.misses
+            refreshes, refresh_failures = self.refreshes, self.refresh_failures
+        lookups = hits + stale_hits + misses
+        return {
+            "size": len(self.backend),
+            "hits": hits,
+            "stale_hits": stale_hits,
+            "misses": misses,
+            "refreshes": refreshes,
+            "refresh_failures": refresh_failures,
+            "hit_ratio": ((hits + stale_hits) / lookups) if lookups else 0.0,
+        }
+
+
+def make_response_cache(name, ttl, stale_ttl=0, directory=None, maxsize=512):
+    """ResponseCache on disk when `directory` is given, in memory otherwise."""
+    backend = DiskBackend(directory, max_age=ttl + stale_ttl) if directory else MemoryBackend(maxsize=maxsize)
+    return ResponseCache(backend, ttl=ttl, stale_ttl=stale_ttl, name=name)
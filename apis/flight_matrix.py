@@ -0,0 +1,64 @@
+import heapq
+from datetime import date, datetime, timedelta
+
+from hotel_rank import parse_number
+
+# Largest origin x date grid one request may fan out to (each cell is one flight-offers call)
+DEFAULT_MAX_CELLS = 21
+
+
+def flex_dates(depart_date, return_date=None, flex_days=0, today=None):
+    """
+    [(depart, return), ...] for every departure within depart_date ± flex_days.
+    Round trips keep their length (return moves with departure); departures
+    before `today` are skipped since Amadeus rejects them. Raises ValueError
+    for malformed dates or a return before the departure.
+    """
+    try:
+        d0 = datetime.strptime(depart_date, "%Y-%m-%d").date()
+        length = (datetime.strptime(return_date, "%Y-%m-%d").date() - d0) if return_date else None
+    except (TypeError, ValueError):
+        raise ValueError("Dates must be YYYY-MM-DD") from None
+    if length is not None and length.days < 0:
+        raise ValueError("Return date must be on or after the departure date")
+    today = today or date.today()
+
+    pairs = []
+    for shift in range(-flex_days, flex_days + 1):
+        d = d0 + timedelta(days=shift)
+        if d < today:
+            continue
+        pairs.append((d.isoformat(), (d + length).isoformat() if length is not None else None))
+    return pairs
+
+
+def offer_price(offer) -> float:
+    return parse_number(((offer or {}).get("price") or {}).get("total"))
+
+
+def cheapest(offers):
+    """(price, offer) of the cheapest priced offer, or (None, None)."""
+    best_price, best = None, None
+    for offer in offers or ():
+        price = offer_price(offer)
+        if price == price and (best_price is None or price < best_price):
+            best_price, best = price, offer
+    return best_price, best
+
+
+def top_offers(cells, k):
+    """
+    The k cheapest offers across all cells, each tagged with its origin and dates.
+    `cells` is [(cell dict, offers), ...]; ties keep grid order.
+    """
+    candidates = (
+        (price, n, i, cell, offer)
+        for n, (cell, offers) in enumerate(cells)
+        for i, offer in enumerate(offers or ())
+        for price in (offer_price(offer),)
+        if price == price
+    )
+    return [
+        {**offer, "origin": cell["origin"], "depart_date": cell["depart_date"], "return_date": cell["return_date"]}
+        for _, _, _, cell, offer in heapq.nsmallest(k, candidates, key=lambda c: c[:3])
+    ]
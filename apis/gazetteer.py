@@ -0,0 +1,300 @@
+import os
+import re
+import csv
+import math
+import threading
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+
+from geo_index import GeoIndex
+
+DEFAULT_AIRPORTS_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "airports.dat")
+)
+
+
+def normalize_name(s: str) -> str:
+    """Lowercase, strip accents and collapse whitespace ('São  Paulo' -> 'sao paulo')."""
+    s = unicodedata.normalize("NFKD", s or "")
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return " ".join(s.lower().split())
+
+
+# "42.36,-71.06" (lat, lon)
+LATLON_RE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+def _coordinate(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def trigrams(s: str, pad=True):
+    if pad:
+        s = f"  {s} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def _min_shared_trigrams(la, lb, cutoff, a_dups=0):
+    """
+    Fewest distinct padded trigrams a string of length `la` must share with one of
+    length `lb` for their SequenceMatcher ratio to reach `cutoff`; None if the
+    lengths alone rule it out.
+
+    A ratio of 2M/(la+lb) means M matched characters. Of a's la+1 trigram
+    positions, each unmatched character of a spoils at most 3 and each gap of
+    unmatched characters in b at most 2, and the same holds from b's side.
+    `a_dups` repeated trigrams in a can make distinct matches fewer than positions.
+    """
+    total = la + lb
+    if not total:
+        return 0
+    m = max(0, math.ceil(cutoff * total / 2) - 1)
+    while 2.0 * m / total < cutoff:
+        m += 1
+    if m > min(la, lb):
+        return None
+    ua, ub = la - m, lb - m
+    positions = max(la + 1 - 3 * ua - 2 * ub, lb + 1 - 3 * ub - 2 * ua)
+    return positions - a_dups
+
+
+class AirportGazetteer:
+    """
+    In-memory index over airports.dat, built once per process.
+    - exact lookups by normalized city, IATA, ICAO and country are dict hits
+    - fuzzy city lookups only score the cities sharing enough trigrams with the query
+    - nearest-airport and radius queries go through a k-d tree over the airport
+      coordinates (built on the first spatial query)
+    """
+
+    def __init__(self, path=DEFAULT_AIRPORTS_PATH):
+        self.path = path
+        self.airports = []       # rows with a usable IATA code, in file order
+        self.by_city = {}        # normalized city -> [airport, ...]
+        self.by_iata = {}
+        self.by_icao = {}
+        self.by_country = {}     # normalized country -> [airport, ...]
+        self._trigrams = {}      # padded trigram -> {normalized city, ...}
+        self._cities_by_len = {}  # len(normalized city) -> [normalized city, ...]
+        self.places = {}         # normalized city -> (lat, lon), incl. airfields without an IATA code
+        self._geo = None
+        self._geo_lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if len(row) < 5:
+                    continue
+                name, city, country, iata = row[1], row[2], row[3], row[4]
+                icao = row[5] if len(row) > 5 else ""
+                lat = _coordinate(row[6]) if len(row) > 7 else None
+                lon = _coordinate(row[7]) if len(row) > 7 else None
+                if lat is not None and lon is not None and normalize_name(city):
+                    # Small towns often only have an airfield with no IATA code:
+                    # still good enough to find the nearest real airport
+                    self.places.setdefault(normalize_name(city), (lat, lon))
+
+                iata = iata.strip().upper()
+                if not iata or iata == r"\N" or len(iata) != 3:
+                    continue
+
+                airport = {
+                    "name": name.strip(),
+                    "city": city.strip(),
+                    "country": country.strip(),
+                    "iata": iata,
+                }
+                if lat is not None and lon is not None:
+                    airport["lat"], airport["lon"] = lat, lon
+                icao = icao.strip().upper()
+                if icao and icao != r"\N":
+                    airport["icao"] = icao
+                    self.by_icao.setdefault(icao, airport)
+
+                self.airports.append(airport)
+                self.by_iata.setdefault(iata, airport)
+                self.by_country.setdefault(normalize_name(airport["country"]), []).append(airport)
+
+                city_key = normalize_name(airport["city"])
+                if city_key:
+                    if city_key not in self.by_city:
+                        for g in trigrams(city_key):
+                            self._trigrams.setdefault(g, set()).add(city_key)
+                        self._cities_by_len.setdefault(len(city_key), []).append(city_key)
+                    self.by_city.setdefault(city_key, []).append(airport)
+
+        # Position of each city's first airport, used to keep file-order tie-breaks
+        self._city_rank = {}
+        for i, a in enumerate(self.airports):
+            self._city_rank.setdefault(normalize_name(a["city"]), i)
+
+    @property
+    def loaded(self):
+        return bool(self.airports)
+
+    # -----------------------------
+    # Exact lookups
+    # -----------------------------
+    def airports_in_city(self, city: str):
+        return self.by_city.get(normalize_name(city), [])
+
+    def airports_in_country(self, country: str):
+        return self.by_country.get(normalize_name(country), [])
+
+    def lookup_iata(self, code: str):
+        return self.by_iata.get((code or "").strip().upper())
+
+    def lookup_icao(self, code: str):
+        return self.by_icao.get((code or "").strip().upper())
+
+    # -----------------------------
+    # Fuzzy lookups
+    # -----------------------------
+    def closest_city(self, query: str, cutoff=0.8):
+        """
+        Best city name for a misspelled query, or None.
+        Same result as difflib.get_close_matches(query, cities, n=1, cutoff): highest
+        ratio, ties to the largest name. Only cities that share enough trigrams
+        with the query to possibly reach `cutoff` are scored (see _min_shared_trigrams).
+        """
+        q = normalize_name(query)
+        if not q:
+            return None
+
+        counts = Counter()
+        q_grams = trigrams(q)
+        for g in q_grams:
+            counts.update(self._trigrams.get(g, ()))
+        # Padded trigram positions of q that repeat a value already seen
+        q_dups = len(q) + 1 - len(q_grams)
+
+        need = {}                    # city length -> shared trigrams needed (None: length can't reach cutoff)
+        candidates = []
+        for length, cities in self._cities_by_len.items():
+            need[length] = _min_shared_trigrams(len(q), length, cutoff, q_dups)
+            if need[length] is not None and need[length] <= 0:
+                # Bound says nothing for this length: score them all
+                candidates.extend(cities)
+        candidates.extend(
+            c for c, n in counts.items() if need.get(len(c)) is not None and 0 < need[len(c)] <= n
+        )
+
+        best, best_score = None, cutoff
+        for city_key in candidates:
+            # difflib.get_close_matches puts the candidate first and the query second
+            sm = SequenceMatcher(None, city_key, q)
+            if sm.real_quick_ratio() < best_score or sm.quick_ratio() < best_score:
+                continue
+            score = sm.ratio()
+            if score > best_score or (score == best_score and (best is None or city_key > best)):
+                best, best_score = city_key, score
+        return best
+
+    def city_containing(self, query: str):
+        """First city (in file order) equal to or containing the query string."""
+        q = normalize_name(query)
+        if not q:
+            return None
+        if q in self.by_city:
+            return q
+
+        if len(q) >= 3:
+            grams = sorted(trigrams(q, pad=False), key=lambda g: len(self._trigrams.get(g, ())))
+            candidates = set(self._trigrams.get(grams[0], ()))
+            for g in grams[1:]:
+                candidates &= self._trigrams.get(g, set())
+                if not candidates:
+                    return None
+        else:
+            candidates = self.by_city.keys()
+
+        matches = [c for c in candidates if q in c]
+        if not matches:
+            return None
+        return min(matches, key=lambda c: self._city_rank.get(c, 0))
+
+    # -----------------------------
+    # Spatial lookups (no network)
+    # -----------------------------
+    @property
+    def geo(self) -> GeoIndex:
+        if self._geo is None:
+            with self._geo_lock:
+                if self._geo is None:
+                    located = [a for a in self.airports if "lat" in a]
+                    self._geo = GeoIndex([(a["lat"], a["lon"]) for a in located], located)
+        return self._geo
+
+    def nearest_airports(self, lat, lon, n=5, max_km=None):
+        """The n airports closest to (lat, lon), closest first, each with "distance_km"."""
+        return [{**a, "distance_km": round(km, 1)} for km, a in self.geo.nearest(lat, lon, n=n, max_km=max_km)]
+
+    def airports_within(self, lat, lon, radius_km, limit=None):
+        """Airports within radius_km of (lat, lon), closest first, each with "distance_km"."""
+        found = self.geo.within(lat, lon, radius_km)
+        return [{**a, "distance_km": round(km, 1)} for km, a in found[:limit]]
+
+    def coordinates(self, query: str):
+        """(lat, lon) for "lat,lon", an IATA code or a place name in airports.dat, else None."""
+        m = LATLON_RE.match(query or "")
+        if m:
+            lat, lon = float(m.group(1)), float(m.group(2))
+            return (lat, lon) if -90 <= lat <= 90 and -180 <= lon <= 180 else None
+
+        airport = self.lookup_iata(query) if len((query or "").strip()) == 3 else None
+        if airport and "lat" in airport:
+            return airport["lat"], airport["lon"]
+        return self.places.get(normalize_name(query))
+
+    def resolve_nearest(self, query: str, max_km=150):
+        """IATA of the airport nearest to the place named by `query` (within max_km), or None."""
+        point = self.coordinates(query)
+        if point is None:
+            return None
+        nearest = self.geo.nearest(point[0], point[1], n=1, max_km=max_km)
+        return nearest[0][1]["iata"] if nearest else None
+
+    def resolve_place(self, query: str, cutoff=0.8, max_km=150):
+        """
+        IATA for any place name: exact city match, then the nearest airport to a
+        known place ("lat,lon", towns with only an airfield), then fuzzy city match.
+        """
+        airports = self.airports_in_city(query)
+        if airports:
+            return airports[0]["iata"]
+        return self.resolve_nearest(query, max_km=max_km) or self.resolve_city(query, cutoff=cutoff)
+
+    def resolve_city(self, query: str, cutoff=0.8):
+        """IATA for a city name: exact match first, then fuzzy match."""
+        airports = self.airports_in_city(query)
+        if airports:
+            return airports[0]["iata"]
+        best = self.closest_city(query, cutoff=cutoff)
+        if best:
+            return self.by_city[best][0]["iata"]
+        return None
+
+
+_gazetteers = {}
+_gazetteers_lock = threading.Lock()
+
+
+def get_gazetteer(path=DEFAULT_AIRPORTS_PATH) -> AirportGazetteer:
+    """Process-wide gazetteer for `path`, built on first use."""
+    path = os.path.abspath(path)
+    g = _gazetteers.get(path)
+    if g is None:
+        with _gazetteers_lock:
+            g = _gazetteers.get(path)
+            if g is None:
+                g = AirportGazetteer(path)
+                _gazetteers[path] = g
+    return g
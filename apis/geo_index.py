@@ -0,0 +1,123 @@
+import math
+import heapq
+from array import array
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    h = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+def _unit_vector(lat, lon):
+    p, l = math.radians(lat), math.radians(lon)
+    return math.cos(p) * math.cos(l), math.cos(p) * math.sin(l), math.sin(p)
+
+
+def _chord2_for_km(km) -> float:
+    """Squared straight-line distance between unit vectors `km` apart on the surface."""
+    angle = min(km / EARTH_RADIUS_KM, math.pi)
+    return (2 * math.sin(angle / 2)) ** 2
+
+
+def _km_for_chord2(d2) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(d2) / 2))
+
+
+class GeoIndex:
+    """
+    Static k-d tree over (lat, lon) points for nearest-N and radius queries.
+    Points are stored as 3-d unit vectors: straight-line distance between them
+    orders points exactly like great-circle distance, with no special cases at
+    the poles or the antimeridian. The tree is implicit (a permutation of the
+    points plus the split axis per node), built once in O(n log² n).
+    """
+
+    def __init__(self, points, items=None):
+        points = list(points)
+        self.items = list(items) if items is not None else points
+        self._xyz = array("d")
+        for lat, lon in points:
+            self._xyz.extend(_unit_vector(lat, lon))
+        self._perm = array("l", range(len(points)))
+        self._axis = array("b", [0]) * len(points)
+        self._build(0, len(points), 0)
+
+    def __len__(self):
+        return len(self._perm)
+
+    def _build(self, lo, hi, depth):
+        if hi - lo <= 1:
+            return
+        axis = depth % 3
+        xyz = self._xyz
+        self._perm[lo:hi] = array("l", sorted(self._perm[lo:hi], key=lambda i: xyz[3 * i + axis]))
+        mid = (lo + hi) // 2
+        self._axis[mid] = axis
+        self._build(lo, mid, depth + 1)
+        self._build(mid + 1, hi, depth + 1)
+
+    def _walk(self, q, accept, bound):
+        """
+        Visits nodes nearest-side first. `accept(d2, i)` is called for every point
+        not pruned; `bound()` is the current squared distance beyond which a
+        subtree cannot contribute.
+        """
+        xyz, perm, axes = self._xyz, self._perm, self._axis
+        qx, qy, qz = q
+        stack = [(0, len(perm))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            i = perm[mid]
+            x, y, z = xyz[3 * i], xyz[3 * i + 1], xyz[3 * i + 2]
+            accept((x - qx) ** 2 + (y - qy) ** 2 + (z - qz) ** 2, i)
+            if hi - lo == 1:
+                continue
+
+            diff = q[axes[mid]] - (x, y, z)[axes[mid]]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            # Far side only if the splitting plane is closer than the bound; pushed first, popped last
+            if diff * diff <= bound():
+                stack.append(far)
+            stack.append(near)
+
+    def nearest(self, lat, lon, n=1, max_km=None):
+        """[(distance_km, item), ...] for the n closest points, closest first."""
+        if n <= 0 or not len(self):
+            return []
+        limit = _chord2_for_km(max_km) if max_km is not None else math.inf
+        best = []                    # max-heap of (-d2, i)
+
+        def accept(d2, i):
+            if d2 > limit:
+                return
+            if len(best) < n:
+                heapq.heappush(best, (-d2, i))
+            elif d2 < -best[0][0]:
+                heapq.heapreplace(best, (-d2, i))
+
+        def bound():
+            return -best[0][0] if len(best) == n else limit
+
+        self._walk(_unit_vector(lat, lon), accept, bound)
+        return [(_km_for_chord2(-d2), self.items[i]) for d2, i in sorted(best, reverse=True)]
+
+    def within(self, lat, lon, radius_km):
+        """[(distance_km, item), ...] for every point within radius_km, closest first."""
+        if not len(self):
+            return []
+        limit = _chord2_for_km(radius_km)
+        found = []
+
+        def accept(d2, i):
+            if d2 <= limit:
+                found.append((d2, i))
+
+        self._walk(_unit_vector(lat, lon), accept, lambda: limit)
+        return [(_km_for_chord2(d2), self.items[i]) for d2, i in sorted(found)]
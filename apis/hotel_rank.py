@@ -0,0 +1,111 @@
+import math
+import heapq
+from array import array
+
+# search_hotels_clean(rank_by=...)
+RANK_KEYS = ("price", "rating", "value")
+
+# Stars assumed for the value score of hotels that have no rating
+DEFAULT_RATING = 3.0
+
+
+def parse_number(value) -> float:
+    """float(value), or NaN for missing/garbled values (NaN never passes a comparison)."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class OfferTable:
+    """
+    One /v3/shopping/hotel-offers `data` list flattened into numeric arrays:
+    - prices[j] / owner[j]: total price of every offer j and the hotel it belongs to
+    - cheapest[i] / cheapest_offer[i]: lowest price of hotel i and which offer has it
+      (inf / -1 when the hotel has no parseable price)
+    - ratings[i]: star rating (NaN if absent)
+    Prices are parsed once, in one pass; everything after works on the arrays.
+    """
+
+    __slots__ = ("data", "offers", "prices", "owner", "cheapest", "cheapest_offer", "ratings")
+
+    def __init__(self, data):
+        self.data = data
+        self.offers = []
+        self.prices = array("d")
+        self.owner = array("l")
+        for i, item in enumerate(data):
+            for offer in item.get("offers") or ():
+                self.offers.append(offer)
+                self.prices.append(parse_number((offer.get("price") or {}).get("total")))
+                self.owner.append(i)
+
+        n = len(data)
+        self.cheapest = array("d", [math.inf]) * n
+        self.cheapest_offer = array("l", [-1]) * n
+        cheapest = self.cheapest
+        for j, (price, i) in enumerate(zip(self.prices, self.owner)):
+            if price < cheapest[i]:
+                cheapest[i] = price
+                self.cheapest_offer[i] = j
+
+        self.ratings = array("d", (parse_number((item.get("hotel") or {}).get("rating")) for item in data))
+
+    def __len__(self):
+        return len(self.data)
+
+    def within_budget(self, budget=None) -> bytearray:
+        """1 for each hotel with a priced offer at or under `budget` (any price if None)."""
+        limit = math.inf if budget is None else budget
+        return bytearray(price <= limit and price != math.inf for price in self.cheapest)
+
+    def keys(self, rank_by) -> list:
+        """Sort key per hotel (lower ranks first)."""
+        if rank_by == "rating":
+            # Best rated first, cheaper first among equals
+            return [(-(r if r == r else 0.0), c) for r, c in zip(self.ratings, self.cheapest)]
+        if rank_by == "value":
+            # Price per star
+            return [(c / max(1.0, r if r == r else DEFAULT_RATING),) for r, c in zip(self.ratings, self.cheapest)]
+        return [(c,) for c in self.cheapest]
+
+
+class HotelRanker:
+    """
+    Bounded top-K of hotels across any number of OfferTables.
+    Holds at most `k` entries (a max-heap on the negated key), so memory does not
+    grow with the number of chunks. Ties are broken by (chunk, position), so
+    the result does not depend on the order chunks are added.
+    """
+
+    def __init__(self, k, rank_by="price", budget=None):
+        if rank_by not in RANK_KEYS:
+            raise ValueError(f"rank_by must be one of {', '.join(RANK_KEYS)}")
+        self.k = k
+        self.rank_by = rank_by
+        self.budget = budget
+        self._heap = []              # (negated key, table, hotel index)
+        self.candidates = 0          # in-budget hotels seen
+
+    def add(self, chunk, table: OfferTable) -> int:
+        """Offers every in-budget hotel of `table` to the top-K; returns how many there were."""
+        mask = table.within_budget(self.budget)
+        keys = table.keys(self.rank_by)
+        heap, k = self._heap, self.k
+        added = 0
+        for i, ok in enumerate(mask):
+            if not ok:
+                continue
+            added += 1
+            entry = (tuple(-x for x in keys[i]) + (-chunk, -i), table, i)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry[0] > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+        self.candidates += added
+        return added
+
+    def top(self) -> list:
+        """[(hotel item, cheapest offer), ...] best first."""
+        ranked = sorted(self._heap, key=lambda e: e[0], reverse=True)
+        return [(table.data[i], table.offers[table.cheapest_offer[i]]) for _, table, i in ranked]
@@ -0,0 +1,51 @@
+import re
+import json
+
+from llm_stream import ItineraryDayScanner
+
+# ```json ... ``` / ```JSON ... ``` / bare ``` ... ``` anywhere in the reply
+FENCE_RE = re.compile(r"```[A-Za-z0-9_-]*[ \t]*\r?\n?(.*?)```", re.DOTALL)
+
+_decoder = json.JSONDecoder()
+
+
+def extract_json(content: str) -> dict:
+    """
+    The JSON object in an LLM reply. Tolerates code fences (with or without a
+    language tag), prose before the object and trailing junk after it.
+    Raises ValueError when no complete object can be decoded.
+    """
+    content = (content or "").strip()
+
+    candidates = [m.group(1) for m in FENCE_RE.finditer(content)]
+    if content.startswith("```") and not candidates:
+        # Unterminated fence (truncated reply): drop the opening line
+        candidates.append(content.split("\n", 1)[-1])
+    candidates.append(content)
+
+    for text in candidates:
+        start = text.find("{")
+        if start == -1:
+            continue
+        try:
+            obj, _ = _decoder.raw_decode(text, start)
+        except ValueError:
+            continue
+        if isinstance(obj, dict):
+            return obj
+    raise ValueError("No complete JSON object in LLM output")
+
+
+def parse_llm_json(content: str) -> dict:
+    """
+    extract_json(), falling back to the complete day objects of a truncated
+    or otherwise broken reply ({"itinerary": [...]}) so they can be kept.
+    """
+    try:
+        return extract_json(content)
+    except ValueError:
+        scanner = ItineraryDayScanner()
+        days = scanner.feed(content or "")
+        if not days:
+            raise
+        return {"itinerary": days}
@@ -0,0 +1,147 @@
+import re
+import json
+
+
+def iter_sse_content(resp, usage=None):
+    """
+    Yields the text deltas of an OpenAI-compatible chat completions stream
+    (Groq uses the same SSE format: `data: {...}` lines ending with `data: [DONE]`).
+    If a `usage` dict is passed, the token usage reported in the stream is copied into it.
+    """
+    for line in resp.iter_lines(decode_unicode=True):
+        deltas = sse_line_deltas(line, usage)
+        if deltas is None:
+            return
+        yield from deltas
+
+
+async def aiter_sse_content(resp, usage=None):
+    """iter_sse_content() for an httpx async streaming response."""
+    async for line in resp.aiter_lines():
+        deltas = sse_line_deltas(line, usage)
+        if deltas is None:
+            return
+        for delta in deltas:
+            yield delta
+
+
+def sse_line_deltas(line, usage=None):
+    """Content deltas carried by one SSE line ([] for keep-alives/other lines, None at [DONE])."""
+    if not line or not line.startswith("data:"):
+        return []
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return None
+    try:
+        event = json.loads(data)
+    except ValueError:
+        return []
+    if usage is not None:
+        # OpenAI puts usage on the last chunk; Groq under "x_groq"
+        reported = event.get("usage") or (event.get("x_groq") or {}).get("usage")
+        if reported:
+            usage.update(reported)
+    deltas = []
+    for choice in event.get("choices") or []:
+        delta = (choice.get("delta") or {}).get("content")
+        if delta:
+            deltas.append(delta)
+    return deltas
+
+
+class ItineraryDayScanner:
+    """
+    Incrementally pulls day objects out of a streamed JSON completion.
+    Feed it text chunks; each call returns the day objects of the top-level
+    "itinerary" array that became complete with that chunk. The full text so
+    far stays available in `.text` for a final parse.
+    Only the unscanned tail is kept as one string; chunks are joined once per
+    feed, so scanning stays linear in the length of the completion.
+    """
+
+    KEY_RE = re.compile(r'"itinerary"\s*:\s*\[')
+    # Longest stretch of text KEY_RE can match across a chunk boundary
+    KEY_OVERLAP = 64
+
+    def __init__(self):
+        self._chunks = []            # text before self._buf, already scanned
+        self._buf = ""               # unscanned tail (plus the object being read)
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._obj_start = None
+        self._depth = 0
+        self._in_str = False
+        self._escape = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks) + self._buf
+
+    def feed(self, chunk: str) -> list:
+        days = []
+        if self._done:
+            self._chunks.append(chunk)
+            return days
+
+        self._buf += chunk
+        if not self._in_array:
+            m = self.KEY_RE.search(self._buf)
+            if not m:
+                self._trim(len(self._buf) - self.KEY_OVERLAP)
+                return days
+            self._in_array = True
+            self._pos = m.end()
+
+        text = self._buf
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            if self._obj_start is None:
+                # Between array elements: wait for the next object or the closing bracket
+                if ch == "{":
+                    self._obj_start = i
+                    self._depth = 1
+                elif ch == "]":
+                    self._done = True
+                    i += 1
+                    break
+            elif self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == '"':
+                self._in_str = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    raw = text[self._obj_start:i + 1]
+                    self._obj_start = None
+                    try:
+                        days.append(json.loads(raw))
+                    except ValueError:
+                        pass
+            i += 1
+
+        self._pos = i
+        # Keep only what is still needed: the object being read, or nothing
+        if self._done:
+            self._trim(len(self._buf))
+        else:
+            self._trim(self._obj_start if self._obj_start is not None else i)
+        return days
+
+    def _trim(self, upto):
+        """Moves self._buf[:upto] to the scanned chunks."""
+        if upto <= 0:
+            return
+        self._chunks.append(self._buf[:upto])
+        self._buf = self._buf[upto:]
+        self._pos = max(0, self._pos - upto)
+        if self._obj_start is not None:
+            self._obj_start -= upto
@@ -0,0 +1,168 @@
+"""
+Logging for the app and the Amadeus/Groq clients.
+
+    from log import get_logger
+    log = get_logger(__name__)
+    log.debug("AMADEUS REQ %s %s params=%s", method, path, params)
+
+- Records are handed to a bounded queue and written by one background thread,
+  so request threads never block on stdout. When the queue is full, records
+  are dropped (counted in `dropped`) instead of stalling the caller.
+- Use %-style arguments, not f-strings: a disabled level costs one
+  isEnabledFor() check, and enabled records are formatted on the writer thread.
+  Guard arguments that are expensive to build with log.isEnabledFor(logging.DEBUG).
+- DEBUG records can be sampled (LOG_DEBUG_SAMPLE_RATE) to keep volume bounded under load.
+- Bearer tokens, OAuth tokens, client secrets and API keys are redacted from
+  every written line.
+
+Env: LOG_LEVEL (default INFO), LOG_FORMAT ("text" or "json"),
+LOG_DEBUG_SAMPLE_RATE (0..1, default 1), LOG_QUEUE_SIZE (default 10000).
+"""
+import os
+import re
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+ROOT = "itinerary"
+
+REDACTIONS = [
+    (re.compile(r"(?i)(bearer\s+)[A-Za-z0-9._~+/=-]+"), r"\1[REDACTED]"),
+    (re.compile(r"(?i)(['\"]?(?:access_token|client_secret|api_key|apikey|authorization|password)['\"]?\s*[:=]\s*['\"]?)"
+                r"[^'\"\s,}&]+"), r"\1[REDACTED]"),
+    (re.compile(r"\bgsk_[A-Za-z0-9]+"), "gsk_[REDACTED]"),
+    (re.compile(r"\bsk-[A-Za-z0-9_-]{8,}"), "sk-[REDACTED]"),
+]
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def redact(text: str) -> str:
+    for pattern, replacement in REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class RedactingFormatter(logging.Formatter):
+    def format(self, record):
+        return redact(super().format(record))
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields are included as keys."""
+
+    def format(self, record):
+        out = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                out[key] = value
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return redact(json.dumps(out, default=str, ensure_ascii=False))
+
+
+class DebugSampler(logging.Filter):
+    """Lets through a `rate` fraction of DEBUG records; other levels always pass."""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that defers all formatting to the listener thread and drops
+    records (rather than blocking) when the queue is full.
+    """
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Keep the record lazy: args are formatted by the writer thread.
+        # Resolve exc_info text now, since the traceback objects are not kept around.
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_lock = threading.Lock()
+_handler = None
+_listener = None
+
+
+def configure(level=None, fmt=None, debug_sample_rate=None, stream=None):
+    """Sets up the queue + writer thread for the "itinerary" loggers. Safe to call again (reconfigures)."""
+    global _handler, _listener
+    level = (level or os.getenv("LOG_LEVEL") or "INFO").upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT") or "text").lower()
+    if debug_sample_rate is None:
+        debug_sample_rate = float(os.getenv("LOG_DEBUG_SAMPLE_RATE") or 1.0)
+
+    with _lock:
+        root = logging.getLogger(ROOT)
+        if _listener is not None:
+            _listener.stop()
+            root.removeHandler(_handler)
+
+        writer = logging.StreamHandler(stream or sys.stdout)
+        if fmt == "json":
+            writer.setFormatter(JsonFormatter())
+        else:
+            writer.setFormatter(RedactingFormatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+
+        _handler = DroppingQueueHandler(queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE") or 10000)))
+        _handler.addFilter(DebugSampler(debug_sample_rate))
+        _listener = QueueListener(_handler.queue, writer, respect_handler_level=False)
+        _listener.start()
+
+        root.addHandler(_handler)
+        root.setLevel(getattr(logging, level, logging.INFO))
+        root.propagate = False
+    return root
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the "itinerary" namespace (configured on first use)."""
+    if _listener is None:
+        configure()
+    short = name.rsplit(".", 1)[-1] if name != "__main__" else "main"
+    return logging.getLogger(f"{ROOT}.{short}")
+
+
+def dropped() -> int:
+    """Records dropped because the log queue was full."""
+    return _handler.dropped if _handler is not None else 0
+
+
+@atexit.register
+def _flush():
+    # Writes out whatever is still queued
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except queue.Full:
+            pass
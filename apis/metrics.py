@@ -0,0 +1,292 @@
+import time
+import threading
+from contextlib import contextmanager
+
+import log as applog
+
+log = applog.get_logger(__name__)
+
+# Seconds; covers cache hits (~1ms) up to slow LLM plans
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{_escape(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels: `c.inc(route="/api/hotels")`."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_label_str(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics) with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}            # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = []
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_label_str(self.labelnames, key, [('le', _fmt(float(bound)))])} {count}")
+            labels = _label_str(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {round(series[-2], 6)}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """
+    Holds the metrics of this process and renders them in the Prometheus text format.
+    Counters/histograms are updated on the hot path; `collector`s are called at
+    scrape time for values other objects already keep (cache and token stats).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """`fn()` returns [(name, kind, help, [(labels_dict, value), ...]), ...]."""
+        with self._lock:
+            self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+
+        for fn in list(self._collectors):
+            try:
+                families = fn()
+            except Exception as e:
+                log.warning("⚠️ metrics collector failed: %s", e)
+                continue
+            for name, kind, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_label_str(labels.keys(), labels.values())} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ---------------------------
+# Hot-path metrics
+# ---------------------------
+REQUEST_SECONDS = REGISTRY.histogram(
+    "itinerary_http_request_seconds", "API request latency (streams: until the response starts).",
+    ("route", "method", "status"),
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "itinerary_stage_seconds", "Time spent per pipeline stage (resolve, hotels, flights, transfers, llm, post).",
+    ("stage",),
+)
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "itinerary_upstream_request_seconds", "Latency of calls to Amadeus and Groq per endpoint.",
+    ("service", "endpoint", "status"),
+)
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "itinerary_upstream_retries_total", "Upstream calls retried, by cause (401 token refresh, 141 system error).",
+    ("service", "reason"),
+)
+UPSTREAM_COALESCED = REGISTRY.counter(
+    "itinerary_upstream_coalesced_total", "Requests served by an identical call already in flight (no upstream call made).",
+    ("service", "endpoint"),
+)
+THROTTLE_SECONDS = REGISTRY.histogram(
+    "itinerary_upstream_throttle_seconds", "Time requests waited on the client-side rate limiter.",
+    ("service", "family"),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "itinerary_llm_tokens_total", "LLM tokens reported by the provider's usage field.",
+    ("model", "kind"),
+)
+
+
+@contextmanager
+def upstream(service, endpoint):
+    """
+    Times one upstream call into UPSTREAM_SECONDS. Set `.status` on the yielded
+    object once the response is in; exceptions are recorded by type name.
+    """
+    call = _UpstreamCall()
+    t0 = time.perf_counter()
+    try:
+        yield call
+    except BaseException as e:
+        call.status = type(e).__name__
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - t0, service=service, endpoint=endpoint, status=call.status)
+
+
+class _UpstreamCall:
+    __slots__ = ("status",)
+
+    def __init__(self):
+        self.status = "unknown"
+
+
+def record_llm_usage(model, usage):
+    """Adds an OpenAI-style usage dict ({"prompt_tokens": .., "completion_tokens": ..}) to LLM_TOKENS."""
+    if not isinstance(usage, dict):
+        return
+    for kind in ("prompt", "completion"):
+        n = usage.get(f"{kind}_tokens")
+        if isinstance(n, (int, float)) and n > 0:
+            LLM_TOKENS.inc(n, model=model, kind=kind)
+
+
+# ---------------------------
+# Scrape-time collectors
+# ---------------------------
+_caches = {}
+_token_managers = {}
+_limiters = {}
+
+
+def track_cache(cache, name=None):
+    """Exports hits/misses/hit ratio of a TTLCache or ResponseCache (anything with stats())."""
+    _caches[name or getattr(cache, "name", "cache")] = cache
+    return cache
+
+
+def track_tokens(name, manager):
+    """Exports refresh counts of a TokenManager."""
+    _token_managers[name] = manager
+    return manager
+
+
+def track_limiter(name, limiter):
+    """Exports the adaptive concurrency limit and in-flight count of an UpstreamLimiter."""
+    _limiters[name] = limiter
+    return limiter
+
+
+@REGISTRY.collector
+def _collect_caches():
+    lookups, ratios, sizes = [], [], []
+    for name, cache in sorted(_caches.items()):
+        stats = cache.stats()
+        lookups.append(({"cache": name, "result": "hit"}, stats.get("hits", 0)))
+        if "stale_hits" in stats:
+            lookups.append(({"cache": name, "result": "stale"}, stats["stale_hits"]))
+        lookups.append(({"cache": name, "result": "miss"}, stats.get("misses", 0)))
+        ratios.append(({"cache": name}, round(stats.get("hit_ratio", 0.0), 4)))
+        sizes.append(({"cache": name}, stats.get("size", 0)))
+    return [
+        ("itinerary_cache_lookups_total", "counter", "Cache lookups by result.", lookups),
+        ("itinerary_cache_hit_ratio", "gauge", "Hits (incl. stale) / lookups since start.", ratios),
+        ("itinerary_cache_entries", "gauge", "Entries currently stored.", sizes),
+    ]
+
+
+@REGISTRY.collector
+def _collect_tokens():
+    refreshes, failures = [], []
+    for name, manager in sorted(_token_managers.items()):
+        refreshes.append(({"client": name}, manager.refresh_count))
+        failures.append(({"client": name}, manager.refresh_failures))
+    return [
+        ("itinerary_token_refreshes_total", "counter", "OAuth tokens fetched.", refreshes),
+        ("itinerary_token_refresh_failures_total", "counter", "Failed OAuth token fetches.", failures),
+    ]
+
+
+@REGISTRY.collector
+def _collect_limiters():
+    limits, in_flight = [], []
+    for name, limiter in sorted(_limiters.items()):
+        stats = limiter.stats()
+        limits.append(({"client": name}, stats["limit"]))
+        in_flight.append(({"client": name}, stats["in_flight"]))
+    return [
+        ("itinerary_upstream_concurrency_limit", "gauge", "Current adaptive (AIMD) concurrency limit.", limits),
+        ("itinerary_upstream_in_flight", "gauge", "Upstream requests currently in flight.", in_flight),
+    ]
+
+
+@REGISTRY.collector
+def _collect_logging():
+    return [
+        ("itinerary_log_records_dropped_total", "counter", "Log records dropped because the log queue was full.",
+         [({}, applog.dropped())]),
+    ]
@@ -0,0 +1,387 @@
+import asyncio
+import threading
+import weakref
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from log import get_logger
+from prompt_compact import dumps_compact
+
+log = get_logger(__name__)
+
+ITEMS_PER_DAY = 6
+
+
+# ---------------------------
+# Prompt blocks shared by the single-shot and parallel planners
+# ---------------------------
+def user_input_block(req) -> str:
+    return f"""USER INPUT:
+destination: {req['destination']}
+origin: {req['origin']}
+dates: {req['depart_date']} to {req['return_date']}
+budget_max_usd: {req['budget'] or "unknown"}
+transport_preference: {req['transport'] or "any"}
+interests: {req['interests'] if req['interests'] else []}
+notes: {req['message'] or "none"}"""
+
+
+def provider_data_block(data) -> str:
+    return f"""AVAILABLE DATA (may be empty if API failed):
+flights_meta: {dumps_compact(data["flights_meta"])}
+hotels_meta: {dumps_compact(data["hotels_meta"])}
+transfers_meta: {dumps_compact(data["transfers_meta"])}"""
+
+
+def trip_dates(depart_date: str, num_days: int) -> list:
+    d0 = datetime.strptime(depart_date, "%Y-%m-%d").date()
+    return [(d0 + timedelta(days=i)).isoformat() for i in range(num_days)]
+
+
+def is_valid_day(d, day_no=None) -> bool:
+    """A day the frontend can render: right number, a title, and ITEMS_PER_DAY timed items."""
+    if not isinstance(d, dict):
+        return False
+    try:
+        if day_no is not None and int(d.get("day")) != day_no:
+            return False
+    except (TypeError, ValueError):
+        return False
+    items = d.get("items")
+    if not isinstance(items, list) or len(items) != ITEMS_PER_DAY:
+        return False
+    return all(isinstance(it, dict) and (it.get("text") or "").strip() for it in items)
+
+
+def normalize_day(d, day_no):
+    """
+    Cheap local fixes before a day is sent for repair: numeric-string day
+    numbers, a missing title, extra items beyond ITEMS_PER_DAY, and blank items.
+    Returns the fixed day, or None if it still is not valid.
+    """
+    if not isinstance(d, dict):
+        return None
+    try:
+        if int(d.get("day")) != day_no:
+            return None
+    except (TypeError, ValueError):
+        return None
+
+    items = [it for it in d.get("items") or [] if isinstance(it, dict) and (it.get("text") or "").strip()]
+    fixed = dict(d, day=day_no, items=items[:ITEMS_PER_DAY])
+    if not (fixed.get("title") or "").strip():
+        fixed["title"] = f"Day {day_no}"
+    return fixed if is_valid_day(fixed, day_no) else None
+
+
+def collect_valid_days(itinerary, day_numbers) -> dict:
+    """{day number: day} for the days of `itinerary` that are (or can be made) valid; first one wins."""
+    wanted = set(day_numbers)
+    valid = {}
+    for d in itinerary if isinstance(itinerary, list) else []:
+        try:
+            n = int(d.get("day"))
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if n in wanted and n not in valid:
+            fixed = normalize_day(d, n)
+            if fixed is not None:
+                valid[n] = fixed
+    return valid
+
+
+# ---------------------------
+# Parallel planner prompts
+# ---------------------------
+def build_skeleton_prompt(req, data) -> str:
+    n = req["num_days"]
+    return f"""
+You are a travel planner. Output STRICT JSON only (no markdown, no code fences).
+
+{user_input_block(req)}
+
+{provider_data_block(data)}
+
+OUTPUT JSON SCHEMA (must match exactly):
+{{
+  "summary": {{
+    "destination": string,
+    "origin": string,
+    "dates": string,
+    "traveler_count": number,
+    "assumptions": [string]
+  }},
+  "cost_breakdown": {{
+    "flights": {{ "type": "REAL|ESTIMATE", "range_usd": [number, number], "notes": string }},
+    "hotels": {{ "type": "REAL|ESTIMATE", "range_usd": [number, number], "notes": string }},
+    "local_transport": {{ "type": "REAL|ESTIMATE", "range_usd": [number, number], "notes": string }},
+    "food": {{ "type": "ESTIMATE", "range_usd": [number, number], "notes": string }},
+    "activities": {{ "type": "REAL|ESTIMATE", "range_usd": [number, number], "notes": string }},
+    "total_estimated": {{ "range_usd": [number, number], "notes": string }}
+  }},
+  "recommended_hotels": [
+    {{ "name": string, "price_total_usd": number|null, "why": string, "source": "REAL|ESTIMATE" }}
+  ],
+  "flight_plan": {{
+    "source": "REAL|ESTIMATE",
+    "options": [
+      {{ "summary": string, "price_usd": number|null, "notes": string }}
+    ]
+  }},
+  "days": [
+    {{ "day": number, "theme": string, "area": string }}
+  ]
+}}
+
+HARD RULES:
+- If flights_meta.source == "REAL", use those prices/options as REAL. If not, create ESTIMATE ranges and state assumptions.
+- If hotels_meta.source == "REAL", use those hotels as REAL. If not, create ESTIMATE ranges and state assumptions.
+- days MUST contain exactly {n} entries, day 1 to day {n}. Keep each theme and area short (a few words).
+- Vary themes across days, group nearby sights into the same area, and reflect the interests (if any).
+""".strip()
+
+
+def build_day_batch_prompt(req, skeleton_days, day_numbers) -> str:
+    wanted = [d for d in skeleton_days if d.get("day") in day_numbers]
+    first, last = day_numbers[0], day_numbers[-1]
+    which = f"day {first}" if first == last else f"days {first} to {last}"
+    return f"""
+You are a travel planner. Output STRICT JSON only (no markdown, no code fences).
+
+{user_input_block(req)}
+
+TRIP SKELETON (all days, for context):
+{dumps_compact(skeleton_days)}
+
+Write the detailed schedule for {which} only:
+{dumps_compact(wanted)}
+
+OUTPUT JSON SCHEMA (must match exactly):
+{{
+  "itinerary": [
+    {{
+      "day": number,
+      "title": string,
+      "items": [
+        {{ "start": string, "end": string, "text": string }}
+      ]
+    }}
+  ]
+}}
+
+HARD RULES:
+- itinerary MUST contain exactly {len(day_numbers)} day object(s): {", ".join(str(n) for n in day_numbers)}.
+- Follow each day's theme and area from the skeleton.
+- Each day.items MUST contain EXACTLY {ITEMS_PER_DAY} entries with realistic times, meals, transit, and rest.
+- At least 3 of {ITEMS_PER_DAY} items per day should reflect the interests (if any).
+""".strip()
+
+
+class ParallelItineraryPlanner:
+    """
+    Long-trip planner:
+    1) one call for a compact skeleton (summary, costs, hotels, flights, theme+area per day)
+    2) day batches generated concurrently (at most `max_concurrency` LLM calls in flight)
+    3) any day missing or malformed is regenerated on its own, up to `max_day_retries` times
+    The result has the same shape as the single-shot plan, plus "missing_days".
+    repair() applies step 3 to a plan produced by one single-shot call.
+
+    `llm(prompt) -> dict` is the JSON completion function (groq_json).
+    `max_concurrency` is shared by every request using this planner (one pool
+    per process), so concurrent long trips queue instead of multiplying calls.
+    """
+
+    def __init__(self, llm, batch_size=2, max_concurrency=4, max_day_retries=2):
+        self.llm = llm
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_day_retries = max_day_retries
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def pool(self) -> ThreadPoolExecutor:
+        """The shared day-generation pool, started on first use."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="planner")
+        return self._pool
+
+    def plan(self, req, data) -> dict:
+        day_numbers = list(range(1, req["num_days"] + 1))
+        skeleton = self.skeleton(req, data)
+        skeleton_days = skeleton["days"]
+
+        pool = self.pool()
+        days = self._run(pool, req, skeleton_days, self._batches(day_numbers))
+        # A bad day is retried alone instead of discarding the plan
+        self._fill_missing(pool, req, skeleton_days, days, day_numbers, self.max_day_retries)
+
+        return self._assemble({k: v for k, v in skeleton.items() if k != "days"}, days, day_numbers)
+
+    def repair(self, req, llm_out) -> dict:
+        """
+        Validates a single-shot plan and keeps its good days. Only the missing or
+        malformed days are regenerated, one small call per day (max_day_retries + 1
+        attempts), with the good days' titles as context.
+        Same shape as plan(): the plan's other fields, "itinerary" and "missing_days".
+        """
+        llm_out = llm_out if isinstance(llm_out, dict) else {}
+        day_numbers = list(range(1, req["num_days"] + 1))
+        days = collect_valid_days(llm_out.get("itinerary"), day_numbers)
+
+        if len(days) < len(day_numbers):
+            skeleton_days = self._repair_context(req, days)
+            self._fill_missing(self.pool(), req, skeleton_days, days, day_numbers, self.max_day_retries + 1)
+
+        return self._assemble(dict(llm_out), days, day_numbers)
+
+    def skeleton(self, req, data) -> dict:
+        """Skeleton from the LLM; day themes fall back to blanks so day batches can still run."""
+        try:
+            skeleton = self.llm(build_skeleton_prompt(req, data)) or {}
+        except Exception as e:
+            log.error("❌ SKELETON FAILED: %s", e)
+            skeleton = {}
+        return self._with_skeleton_days(req, skeleton)
+
+    def generate_days(self, req, skeleton_days, day_numbers) -> dict:
+        """{day number: day} for the valid days the LLM returned for `day_numbers`."""
+        llm_out = self.llm(build_day_batch_prompt(req, skeleton_days, day_numbers)) or {}
+        return collect_valid_days(llm_out.get("itinerary"), day_numbers)
+
+    def _fill_missing(self, pool, req, skeleton_days, days, day_numbers, attempts):
+        """Regenerates absent days one per call, up to `attempts` rounds; updates `days` in place."""
+        for _ in range(attempts):
+            missing = [n for n in day_numbers if n not in days]
+            if not missing:
+                break
+            log.info("🔁 Regenerating itinerary days: %s", missing)
+            days.update(self._run(pool, req, skeleton_days, [[n] for n in missing]))
+
+    def _run(self, pool, req, skeleton_days, batches) -> dict:
+        days = {}
+        futures = {pool.submit(self.generate_days, req, skeleton_days, b): b for b in batches}
+        for fut in as_completed(futures):
+            try:
+                days.update(fut.result())
+            except Exception as e:
+                log.error("❌ DAY BATCH %s FAILED: %s", futures[fut], e)
+        return days
+
+    # -----------------------------
+    # Pure helpers (shared with AsyncItineraryPlanner)
+    # -----------------------------
+    def _batches(self, day_numbers):
+        return [day_numbers[i:i + self.batch_size] for i in range(0, len(day_numbers), self.batch_size)]
+
+    def _with_skeleton_days(self, req, skeleton) -> dict:
+        by_day = {}
+        for d in skeleton.get("days") or []:
+            try:
+                by_day[int(d.get("day"))] = d
+            except (AttributeError, TypeError, ValueError):
+                continue
+
+        # Dates come from the request, not the model
+        skeleton["days"] = [
+            {
+                "day": i,
+                "date": date,
+                "theme": (by_day.get(i) or {}).get("theme") or "",
+                "area": (by_day.get(i) or {}).get("area") or "",
+            }
+            for i, date in enumerate(trip_dates(req["depart_date"], req["num_days"]), start=1)
+        ]
+        return skeleton
+
+    def _repair_context(self, req, days):
+        """Skeleton-style day list for repair prompts: the good days' titles stand in for themes."""
+        return [
+            {
+                "day": i,
+                "date": date,
+                "theme": (days.get(i) or {}).get("title") or "",
+                "area": "",
+            }
+            for i, date in enumerate(trip_dates(req["depart_date"], req["num_days"]), start=1)
+        ]
+
+    def _assemble(self, out, days, day_numbers) -> dict:
+        out["itinerary"] = [days[n] for n in day_numbers if n in days]
+        out["missing_days"] = [n for n in day_numbers if n not in days]
+        return out
+
+
+class AsyncItineraryPlanner(ParallelItineraryPlanner):
+    """
+    ParallelItineraryPlanner for asyncio callers: `llm` is a coroutine function
+    and `max_concurrency` caps in-flight calls with a semaphore (one per event
+    loop, shared by all requests) instead of a pool.
+    """
+
+    def __init__(self, llm, batch_size=2, max_concurrency=4, max_day_retries=2):
+        super().__init__(llm, batch_size, max_concurrency, max_day_retries)
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        sem = self._semaphores.get(loop)
+        if sem is None:
+            sem = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return sem
+
+    async def plan(self, req, data) -> dict:
+        day_numbers = list(range(1, req["num_days"] + 1))
+        skeleton = await self.skeleton(req, data)
+        skeleton_days = skeleton["days"]
+
+        sem = self.semaphore()
+        days = await self._run(sem, req, skeleton_days, self._batches(day_numbers))
+        await self._fill_missing(sem, req, skeleton_days, days, day_numbers, self.max_day_retries)
+
+        return self._assemble({k: v for k, v in skeleton.items() if k != "days"}, days, day_numbers)
+
+    async def repair(self, req, llm_out) -> dict:
+        llm_out = llm_out if isinstance(llm_out, dict) else {}
+        day_numbers = list(range(1, req["num_days"] + 1))
+        days = collect_valid_days(llm_out.get("itinerary"), day_numbers)
+
+        if len(days) < len(day_numbers):
+            await self._fill_missing(self.semaphore(), req, self._repair_context(req, days), days, day_numbers, self.max_day_retries + 1)
+
+        return self._assemble(dict(llm_out), days, day_numbers)
+
+    async def skeleton(self, req, data) -> dict:
+        try:
+            skeleton = await self.llm(build_skeleton_prompt(req, data)) or {}
+        except Exception as e:
+            log.error("❌ SKELETON FAILED: %s", e)
+            skeleton = {}
+        return self._with_skeleton_days(req, skeleton)
+
+    async def generate_days(self, req, skeleton_days, day_numbers) -> dict:
+        llm_out = await self.llm(build_day_batch_prompt(req, skeleton_days, day_numbers)) or {}
+        return collect_valid_days(llm_out.get("itinerary"), day_numbers)
+
+    async def _fill_missing(self, sem, req, skeleton_days, days, day_numbers, attempts):
+        for _ in range(attempts):
+            missing = [n for n in day_numbers if n not in days]
+            if not missing:
+                break
+            log.info("🔁 Regenerating itinerary days: %s", missing)
+            days.update(await self._run(sem, req, skeleton_days, [[n] for n in missing]))
+
+    async def _run(self, sem, req, skeleton_days, batches) -> dict:
+        async def one(batch):
+            async with sem:
+                return await self.generate_days(req, skeleton_days, batch)
+
+        days = {}
+        results = await asyncio.gather(*(one(b) for b in batches), return_exceptions=True)
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                log.error("❌ DAY BATCH %s FAILED: %s", batch, result)
+            else:
+                days.update(result)
+        return days
@@ -0,0 +1,168 @@
+import json
+
+# Rough chars-per-token ratio for English/JSON with Llama-style tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def dumps_compact(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def drop_empty(obj):
+    """Recursively removes None, "", [] and {} values."""
+    if isinstance(obj, dict):
+        out = {}
+        for k, v in obj.items():
+            v = drop_empty(v)
+            if v is None or v == "" or v == [] or v == {}:
+                continue
+            out[k] = v
+        return out
+    if isinstance(obj, list):
+        return [v for v in (drop_empty(x) for x in obj) if v is not None and v != "" and v != [] and v != {}]
+    return obj
+
+
+def _num(v):
+    """'123.40' -> 123.4 (shorter and unambiguous for the model); leaves anything else alone."""
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return v
+    return int(f) if f.is_integer() else round(f, 2)
+
+
+# ---------------------------
+# Per-provider projections: keep only what the planner uses
+# ---------------------------
+def _compact_leg(leg):
+    if not leg:
+        return None
+    return {
+        "from": leg.get("from"),
+        "to": leg.get("to"),
+        "dep": leg.get("departAt"),
+        "arr": leg.get("arriveAt"),
+        "stops": leg.get("stops"),
+        "dur": leg.get("duration"),
+        "airlines": leg.get("airlines"),
+    }
+
+
+def compact_flights(data: dict) -> dict:
+    if data.get("error"):
+        return {"error": data.get("error")}
+    return {
+        "origin": data.get("origin"),
+        "destination": data.get("destination"),
+        "offers": [
+            {
+                "price": _num((o.get("price") or {}).get("total")),
+                "cur": (o.get("price") or {}).get("currency"),
+                "out": _compact_leg(o.get("outbound")),
+                "back": _compact_leg(o.get("inbound")),
+            }
+            for o in data.get("offers") or []
+        ],
+    }
+
+
+def compact_hotels(data: dict) -> dict:
+    if data.get("error"):
+        return {"error": data.get("error")}
+    hotels = []
+    for h in data.get("hotels") or []:
+        offer = h.get("cheapestOffer") or {}
+        price = offer.get("price") or {}
+        hotels.append({
+            "name": h.get("name"),
+            "rating": h.get("rating"),
+            "total": _num(price.get("total")),
+            "cur": price.get("currency"),
+            "board": offer.get("boardType"),
+            "room": offer.get("roomType"),
+        })
+    return {"city": data.get("city_code"), "hotels": hotels}
+
+
+def compact_transfers(data: dict) -> dict:
+    if data.get("error"):
+        return {"error": data.get("error")}
+    return {
+        "start": data.get("start"),
+        "end": data.get("end"),
+        "transfers": [
+            {
+                "type": t.get("transferType"),
+                "vehicle": t.get("vehicle"),
+                "dur": t.get("duration"),
+                "price": _num(t.get("price")),
+                "cur": t.get("currency"),
+            }
+            for t in data.get("transfers") or []
+        ],
+    }
+
+
+def compact_meta(meta: dict, project) -> dict:
+    """{source, data, notes} meta -> same shape with the data projected and empties dropped."""
+    meta = meta or {}
+    data = meta.get("data")
+    return drop_empty({
+        "source": meta.get("source"),
+        "notes": meta.get("notes"),
+        "data": project(data) if isinstance(data, dict) and data else None,
+    })
+
+
+def _longest_list(obj, path=()):
+    """(length, path) of the longest list inside obj, for budget trimming."""
+    best = (0, None)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            best = max(best, _longest_list(v, path + (k,)), key=lambda x: x[0])
+    elif isinstance(obj, list):
+        best = (len(obj), path)
+    return best
+
+
+def fit_to_budget(sections: dict, max_tokens: int) -> dict:
+    """
+    Trims the longest option list (flight offers, hotels, transfers) one entry
+    at a time until the serialized sections fit in `max_tokens`.
+    """
+    def size():
+        return sum(estimate_tokens(dumps_compact(v)) for v in sections.values())
+
+    while size() > max_tokens:
+        candidates = [(_longest_list(v), name) for name, v in sections.items()]
+        (length, path), name = max(candidates, key=lambda c: c[0][0])
+        if length <= 1 or path is None:
+            break
+        if not path:
+            sections[name] = sections[name][:-1]
+            continue
+        target = sections[name]
+        for k in path[:-1]:
+            target = target[k]
+        target[path[-1]] = target[path[-1]][:-1]
+    return sections
+
+
+def compact_provider_data(flights_meta, hotels_meta, transfers_meta, max_tokens=1500) -> dict:
+    """Projected, null-free, budget-capped provider metas keyed by their prompt names."""
+    sections = {
+        "flights_meta": compact_meta(flights_meta, compact_flights),
+        "hotels_meta": compact_meta(hotels_meta, compact_hotels),
+        "transfers_meta": compact_meta(transfers_meta, compact_transfers),
+    }
+    return fit_to_budget(sections, max_tokens)
+
+
+def compact_results(results: list, max_tokens=1500) -> list:
+    """Generic safe_call() results: drop empties and cap the size the same way."""
+    return fit_to_budget({"results": drop_empty(results or [])}, max_tokens)["results"]
@@ -0,0 +1,248 @@
+import time
+import random
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+
+import metrics
+
+# Amadeus Self-Service quotas: test allows 10 TPS (and at most one request per
+# 100ms), production 40 TPS. Shopping searches get their own, lower budget so
+# a burst of itineraries cannot starve the cheap location/transfer lookups.
+RATE_LIMIT_PROFILES = {
+    "test": {
+        "rate": 10.0,
+        "burst": 2,
+        "families": {"flight-offers": 5.0, "hotel-offers": 5.0},
+        "concurrency": 4,
+        "min_concurrency": 1,
+        "max_concurrency": 10,
+    },
+    "production": {
+        "rate": 40.0,
+        "burst": 8,
+        "families": {"flight-offers": 20.0, "hotel-offers": 20.0},
+        "concurrency": 16,
+        "min_concurrency": 2,
+        "max_concurrency": 40,
+    },
+}
+
+# Path prefix -> endpoint family (first match wins)
+ENDPOINT_FAMILIES = (
+    ("/v2/shopping/flight-offers", "flight-offers"),
+    ("/v3/shopping/hotel-offers", "hotel-offers"),
+    ("/v1/reference-data/locations/hotels", "hotel-list"),
+    ("/v1/reference-data/locations", "locations"),
+    ("/v1/shopping/transfer", "transfers"),
+    ("/v1/shopping/activities", "activities"),
+    ("/v1/security/oauth2", "auth"),
+)
+
+
+def endpoint_family(path: str) -> str:
+    for prefix, family in ENDPOINT_FAMILIES:
+        if path.startswith(prefix):
+            return family
+    return "other"
+
+
+def backoff_delay(attempt: int, base=0.25, cap=8.0) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after_seconds(resp, cap=30.0):
+    """Seconds from a numeric Retry-After header, or None."""
+    value = (getattr(resp, "headers", None) or {}).get("Retry-After")
+    try:
+        return min(cap, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_overload(status) -> bool:
+    return status == 429 or (isinstance(status, int) and status >= 500)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. reserve() takes a token now and returns how long
+    the caller must wait before using it, so the same bucket serves blocking
+    and asyncio callers (they sleep the returned delay their own way).
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            # In debt: wait until the deficit has been refilled
+            return -self._tokens / self.rate
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit adjusted by AIMD from upstream responses:
+    - each success raises the limit by 1/limit (about +1 per limit's worth of calls)
+    - a 429/5xx multiplies it by `decrease`, at most once per `cooldown` seconds,
+      so one burst of failures from the same window only counts once
+    acquire()/release() block while `limit` calls are in flight.
+    """
+
+    def __init__(self, initial, min_limit=1, max_limit=None, decrease=0.5, cooldown=1.0, clock=time.monotonic):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max_limit or max(initial, self.min_limit)
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._clock = clock
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._last_decrease = float("-inf")
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self):
+        with self._cond:
+            before = self.limit
+            self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+            if self.limit > before:
+                self._cond.notify(self.limit - before)
+
+    def on_overload(self):
+        with self._cond:
+            now = self._clock()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self._limit = max(float(self.min_limit), self._limit * self.decrease)
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "in_flight": self.in_flight, "min": self.min_limit, "max": self.max_limit}
+
+
+class AsyncAdaptiveConcurrency(AdaptiveConcurrency):
+    """AdaptiveConcurrency for one event loop: acquire()/release() are awaited."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._acond = None           # created lazily, inside the running loop
+
+    def _cond_for_loop(self):
+        if self._acond is None:
+            self._acond = asyncio.Condition()
+        return self._acond
+
+    async def acquire(self):
+        cond = self._cond_for_loop()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self):
+        cond = self._cond_for_loop()
+        async with cond:
+            self.in_flight -= 1
+            cond.notify_all()
+
+
+class UpstreamLimiter:
+    """
+    Client-side throttle for one upstream host:
+    - a host-wide token bucket plus one per endpoint family (see RATE_LIMIT_PROFILES)
+    - an AIMD concurrency limit shrunk by 429/5xx responses and regrown by successes
+
+        with limiter.slot(endpoint_family(path)):
+            resp = session.request(...)
+        limiter.observe(resp.status_code)
+    """
+
+    concurrency_class = AdaptiveConcurrency
+
+    def __init__(self, name, rate, burst=1, families=None, concurrency=8, min_concurrency=1,
+                 max_concurrency=None, clock=time.monotonic):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst, clock=clock)
+        self.family_buckets = {
+            family: TokenBucket(family_rate, burst, clock=clock) for family, family_rate in (families or {}).items()
+        }
+        self.concurrency = self.concurrency_class(
+            concurrency, min_limit=min_concurrency, max_limit=max_concurrency, clock=clock
+        )
+        self.throttled_s = 0.0
+
+    @classmethod
+    def from_profile(cls, name, profile: dict, **overrides):
+        return cls(name, **{**profile, **overrides})
+
+    def _wait_time(self, family) -> float:
+        delay = self.bucket.reserve()
+        bucket = self.family_buckets.get(family)
+        if bucket is not None:
+            delay = max(delay, bucket.reserve())
+        if delay > 0:
+            self.throttled_s += delay
+            metrics.THROTTLE_SECONDS.observe(delay, service=self.name, family=family)
+        return delay
+
+    @contextmanager
+    def slot(self, family):
+        delay = self._wait_time(family)
+        if delay > 0:
+            time.sleep(delay)
+        self.concurrency.acquire()
+        try:
+            yield
+        finally:
+            self.concurrency.release()
+
+    def observe(self, status):
+        if is_overload(status):
+            self.concurrency.on_overload()
+        elif isinstance(status, int) and status < 400:
+            self.concurrency.on_success()
+
+    def stats(self) -> dict:
+        return {**self.concurrency.stats(), "throttled_s": round(self.throttled_s, 3)}
+
+
+class AsyncUpstreamLimiter(UpstreamLimiter):
+    """UpstreamLimiter for asyncio callers: `async with limiter.slot(family)`."""
+
+    concurrency_class = AsyncAdaptiveConcurrency
+
+    @asynccontextmanager
+    async def slot(self, family):
+        delay = self._wait_time(family)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.concurrency.acquire()
+        try:
+            yield
+        finally:
+            await self.concurrency.release()
@@ -0,0 +1,159 @@
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+from log import get_logger
+
+log = get_logger(__name__)
+
+
+def atomic_write_json(path, payload, indent=None):
+    """Writes `payload` to a temp file next to `path` and renames it over `path` (readers never see half a file)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=indent, default=str)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class ResultsWriter:
+    """
+    Persists search results off the request path.
+    - submit() only records the payload and returns; one background thread does the I/O
+    - one file per query under `directory` (<origin>-<dest>-<date>-<hash>.json); the
+      same query overwrites its own file, and repeated submits of a query that is
+      still pending collapse into one write of the newest payload
+    - writes are atomic (temp file + rename)
+    - retention: files older than `max_age_s` and all but the newest `max_files` are deleted
+    - `latest_path`, if set, also gets the most recent payload (the old single
+      flight_results.json), written the same atomic way
+    - at most `max_pending` distinct queries wait for the writer; beyond that new ones are dropped
+    """
+
+    def __init__(self, directory, latest_path=None, max_files=200, max_age_s=7 * 24 * 3600,
+                 max_pending=256, sweep_every=20, indent=2):
+        self.directory = directory
+        self.latest_path = latest_path
+        self.max_files = max_files
+        self.max_age_s = max_age_s
+        self.max_pending = max_pending
+        self.sweep_every = sweep_every
+        self.indent = indent
+
+        self._pending = {}               # filename -> payload (insertion order = submit order)
+        self._latest = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._busy = False
+        self._writes_since_sweep = sweep_every     # sweep once on the first batch
+
+        self.written = 0
+        self.dropped = 0
+        self.failures = 0
+
+    @staticmethod
+    def filename_for(query: dict) -> str:
+        raw = json.dumps(query or {}, sort_keys=True, separators=(",", ":"), default=str)
+        digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+        parts = [str((query or {}).get(k) or "") for k in ("originLocationCode", "destinationLocationCode", "departureDate")]
+        slug = re.sub(r"[^A-Za-z0-9-]+", "", "-".join(p for p in parts if p))
+        return f"{slug}-{digest}.json" if slug else f"{digest}.json"
+
+    def submit(self, payload: dict) -> bool:
+        """Queues `payload` for writing; False if it was dropped because the writer is backed up."""
+        name = self.filename_for(payload.get("query"))
+        with self._cond:
+            if name not in self._pending and len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.pop(name, None)
+            self._pending[name] = payload
+            self._latest = payload
+            self._ensure_thread()
+            self._cond.notify()
+        return True
+
+    def flush(self, timeout=5.0) -> bool:
+        """Waits until everything submitted so far is on disk (for shutdown and scripts)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._latest is not None or self._busy:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), "written": self.written, "dropped": self.dropped, "failures": self.failures}
+
+    # -----------------------------
+    # Writer thread
+    # -----------------------------
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="results-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and self._latest is None:
+                    self._cond.wait()
+                batch, self._pending = self._pending, {}
+                latest, self._latest = self._latest, None
+                self._busy = True
+
+            for name, payload in batch.items():
+                self._write(os.path.join(self.directory, name), payload)
+            if latest is not None and self.latest_path:
+                self._write(self.latest_path, latest)
+
+            self._writes_since_sweep += len(batch)
+            if self._writes_since_sweep >= self.sweep_every:
+                self._writes_since_sweep = 0
+                self.sweep()
+
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()      # wake flush()
+
+    def _write(self, path, payload):
+        try:
+            atomic_write_json(path, payload, indent=self.indent)
+            self.written += 1
+        except Exception as e:
+            self.failures += 1
+            log.warning("⚠️ could not write results to %s: %s", path, e)
+
+    def sweep(self):
+        """Applies the retention limits to `directory`."""
+        try:
+            entries = []
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".json") and entry.is_file():
+                        entries.append((entry.stat().st_mtime, entry.path))
+        except OSError:
+            return
+
+        entries.sort(reverse=True)
+        cutoff = time.time() - self.max_age_s if self.max_age_s else None
+        for i, (mtime, path) in enumerate(entries):
+            if i >= self.max_files or (cutoff is not None and mtime < cutoff):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
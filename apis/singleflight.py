@@ -0,0 +1,104 @@
+import asyncio
+import threading
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for `key` is in flight,
+    other threads asking for the same key wait for it and get its result (or
+    its exception) instead of making their own call. Nothing is kept once the
+    call completes, so this is deduplication, not caching.
+    """
+
+    def __init__(self):
+        self._calls = {}             # key -> _Call
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        """Returns (result, shared): `shared` is True when another caller's in-flight call was reused."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "calls": self.calls, "shared": self.shared}
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+    SingleFlight for coroutines (one event loop). If the leading task is
+    cancelled, its waiters are not: one of them starts the call again.
+    """
+
+    async def do(self, key, fn):
+        while True:
+            call = self._calls.get(key)
+            if call is None:
+                break
+            await call.done.wait()
+            if not call.cancelled:
+                self.shared += 1
+                if call.error is not None:
+                    raise call.error
+                return call.result, True
+
+        call = self._calls[key] = _AsyncCall()
+        self.calls += 1
+        try:
+            call.result = await fn()
+            return call.result, False
+        except asyncio.CancelledError:
+            call.cancelled = True
+            raise
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            call.done.set()
+
+
+class _AsyncCall:
+    __slots__ = ("done", "result", "error", "cancelled")
+
+    def __init__(self):
+        self.done = asyncio.Event()
+        self.result = None
+        self.error = None
+        self.cancelled = False
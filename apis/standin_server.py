@@ -0,0 +1,622 @@
+"""
+Offline stand-in for the Amadeus and Groq endpoints the app calls, for load and
+latency benchmarking without live (rate-limited, noisy) services.
+
+Replays the recorded payloads in data/standin/ (or --fixtures DIR) with
+configurable latency, error rates and payload sizes:
+  - Amadeus: oauth2 token (tokens really expire), locations (answered from
+    airports.dat), flight-offers (code 141 injection), hotels by-city,
+    hotel-offers, transfers / transfer-offers
+  - Groq: /openai/v1/chat/completions, plain or streamed (SSE), with an
+    itinerary/skeleton/day-batch JSON answer derived from the prompt
+
+    cd apis && python standin_server.py --port 9000 --latency-ms 150 --error-141-rate 0.05
+
+Point the app at it:
+    AMADEUS_HOSTNAME=http://127.0.0.1:9000 GROQ_BASE_URL=http://127.0.0.1:9000/openai/v1 \
+    GROQ_API_KEY=standin AMADEUS_CLIENT_ID=standin AMADEUS_CLIENT_SECRET=standin python app.py
+
+GET /_standin/stats returns request/error counters; POST /_standin/config
+changes settings at runtime (same keys as StandInConfig).
+"""
+import os
+import re
+import copy
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime
+
+from flask import Flask, Response, request, jsonify
+
+from gazetteer import get_gazetteer
+
+DEFAULT_FIXTURES_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "standin")
+)
+
+# Endpoint names used for latency overrides and stats
+ENDPOINTS = (
+    "token", "locations", "flight-offers", "hotels-by-city", "hotel-offers",
+    "transfers", "transfer-offers", "groq",
+)
+
+
+class StandInConfig:
+    """
+    Knobs of the stand-in server. Latencies are milliseconds; rates are 0..1.
+    Size settings of None replay the fixture as recorded; a number clones or
+    trims the recorded entries to exactly that many.
+    """
+
+    def __init__(self, **overrides):
+        self.fixtures_dir = DEFAULT_FIXTURES_DIR
+        self.seed = 7
+
+        # Amadeus latency: uniform in [latency - jitter, latency + jitter], per-endpoint overrides
+        self.latency_ms = 120.0
+        self.jitter_ms = 40.0
+        self.endpoint_latency_ms = {}        # e.g. {"hotel-offers": 900}
+
+        # Amadeus failures
+        self.token_ttl_s = 1799
+        self.error_401_rate = 0.0            # revokes the caller's token, like an early expiry
+        self.error_141_rate = 0.0            # flight-offers "SYSTEM ERROR HAS OCCURRED"
+        self.error_5xx_rate = 0.0            # 503 on any Amadeus data endpoint
+        self.quota_rps = None                # 429 + Retry-After above this many data requests/s (Amadeus quotas)
+
+        # Payload sizes
+        self.flight_offers = None            # offers per flight search (capped by the "max" param when None)
+        self.hotels_per_city = None          # hotelIds returned by hotels/by-city
+        self.offers_per_hotel = None         # offers per hotel in hotel-offers
+        self.hotel_availability = 1.0        # share of requested hotelIds that come back with offers
+        self.transfer_offers = None
+
+        # Groq
+        self.groq_latency_ms = 400.0         # time to first token
+        self.groq_tokens_per_s = 600.0       # completion speed (4 chars ~ 1 token)
+        self.groq_error_rate = 0.0           # 503
+        self.groq_invalid_day_rate = 0.0     # days with the wrong number of items (exercises repair)
+        self.groq_code_fence = False         # wrap non-streamed replies in ```json fences
+
+        self.update(**overrides)
+
+    def update(self, **values):
+        for k, v in values.items():
+            if not hasattr(self, k):
+                raise KeyError(f"Unknown stand-in setting: {k}")
+            setattr(self, k, v)
+        return self
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+
+class StandInState:
+    """Issued tokens, fixtures and counters shared by the request threads."""
+
+    def __init__(self, config: StandInConfig):
+        self.config = config
+        self.fixtures = load_fixtures(config.fixtures_dir)
+        self.gazetteer = get_gazetteer()
+        self.rng = random.Random(config.seed)
+
+        self._lock = threading.Lock()
+        self._tokens = {}                    # token -> expires_at (monotonic)
+        self._token_seq = 0
+        self.requests = {}
+        self.errors = {}
+        self._window = (0, 0)                # (second, requests in that second)
+
+    def issue_token(self):
+        with self._lock:
+            self._token_seq += 1
+            token = f"standin-{self._token_seq:06d}"
+            self._tokens[token] = time.monotonic() + self.config.token_ttl_s
+            return token
+
+    def token_valid(self, token) -> bool:
+        expires_at = self._tokens.get(token)
+        return expires_at is not None and time.monotonic() < expires_at
+
+    def revoke(self, token):
+        with self._lock:
+            self._tokens.pop(token, None)
+
+    def chance(self, rate) -> bool:
+        if not rate:
+            return False
+        with self._lock:
+            return self.rng.random() < rate
+
+    def over_quota(self) -> bool:
+        """True once more than quota_rps data requests arrived in the current second."""
+        quota = self.config.quota_rps
+        if not quota:
+            return False
+        second = int(time.monotonic())
+        with self._lock:
+            start, n = self._window
+            n = n + 1 if start == second else 1
+            self._window = (second, n)
+            return n > quota
+
+    def count(self, endpoint, error=None):
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            if error:
+                key = f"{endpoint}:{error}"
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": dict(self.requests), "errors": dict(self.errors), "tokens_issued": self._token_seq}
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.errors.clear()
+
+
+def load_fixtures(directory) -> dict:
+    """{endpoint name: recorded payload} for every <name>.json in `directory`."""
+    fixtures = {}
+    for name in ENDPOINTS:
+        path = os.path.join(directory, f"{name}.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                fixtures[name] = json.load(f)
+    # transfer-offers (POST) replays the same recording as GET transfers unless it has its own
+    fixtures.setdefault("transfer-offers", fixtures.get("transfers") or {"data": []})
+    return fixtures
+
+
+def resize(items, n, relabel):
+    """`items` cloned round-robin (or trimmed) to n entries; relabel(item, i) makes clones distinct."""
+    if n is None or not items:
+        return copy.deepcopy(items)
+    out = []
+    for i in range(n):
+        item = copy.deepcopy(items[i % len(items)])
+        relabel(item, i)
+        out.append(item)
+    return out
+
+
+def _scale_price(value, factor):
+    try:
+        return f"{float(value) * factor:.2f}"
+    except (TypeError, ValueError):
+        return value
+
+
+# ---------------------------
+# Groq answers
+# ---------------------------
+DATES_RE = re.compile(r"dates:\s*(\d{4}-\d{2}-\d{2})\s+to\s+(\d{4}-\d{2}-\d{2})")
+BATCH_RE = re.compile(r"day object\(s\):\s*([\d,\s]+)")
+SKELETON_RE = re.compile(r"days MUST contain exactly (\d+) entries")
+DEST_RE = re.compile(r"destination:\s*(.+)")
+ITEM_TIMES = [("08:00", "09:00"), ("09:30", "12:00"), ("12:30", "13:30"), ("14:00", "16:30"), ("17:00", "18:30"), ("19:30", "21:00")]
+
+
+def _plan_day(n, destination, invalid=False):
+    items = [
+        {"start": s, "end": e, "text": f"Stand-in activity {k + 1} of day {n} in {destination}"}
+        for k, (s, e) in enumerate(ITEM_TIMES)
+    ]
+    return {"day": n, "title": f"Day {n} in {destination}", "items": items[:4] if invalid else items}
+
+
+def _plan_header(destination, depart, ret):
+    rng = lambda lo, hi, t="ESTIMATE": {"type": t, "range_usd": [lo, hi], "notes": "stand-in"}
+    return {
+        "summary": {
+            "destination": destination, "origin": "BOS", "dates": f"{depart} to {ret}",
+            "traveler_count": 1, "assumptions": ["stand-in response"],
+        },
+        "cost_breakdown": {
+            "flights": rng(600, 800), "hotels": rng(500, 900), "local_transport": rng(60, 120),
+            "food": rng(200, 350), "activities": rng(100, 250),
+            "total_estimated": {"range_usd": [1460, 2420], "notes": "stand-in"},
+        },
+        "recommended_hotels": [{"name": "HOTEL LE MARAIS", "price_total_usd": 820, "why": "central", "source": "ESTIMATE"}],
+        "flight_plan": {"source": "ESTIMATE", "options": [{"summary": "BOS-CDG nonstop", "price_usd": 612, "notes": ""}]},
+    }
+
+
+def groq_answer(prompt: str, state: StandInState) -> str:
+    """JSON text shaped like what the app's prompt asks for (single plan, skeleton or day batch)."""
+    dest_m = DEST_RE.search(prompt)
+    destination = dest_m.group(1).strip() if dest_m else "the city"
+    dates_m = DATES_RE.search(prompt)
+    depart, ret = (dates_m.group(1), dates_m.group(2)) if dates_m else ("2026-11-01", "2026-11-03")
+    try:
+        num_days = (datetime.strptime(ret, "%Y-%m-%d") - datetime.strptime(depart, "%Y-%m-%d")).days + 1
+    except ValueError:
+        num_days = 3
+    invalid = lambda: state.chance(state.config.groq_invalid_day_rate)
+
+    batch_m = BATCH_RE.search(prompt)
+    if batch_m:
+        days = [int(x) for x in batch_m.group(1).replace(",", " ").split()]
+        return json.dumps({"itinerary": [_plan_day(n, destination, invalid()) for n in days]})
+
+    out = _plan_header(destination, depart, ret)
+    skeleton_m = SKELETON_RE.search(prompt)
+    if skeleton_m:
+        out["days"] = [{"day": n, "theme": f"Theme {n}", "area": f"Area {n}"} for n in range(1, int(skeleton_m.group(1)) + 1)]
+    else:
+        out["itinerary"] = [_plan_day(n, destination, invalid()) for n in range(1, max(1, num_days) + 1)]
+    return json.dumps(out)
+
+
+# ---------------------------
+# App
+# ---------------------------
+def create_standin_app(config: StandInConfig = None) -> Flask:
+    config = config or StandInConfig()
+    state = StandInState(config)
+    app = Flask("standin")
+    app.config["STANDIN_STATE"] = state
+
+    def delay(endpoint):
+        base = config.endpoint_latency_ms.get(endpoint, config.latency_ms)
+        with state._lock:
+            ms = base + state.rng.uniform(-config.jitter_ms, config.jitter_ms)
+        if ms > 0:
+            time.sleep(ms / 1000.0)
+
+    def amadeus_error(status, code, title, endpoint):
+        state.count(endpoint, error=code)
+        return jsonify({"errors": [{"status": status, "code": code, "title": title}]}), status
+
+    def guarded(endpoint):
+        """Auth + injected failures shared by the Amadeus data endpoints; returns an error response or None."""
+        delay(endpoint)
+        auth = request.headers.get("Authorization", "")
+        token = auth[len("Bearer "):] if auth.startswith("Bearer ") else ""
+        if not state.token_valid(token):
+            return amadeus_error(401, 38190, "Invalid access token", endpoint)
+        if state.chance(config.error_401_rate):
+            state.revoke(token)
+            return amadeus_error(401, 38192, "Access token expired", endpoint)
+        if state.chance(config.error_5xx_rate):
+            return amadeus_error(503, 38189, "Service unavailable", endpoint)
+        if state.over_quota():
+            resp, status = amadeus_error(429, 38194, "Too many requests", endpoint)
+            resp.headers["Retry-After"] = "1"
+            return resp, status
+        state.count(endpoint)
+        return None
+
+    # -----------------------------
+    # Amadeus
+    # -----------------------------
+    @app.post("/v1/security/oauth2/token")
+    def token():
+        delay("token")
+        if request.form.get("grant_type") != "client_credentials" or not request.authorization:
+            state.count("token", error="invalid_client")
+            return jsonify({"error": "invalid_client", "error_description": "Client credentials are invalid"}), 401
+        state.count("token")
+        return jsonify({
+            "type": "amadeusOAuth2Token",
+            "username": "standin@example.com",
+            "application_name": "standin",
+            "client_id": request.authorization.username,
+            "token_type": "Bearer",
+            "access_token": state.issue_token(),
+            "expires_in": config.token_ttl_s,
+            "state": "approved",
+            "scope": "",
+        })
+
+    @app.get("/v1/reference-data/locations")
+    def locations():
+        err = guarded("locations")
+        if err:
+            return err
+        keyword = request.args.get("keyword", "")
+        sub_types = request.args.get("subType", "CITY,AIRPORT").split(",")
+        g = state.gazetteer
+
+        city_key = g.city_containing(keyword) or g.closest_city(keyword)
+        airports = g.by_city.get(city_key, []) if city_key else []
+        by_code = g.lookup_iata(keyword)
+        if by_code and by_code not in airports:
+            airports = [by_code] + airports
+
+        data = []
+        if airports and "CITY" in sub_types:
+            a = airports[0]
+            data.append({"type": "location", "subType": "CITY", "name": a["city"].upper(), "iataCode": a["iata"],
+                         "address": {"cityName": a["city"].upper(), "countryName": a["country"].upper()}})
+        if "AIRPORT" in sub_types:
+            for a in airports[:5]:
+                data.append({"type": "location", "subType": "AIRPORT", "name": a["name"].upper(), "iataCode": a["iata"],
+                             "address": {"cityName": a["city"].upper(), "countryName": a["country"].upper()}})
+        limit = int(request.args.get("page[limit]", 10) or 10)
+        return jsonify({"meta": {"count": len(data[:limit])}, "data": data[:limit]})
+
+    @app.get("/v2/shopping/flight-offers")
+    def flight_offers():
+        err = guarded("flight-offers")
+        if err:
+            return err
+        if state.chance(config.error_141_rate):
+            return amadeus_error(500, 141, "SYSTEM ERROR HAS OCCURRED", "flight-offers")
+
+        recorded = state.fixtures.get("flight-offers") or {"data": [], "dictionaries": {}}
+        origin = request.args.get("originLocationCode")
+        dest = request.args.get("destinationLocationCode")
+        depart = request.args.get("departureDate")
+        ret = request.args.get("returnDate")
+
+        def relabel(offer, i):
+            offer["id"] = str(i + 1)
+            factor = 1 + 0.07 * (i // max(1, len(recorded["data"])))
+            offer["price"]["total"] = _scale_price(offer["price"].get("total"), factor)
+            offer["price"]["grandTotal"] = offer["price"]["total"]
+
+        n = config.flight_offers
+        if n is None:
+            n = min(int(request.args.get("max", 250)), len(recorded["data"]))
+        offers = resize(recorded["data"], n, relabel)
+        if request.args.get("nonStop") == "true":
+            offers = [o for o in offers if all(len(it["segments"]) == 1 for it in o["itineraries"])] or offers[:1]
+        for o in offers:
+            _retarget_offer(o, origin, dest, depart, ret)
+        if not ret:
+            for o in offers:
+                o["itineraries"] = o["itineraries"][:1]
+
+        return jsonify({"meta": {"count": len(offers)}, "data": offers, "dictionaries": recorded.get("dictionaries", {})})
+
+    @app.get("/v1/reference-data/locations/hotels/by-city")
+    def hotels_by_city():
+        err = guarded("hotels-by-city")
+        if err:
+            return err
+        city = (request.args.get("cityCode") or "XXX").upper()[:3]
+        recorded = (state.fixtures.get("hotels-by-city") or {}).get("data") or []
+
+        def relabel(h, i):
+            h["name"] = f"{h['name']} {i + 1}"
+
+        hotels = resize(recorded, config.hotels_per_city, relabel)
+        for i, h in enumerate(hotels):
+            h["hotelId"] = f"ST{city}{i + 1:03d}"
+            h["iataCode"] = city
+        return jsonify({"data": hotels, "meta": {"count": len(hotels)}})
+
+    @app.get("/v3/shopping/hotel-offers")
+    def hotel_offers():
+        err = guarded("hotel-offers")
+        if err:
+            return err
+        hotel_ids = [h for h in (request.args.get("hotelIds") or "").split(",") if h]
+        if not hotel_ids:
+            return amadeus_error(400, 32, "INVALID DATA RECEIVED", "hotel-offers")
+        recorded = (state.fixtures.get("hotel-offers") or {}).get("data") or []
+        if not recorded:
+            return jsonify({"data": []})
+        check_in, check_out = request.args.get("checkInDate"), request.args.get("checkOutDate")
+
+        data = []
+        for i, hotel_id in enumerate(hotel_ids):
+            # Deterministic per hotelId, so repeated queries see the same availability
+            if random.Random(f"{config.seed}:{hotel_id}").random() >= config.hotel_availability:
+                continue
+            entry = copy.deepcopy(recorded[i % len(recorded)])
+            entry["hotel"]["hotelId"] = hotel_id
+            entry["hotel"]["name"] = f"{entry['hotel'].get('name')} ({hotel_id})"
+
+            def relabel(o, k, hotel_id=hotel_id):
+                o["id"] = f"{hotel_id}-{k + 1}"
+                o["price"]["total"] = _scale_price(o["price"].get("total"), 1 + 0.12 * k)
+
+            entry["offers"] = resize(entry.get("offers") or [], config.offers_per_hotel, relabel)
+            for o in entry["offers"]:
+                o["checkInDate"], o["checkOutDate"] = check_in, check_out
+            data.append(entry)
+        return jsonify({"data": data})
+
+    def transfer_payload(endpoint, start_code):
+        recorded = (state.fixtures.get(endpoint) or {}).get("data") or []
+
+        def relabel(t, i):
+            t["id"] = f"TRF{i + 1}"
+            t["quotation"]["monetaryAmount"]["value"] = _scale_price(t["quotation"]["monetaryAmount"].get("value"), 1 + 0.05 * i)
+
+        data = resize(recorded, config.transfer_offers, relabel)
+        for t in data:
+            t.setdefault("start", {})["locationCode"] = start_code
+        return jsonify({"data": data})
+
+    @app.get("/v1/shopping/transfers")
+    def transfers():
+        err = guarded("transfers")
+        return err or transfer_payload("transfers", request.args.get("startLocationCode"))
+
+    @app.post("/v1/shopping/transfer-offers")
+    def transfer_offers():
+        err = guarded("transfer-offers")
+        body = request.get_json(force=True, silent=True) or {}
+        return err or transfer_payload("transfer-offers", body.get("startLocationCode"))
+
+    # -----------------------------
+    # Groq (OpenAI-compatible)
+    # -----------------------------
+    @app.post("/openai/v1/chat/completions")
+    def chat_completions():
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            state.count("groq", error=401)
+            return jsonify({"error": {"message": "Invalid API Key", "type": "invalid_request_error"}}), 401
+        if state.chance(config.groq_error_rate):
+            time.sleep(config.groq_latency_ms / 1000.0)
+            state.count("groq", error=503)
+            return jsonify({"error": {"message": "Service Unavailable", "type": "internal_server_error"}}), 503
+        state.count("groq")
+
+        body = request.get_json(force=True) or {}
+        prompt = "\n".join(m.get("content") or "" for m in body.get("messages") or [])
+        content = groq_answer(prompt, state)
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        }
+        gen_s = usage["completion_tokens"] / max(1.0, config.groq_tokens_per_s)
+        model = body.get("model") or "standin"
+        created = int(time.time())
+
+        if body.get("stream"):
+            def events():
+                time.sleep(config.groq_latency_ms / 1000.0)
+                chunks = [content[i:i + 48] for i in range(0, len(content), 48)]
+                pause = gen_s / max(1, len(chunks))
+                for chunk in chunks:
+                    event = {"id": "chatcmpl-standin", "object": "chat.completion.chunk", "created": created, "model": model,
+                             "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(event)}\n\n"
+                    time.sleep(pause)
+                final = {"id": "chatcmpl-standin", "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage}}
+                yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return Response(events(), mimetype="text/event-stream")
+
+        time.sleep(config.groq_latency_ms / 1000.0 + gen_s)
+        if config.groq_code_fence:
+            content = f"```json\n{content}\n```"
+        return jsonify({
+            "id": "chatcmpl-standin",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    # -----------------------------
+    # Control
+    # -----------------------------
+    @app.get("/_standin/stats")
+    def stats():
+        return jsonify(state.stats())
+
+    @app.post("/_standin/reset")
+    def reset():
+        state.reset()
+        return jsonify({"ok": True})
+
+    @app.route("/_standin/config", methods=["GET", "POST"])
+    def settings():
+        if request.method == "POST":
+            try:
+                config.update(**(request.get_json(force=True) or {}))
+            except KeyError as e:
+                return jsonify({"error": str(e)}), 400
+        return jsonify(config.as_dict())
+
+    return app
+
+
+def _retarget_offer(offer, origin, dest, depart, ret):
+    """Moves a recorded offer to the searched route/dates (first/last airports and day of travel)."""
+    for idx, (frm, to, day) in enumerate(((origin, dest, depart), (dest, origin, ret))):
+        if idx >= len(offer.get("itineraries") or []) or not day:
+            continue
+        segs = offer["itineraries"][idx].get("segments") or []
+        if not segs:
+            continue
+        if frm:
+            segs[0]["departure"]["iataCode"] = frm
+        if to:
+            segs[-1]["arrival"]["iataCode"] = to
+        try:
+            shift = datetime.strptime(day, "%Y-%m-%d") - datetime.strptime(segs[0]["departure"]["at"][:10], "%Y-%m-%d")
+        except (KeyError, ValueError):
+            continue
+        for s in segs:
+            for end in ("departure", "arrival"):
+                at = s.get(end, {}).get("at")
+                if at:
+                    s[end]["at"] = (datetime.fromisoformat(at) + shift).isoformat()
+
+
+def start_in_thread(config: StandInConfig = None, host="127.0.0.1", port=0):
+    """Serves the stand-in from a daemon thread; returns (server, base_url). Call server.shutdown() to stop."""
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, create_standin_app(config), threaded=True)
+    threading.Thread(target=server.serve_forever, name="standin-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Amadeus + Groq stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR, help="directory of recorded <endpoint>.json payloads")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency-ms", type=float, default=120.0)
+    parser.add_argument("--jitter-ms", type=float, default=40.0)
+    parser.add_argument("--endpoint-latency", action="append", default=[], metavar="NAME=MS",
+                        help=f"per-endpoint latency override, NAME in: {', '.join(ENDPOINTS[:-1])}")
+    parser.add_argument("--token-ttl-s", type=int, default=1799)
+    parser.add_argument("--error-401-rate", type=float, default=0.0)
+    parser.add_argument("--error-141-rate", type=float, default=0.0)
+    parser.add_argument("--error-5xx-rate", type=float, default=0.0)
+    parser.add_argument("--quota-rps", type=float, default=None, help="answer 429 above this many Amadeus requests/s")
+    parser.add_argument("--flight-offers", type=int, default=None)
+    parser.add_argument("--hotels-per-city", type=int, default=None)
+    parser.add_argument("--offers-per-hotel", type=int, default=None)
+    parser.add_argument("--hotel-availability", type=float, default=1.0)
+    parser.add_argument("--transfer-offers", type=int, default=None)
+    parser.add_argument("--groq-latency-ms", type=float, default=400.0)
+    parser.add_argument("--groq-tokens-per-s", type=float, default=600.0)
+    parser.add_argument("--groq-error-rate", type=float, default=0.0)
+    parser.add_argument("--groq-invalid-day-rate", type=float, default=0.0)
+    parser.add_argument("--groq-code-fence", action="store_true")
+    args = parser.parse_args()
+
+    endpoint_latency = {}
+    for item in args.endpoint_latency:
+        name, _, ms = item.partition("=")
+        if name not in ENDPOINTS:
+            parser.error(f"unknown endpoint {name!r}")
+        endpoint_latency[name] = float(ms)
+
+    config = StandInConfig(
+        fixtures_dir=args.fixtures,
+        seed=args.seed,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        endpoint_latency_ms=endpoint_latency,
+        token_ttl_s=args.token_ttl_s,
+        error_401_rate=args.error_401_rate,
+        error_141_rate=args.error_141_rate,
+        error_5xx_rate=args.error_5xx_rate,
+        quota_rps=args.quota_rps,
+        flight_offers=args.flight_offers,
+        hotels_per_city=args.hotels_per_city,
+        offers_per_hotel=args.offers_per_hotel,
+        hotel_availability=args.hotel_availability,
+        transfer_offers=args.transfer_offers,
+        groq_latency_ms=args.groq_latency_ms,
+        groq_tokens_per_s=args.groq_tokens_per_s,
+        groq_error_rate=args.groq_error_rate,
+        groq_invalid_day_rate=args.groq_invalid_day_rate,
+        groq_code_fence=args.groq_code_fence,
+    )
+    print(f"🧪 Stand-in Amadeus/Groq on http://{args.host}:{args.port}", flush=True)
+    create_standin_app(config).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""In-process stand-ins for the Amadeus HTTP endpoints (no sockets)."""
+import threading
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None, headers=None):
+        self.status_code = status_code
+        self._payload = payload if payload is not None else {}
+        self.headers = headers or {}
+        self.text = str(self._payload)
+
+    def json(self):
+        return self._payload
+
+
+class FakeSession:
+    """
+    requests.Session look-alike. `handler(method, path, params, json)` returns a
+    FakeResponse for API calls; token requests get "t1", "t2", ... in order.
+    """
+
+    def __init__(self, handler=None, token_ttl=1799):
+        self.handler = handler or (lambda method, path, params, body: FakeResponse(200, {"data": []}))
+        self.token_ttl = token_ttl
+        self.calls = []
+        self.tokens_issued = 0
+        self._lock = threading.Lock()
+
+    def post(self, url, data=None, auth=None, headers=None, timeout=None, **kwargs):
+        if url.endswith("/v1/security/oauth2/token"):
+            with self._lock:
+                self.tokens_issued += 1
+                token = f"t{self.tokens_issued}"
+            return FakeResponse(200, {"access_token": token, "expires_in": self.token_ttl})
+        return self.request("POST", url, headers=headers, json=kwargs.get("json"), timeout=timeout)
+
+    def request(self, method, url, headers=None, params=None, json=None, timeout=None):
+        path = "/" + url.split("://", 1)[-1].split("/", 1)[-1]
+        with self._lock:
+            self.calls.append({
+                "method": method, "path": path, "params": params,
+                "auth": (headers or {}).get("Authorization"), "timeout": timeout,
+            })
+        return self.handler(method, path, params, json)
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        return self.request("GET", url, headers=headers, params=params, timeout=timeout)
@@ -0,0 +1,15 @@
+import os
+import sys
+
+# The app modules import each other by bare name (run from apis/)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# No .env, no Amadeus/Groq credentials, no files written next to the repo
+os.environ.update(
+    ITINERARY_ENV_FILE="off",
+    FLIGHT_RESULTS_DIR="off",
+    LOG_LEVEL="WARNING",
+    LLM_CACHE_DIR="",
+    AMADEUS_CLIENT_ID="test",
+    AMADEUS_CLIENT_SECRET="test",
+)
@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import app
+
+APIS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Runs in a fresh interpreter: any socket connect during import/create_app() fails loudly
+STARTUP_SCRIPT = """
+import json, os, socket, sys
+def no_network(*args, **kwargs):
+    raise AssertionError("network used at startup")
+socket.socket.connect = no_network
+socket.create_connection = no_network
+import app
+app.create_app()
+print(json.dumps({
+    "api_built": app._api is not None,
+    "groq_model": app.GROQ_MODEL,
+    "results_dir_exists": os.path.exists(app.RESULTS_DIR),
+}))
+"""
+
+
+def run_startup(tmp_path, **env):
+    results_dir = tmp_path / "results"
+    full_env = {**os.environ, "FLIGHT_RESULTS_DIR": str(results_dir), "FLIGHT_RESULTS_PATH": str(tmp_path / "latest.json"), **env}
+    full_env.pop("GROQ_MODEL", None)
+    proc = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT], cwd=APIS_DIR, env=full_env, capture_output=True, text=True, timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def test_import_and_create_app_have_no_side_effects(tmp_path):
+    out = run_startup(tmp_path, ITINERARY_ENV_FILE="off")
+    assert out == {"api_built": False, "groq_model": "llama-3.3-70b-versatile", "results_dir_exists": False}
+
+
+def test_env_file_is_read_from_itinerary_env_file(tmp_path):
+    env_file = tmp_path / "custom.env"
+    env_file.write_text("GROQ_MODEL=from-env-file\n")
+    out = run_startup(tmp_path, ITINERARY_ENV_FILE=str(env_file))
+    assert out["groq_model"] == "from-env-file"
+
+
+def test_get_api_builds_one_client(monkeypatch):
+    built = []
+    monkeypatch.setattr(app, "_api", None)
+    monkeypatch.setattr(app, "build_amadeus_api", lambda: built.append(1) or object())
+
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(app.get_api())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(built) == 1
+    assert len({id(r) for r in results}) == 1
+    assert app.api is results[0]
+
+
+def test_build_amadeus_api_does_not_fetch_a_token():
+    api = app.build_amadeus_api()
+    assert api._tokens.token is None
+    assert api._tokens.refresh_count == 0
@@ -0,0 +1,110 @@
+import asyncio
+
+import httpx
+
+from async_amadeus import AsyncAmadeusAPI
+from token_manager import AsyncTokenManager
+
+
+def make_api(handler):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AsyncAmadeusAPI("id", "secret", client=client, rate_limits=False)
+
+
+def test_async_client_builds_no_sync_session_or_token_manager():
+    api = make_api(lambda request: httpx.Response(500))
+    assert api.session is None
+    assert isinstance(api._tokens, AsyncTokenManager)
+
+
+def test_async_request_refreshes_the_token_once_on_401():
+    seen = {"tokens": 0, "auth": []}
+
+    def handler(request):
+        if request.url.path.endswith("/oauth2/token"):
+            seen["tokens"] += 1
+            return httpx.Response(200, json={"access_token": f"t{seen['tokens']}", "expires_in": 1799})
+        auth = request.headers["Authorization"]
+        seen["auth"].append(auth)
+        if auth == "Bearer t1":
+            return httpx.Response(401, json={"errors": []})
+        return httpx.Response(200, json={"data": []})
+
+    api = make_api(handler)
+
+    async def run():
+        try:
+            return await api._arequest("GET", "/v1/reference-data/locations", params={"keyword": "BOS"})
+        finally:
+            await api.aclose()
+
+    resp = asyncio.run(run())
+    assert resp.status_code == 200
+    assert seen["tokens"] == 2
+    assert seen["auth"] == ["Bearer t1", "Bearer t2"]
+
+
+def test_async_early_stop_matches_the_sync_client():
+    # Same rule as _fetch_hotel_offer_chunks: unsubmitted chunks are dropped, submitted ones finish and are cached
+    requested = []
+    release = {}
+
+    async def handler(request):
+        if request.url.path.endswith("/oauth2/token"):
+            return httpx.Response(200, json={"access_token": "t1", "expires_in": 1799})
+        if request.url.path.endswith("/hotels/by-city"):
+            return httpx.Response(200, json={"data": [{"hotelId": f"H{i:03d}"} for i in range(12)]})
+        wanted = request.url.params["hotelIds"].split(",")
+        requested.append(wanted[0])
+        if wanted[0] == "H004":
+            await release["event"].wait()
+        return httpx.Response(200, json={"data": [
+            {"hotel": {"hotelId": h}, "offers": [{"price": {"total": str(1000 - int(h[1:]))}}]} for h in wanted
+        ]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    api = AsyncAmadeusAPI("id", "secret", client=client, rate_limits=False, hotel_chunk_size=4, hotel_offers_concurrency=2)
+
+    async def run():
+        release["event"] = asyncio.Event()
+        try:
+            result = await api.asearch_hotels_clean("PAR", "2030-03-10", "2030-03-12", max_results=2)
+            assert len(api._background) == 1
+            release["event"].set()
+            await asyncio.gather(*api._background)
+            return result
+        finally:
+            await api.aclose()
+
+    result = asyncio.run(run())
+    assert [h["id"] for h in result["hotels"]] == ["H003", "H002"]
+    assert sorted(requested) == ["H000", "H004"]
+    assert len(api.hotel_offers_cache.backend) == 2
+    assert not api._background
+
+
+def test_async_matrix_shares_the_search_semaphore():
+    api = make_api(lambda request: httpx.Response(500))
+    api.flight_matrix_concurrency, api.search_pool_size = 3, 4
+    api.aresolve_iata = lambda q: asyncio.sleep(0, q)
+    seen = {"now": 0, "max": 0}
+
+    async def cached(params, origin, dest, depart, ret):
+        seen["now"] += 1
+        seen["max"] = max(seen["max"], seen["now"])
+        await asyncio.sleep(0.01)
+        seen["now"] -= 1
+        return {"offers": [{"price": {"total": "99"}}]}, 0.0, "MISS"
+
+    api._acached_flight_offers = cached
+
+    async def run(searches):
+        seen["max"] = 0
+        args = (["BOS", "PVD"], "CDG", "2030-03-10")
+        return await asyncio.gather(*(api.asearch_flights_matrix(*args, flex_days=2) for _ in range(searches)))
+
+    out = asyncio.run(run(1))
+    assert seen["max"] == 3
+    assert out[0]["grid"]["PVD"]["2030-03-12"] == 99.0
+    asyncio.run(run(3))
+    assert seen["max"] == 4
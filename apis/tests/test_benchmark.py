@@ -0,0 +1,80 @@
+import io
+import threading
+
+from flask import Flask, jsonify
+from werkzeug.serving import make_server
+
+from benchmark import (
+    parse_server_timing,
+    pct_delta,
+    percentile,
+    print_report,
+    request_bodies,
+    run_scenario,
+    summarize_ms,
+)
+
+
+def test_percentile_interpolates():
+    values = [10.0, 20.0, 30.0, 40.0]
+    assert percentile(values, 0) == 10.0
+    assert percentile(values, 50) == 25.0
+    assert percentile(values, 100) == 40.0
+    assert percentile([], 50) is None
+
+
+def test_summarize_ms_sorts_its_input():
+    s = summarize_ms([3, 1, 2])
+    assert (s["count"], s["p50"], s["max"], s["mean"]) == (3, 2, 3, 2)
+    assert summarize_ms([]) == {"count": 0}
+
+
+def test_parse_server_timing():
+    header = "resolve;dur=1.5, llm;desc=\"groq\";dur=840.1, total;dur=901, junk;dur=x, ;dur=3"
+    assert parse_server_timing(header) == {"resolve": 1.5, "llm": 840.1, "total": 901.0}
+    assert parse_server_timing(None) == {}
+
+
+def test_pct_delta():
+    assert pct_delta(110, 100) == "+10.0%"
+    assert pct_delta(90, 100) == "-10.0%"
+    assert pct_delta(None, 100) == "n/a"
+    assert pct_delta(5, 0) == "n/a"
+
+
+def test_request_bodies_cycle_over_distinct_queries():
+    bodies = request_bodies("hotels", 10, distinct=3, days=3, no_llm_cache=False)
+    assert len(bodies) == 10
+    assert len({(b["destination"], b["dates"]) for b in bodies}) == 3
+    assert bodies[0]["dates"] == "2026-11-02 to 2026-11-04"
+
+
+def test_run_scenario_collects_latency_and_stages():
+    app = Flask("bench-target")
+    calls = []
+
+    @app.post("/api/hotels")
+    def hotels():
+        calls.append(1)
+        if len(calls) % 5 == 0:
+            return jsonify({"error": "boom"}), 502
+        return jsonify({"hotels": []}), 200, {"Server-Timing": "hotels;dur=12.5, total;dur=14"}
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        bodies = request_bodies("hotels", 10, distinct=2, days=2, no_llm_cache=False)
+        r = run_scenario(f"http://127.0.0.1:{server.server_port}", "hotels", bodies, concurrency=4, timeout=10)
+    finally:
+        server.shutdown()
+
+    assert r["requests"] == 10
+    assert r["status_codes"] == {"200": 8, "502": 2}
+    assert r["errors"] == 2
+    assert r["latency_ok_ms"]["count"] == 8
+    assert r["stages_ms"]["hotels"] == {"count": 8, "mean": 12.5, "p50": 12.5, "p95": 12.5, "p99": 12.5, "max": 12.5}
+
+    report = {"meta": {"revision": "abc", "server": "wsgi", "concurrency": 4}, "scenarios": {"hotels": r}}
+    out = io.StringIO()
+    print_report(report, baseline=report, out=out)
+    assert "vs baseline: throughput +0.0%" in out.getvalue()
@@ -0,0 +1,62 @@
+from amadeus_api import AmadeusAPI
+from amadeus_fakes import FakeResponse, FakeSession
+
+OFFER = {
+    "price": {"total": "412.50", "currency": "USD"},
+    "itineraries": [{"duration": "PT7H", "segments": [{
+        "departure": {"iataCode": "BOS", "at": "2030-03-10T18:00:00"},
+        "arrival": {"iataCode": "CDG", "at": "2030-03-11T07:00:00"},
+        "carrierCode": "AF", "number": "333",
+    }]}],
+}
+
+
+def flight_api(status=200):
+    def handler(method, path, params, body):
+        if path == "/v2/shopping/flight-offers":
+            if status >= 400:
+                return FakeResponse(status, {"errors": [{"code": 477, "detail": "bad"}]})
+            return FakeResponse(200, {"data": [OFFER]})
+        return FakeResponse(404, {})
+    session = FakeSession(handler)
+    return AmadeusAPI("id", "secret", session=session, rate_limits=False), session
+
+
+def offer_calls(session):
+    return [c for c in session.calls if c["path"] == "/v2/shopping/flight-offers"]
+
+
+def test_equivalent_searches_share_one_cache_entry():
+    api, session = flight_api()
+    first = api.search_flights_clean("BOS", "CDG", "2030-03-10", "2030-03-17", budget="900")
+    second = api.search_flights_clean("bos", "cdg", "2030-03-10", "2030-03-17", budget=900.0)
+
+    assert len(offer_calls(session)) == 1
+    assert (first["cache"], second["cache"]) == ("MISS", "HIT")
+    assert first["offers"] == second["offers"]
+    assert offer_calls(session)[0]["params"]["maxPrice"] == 900
+
+
+def test_different_searches_do_not_collide():
+    api, session = flight_api()
+    api.search_flights_clean("BOS", "CDG", "2030-03-10", "2030-03-17")
+    api.search_flights_clean("BOS", "CDG", "2030-03-10", "2030-03-18")
+    api.search_flights_clean("BOS", "CDG", "2030-03-10", "2030-03-17", non_stop=True)
+    assert len(offer_calls(session)) == 3
+
+
+def test_cached_entry_is_not_mutated_by_callers():
+    api, _ = flight_api()
+    first = api.search_flights_clean("BOS", "CDG", "2030-03-10")
+    first["offers"] = []  # the returned dict is a copy of the cached one
+    first["cache"] = "tampered"
+    again = api.search_flights_clean("BOS", "CDG", "2030-03-10")
+    assert again["cache"] == "HIT"
+    assert again["offers"]
+
+
+def test_errors_are_not_cached():
+    api, session = flight_api(status=400)
+    assert api.search_flights_clean("BOS", "CDG", "2030-03-10").get("error")
+    assert api.search_flights_clean("BOS", "CDG", "2030-03-10").get("error")
+    assert len(offer_calls(session)) == 2
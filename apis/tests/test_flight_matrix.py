@@ -0,0 +1,179 @@
+import threading
+from datetime import date
+
+import pytest
+
+import app
+from amadeus_api import AmadeusAPI
+from flight_matrix import cheapest, flex_dates, top_offers
+
+
+def offer(total):
+    return {"price": {"total": total}}
+
+
+# ---------------------------
+# flex_dates
+# ---------------------------
+def test_flex_dates_round_trip_keeps_length():
+    assert flex_dates("2030-01-10", "2030-01-15", 1, today=date(2030, 1, 1)) == [
+        ("2030-01-09", "2030-01-14"),
+        ("2030-01-10", "2030-01-15"),
+        ("2030-01-11", "2030-01-16"),
+    ]
+
+
+def test_flex_dates_one_way_and_same_day_return():
+    assert flex_dates("2030-01-10", None, 0, today=date(2030, 1, 1)) == [("2030-01-10", None)]
+    assert flex_dates("2030-01-10", "2030-01-10", 0, today=date(2030, 1, 1)) == [("2030-01-10", "2030-01-10")]
+
+
+def test_flex_dates_skips_past_departures():
+    assert flex_dates("2030-01-10", None, 2, today=date(2030, 1, 10)) == [
+        ("2030-01-10", None), ("2030-01-11", None), ("2030-01-12", None),
+    ]
+    assert flex_dates("2030-01-10", None, 1, today=date(2030, 2, 1)) == []
+
+
+def test_flex_dates_crosses_month_and_year():
+    pairs = flex_dates("2030-12-31", "2031-01-02", 1, today=date(2030, 1, 1))
+    assert pairs[0] == ("2030-12-30", "2031-01-01")
+    assert pairs[-1] == ("2031-01-01", "2031-01-03")
+
+
+@pytest.mark.parametrize("depart, ret", [("2030-01-10", "2030-01-05"), ("2030-13-01", None), ("", None)])
+def test_flex_dates_rejects_bad_dates(depart, ret):
+    with pytest.raises(ValueError):
+        flex_dates(depart, ret, 0, today=date(2030, 1, 1))
+
+
+# ---------------------------
+# Offer helpers
+# ---------------------------
+def test_cheapest_ignores_unpriced_offers():
+    offers = [offer("300.5"), offer(None), {}, offer("abc"), offer("120")]
+    assert cheapest(offers) == (120.0, offers[4])
+    assert cheapest([offer(None)]) == (None, None)
+    assert cheapest(None) == (None, None)
+
+
+def test_top_offers_across_cells_keeps_grid_order_on_ties():
+    a = {"origin": "BOS", "depart_date": "d1", "return_date": None}
+    b = {"origin": "PVD", "depart_date": "d1", "return_date": None}
+    best = top_offers([(a, [offer("200"), offer("100")]), (b, [offer("100"), offer("50"), offer(None)])], 3)
+    assert [(o["origin"], o["price"]["total"]) for o in best] == [("PVD", "50"), ("BOS", "100"), ("PVD", "100")]
+
+
+# ---------------------------
+# AmadeusAPI.search_flights_matrix
+# ---------------------------
+@pytest.fixture
+def api(monkeypatch):
+    api = AmadeusAPI("id", "secret", rate_limits=False, flight_matrix_max_cells=6, flight_matrix_concurrency=3)
+    monkeypatch.setattr(api, "resolve_iata", lambda q: (q or "").strip().upper()[:3] or None)
+    return api
+
+
+def test_matrix_grid_and_cheapest(api, monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def cached(params, origin, dest, depart, ret):
+        with lock:
+            calls.append((origin, depart, ret))
+        price = {"BOS": 300, "PVD": 250}[origin] + int(depart[-2:])
+        return {"offers": [offer(str(price)), offer(str(price + 40))]}, 0.0, "MISS"
+
+    monkeypatch.setattr(api, "_cached_flight_offers", cached)
+    out = api.search_flights_matrix(["BOS", "PVD", "bos"], "CDG", "2030-03-10", "2030-03-17", flex_days=1, top_k=2)
+
+    assert out["origins"] == ["BOS", "PVD"]
+    assert out["dates"] == ["2030-03-09", "2030-03-10", "2030-03-11"]
+    assert len(calls) == 6
+    assert ("PVD", "2030-03-11", "2030-03-18") in calls
+    assert out["grid"]["BOS"]["2030-03-10"] == 310
+    assert out["cheapest"]["origin"] == "PVD" and out["cheapest"]["depart_date"] == "2030-03-09"
+    assert [o["price"]["total"] for o in out["offers"]] == ["259", "260"]
+
+
+def test_matrix_rejects_reversed_dates_without_calls(api, monkeypatch):
+    monkeypatch.setattr(api, "_cached_flight_offers", lambda *a: pytest.fail("no search expected"))
+    out = api.search_flights_matrix(["BOS"], "CDG", "2030-01-10", "2030-01-05")
+    assert out == {"error": "Return date must be on or after the departure date"}
+
+
+def test_matrix_rejects_too_many_cells(api, monkeypatch):
+    monkeypatch.setattr(api, "_cached_flight_offers", lambda *a: pytest.fail("no search expected"))
+    out = api.search_flights_matrix(["BOS", "PVD", "JFK"], "CDG", "2030-03-10", flex_days=1)
+    assert "too large" in out["error"]
+
+
+def test_matrix_keeps_good_cells_when_some_fail(api, monkeypatch):
+    def cached(params, origin, dest, depart, ret):
+        if origin == "PVD":
+            return {"error": "Amadeus request failed"}, 0.0, None
+        return {"offers": [offer("99")]}, 0.0, "HIT"
+
+    monkeypatch.setattr(api, "_cached_flight_offers", cached)
+    out = api.search_flights_matrix(["BOS", "PVD"], "CDG", "2030-03-10")
+    assert out["grid"] == {"BOS": {"2030-03-10": 99.0}, "PVD": {"2030-03-10": None}}
+    assert [c.get("error") for c in out["cells"]] == [None, "Amadeus request failed"]
+
+
+def test_matrix_cells_run_on_the_shared_search_pool(monkeypatch):
+    lock = threading.Lock()
+    seen = {"now": 0, "max": 0, "threads": set()}
+
+    def cached(params, origin, dest, depart, ret):
+        with lock:
+            seen["now"] += 1
+            seen["max"] = max(seen["max"], seen["now"])
+            seen["threads"].add(threading.current_thread().name.rsplit("_", 1)[0])
+        threading.Event().wait(0.05)
+        with lock:
+            seen["now"] -= 1
+        return {"offers": [offer("99")]}, 0.0, "MISS"
+
+    def run(search_pool_size, searches):
+        seen["max"] = 0
+        api = AmadeusAPI("id", "secret", rate_limits=False, flight_matrix_concurrency=3, search_pool_size=search_pool_size)
+        monkeypatch.setattr(api, "resolve_iata", lambda q: q)
+        monkeypatch.setattr(api, "_cached_flight_offers", cached)
+        threads = [
+            threading.Thread(target=api.search_flights_matrix, args=(["BOS", "PVD"], "CDG", "2030-03-10"), kwargs={"flex_days": 2})
+            for _ in range(searches)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return seen["max"]
+
+    # flight_matrix_concurrency caps one search, search_pool_size all of them
+    assert run(search_pool_size=8, searches=1) == 3
+    assert run(search_pool_size=4, searches=3) == 4
+    assert seen["threads"] == {"amadeus-search"}
+
+
+# ---------------------------
+# /api/flights matrix parameters
+# ---------------------------
+BODY = {"origin": "BOS", "destination": "Paris", "dates": "2030-03-10 to 2030-03-17"}
+
+
+def test_plain_flight_request_is_not_a_matrix():
+    assert app.parse_flight_matrix_request(BODY) == (None, None)
+
+
+def test_matrix_request_parses_origins_and_flex_days():
+    args, error = app.parse_flight_matrix_request({**BODY, "origins": "BOS or PVD, MHT", "flex_days": "2"})
+    assert error is None
+    assert args["origins"] == ["BOS", "PVD", "MHT"]
+    assert args["flex_days"] == 2
+    assert args["origin_radius_km"] is None
+
+
+@pytest.mark.parametrize("extra", [{"flex_days": 8}, {"flex_days": "x"}, {"origin_radius_km": 301}, {"origin_radius_km": "far"}])
+def test_matrix_request_validation(extra):
+    args, error = app.parse_flight_matrix_request({**BODY, **extra})
+    assert args is None and error
@@ -0,0 +1,118 @@
+import csv
+import random
+from difflib import get_close_matches
+
+import pytest
+
+from gazetteer import DEFAULT_AIRPORTS_PATH, AirportGazetteer, _min_shared_trigrams, normalize_name, trigrams
+
+ROWS = [
+    [1, "Logan International", "Boston", "United States", "BOS", "KBOS", 42.3643, -71.0052],
+    [2, "Hanscom Field", "Bedford", "United States", "BED", "KBED", 42.47, -71.289],
+    [3, "Guarulhos", "São Paulo", "Brazil", "GRU", "SBGR", -23.4356, -46.4731],
+    [4, "Congonhas", "Sao Paulo", "Brazil", "CGH", "SBSP", -23.6261, -46.6564],
+    [5, "Town Airfield", "Smalltown", "United States", r"\N", "KXYZ", 42.60, -71.30],
+    [6, "Bad row", "Nowhere", "United States", "TOOLONG", r"\N", 0, 0],
+    [7, "Charles de Gaulle", "Paris", "France", "CDG", "LFPG", 49.0097, 2.5479],
+    [8, "Orly", "Paris", "France", "ORY", "LFPO", 48.7233, 2.3794],
+]
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    path = tmp_path / "airports.dat"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(ROWS)
+    return AirportGazetteer(str(path))
+
+
+def test_normalize_name():
+    assert normalize_name("  São   PAULO ") == "sao paulo"
+
+
+def test_exact_lookups(gazetteer):
+    assert [a["iata"] for a in gazetteer.airports_in_city("PARIS")] == ["CDG", "ORY"]
+    assert [a["iata"] for a in gazetteer.airports_in_city("sao paulo")] == ["GRU", "CGH"]
+    assert gazetteer.lookup_iata("bos")["city"] == "Boston"
+    assert gazetteer.lookup_icao("lfpo")["iata"] == "ORY"
+    assert len(gazetteer.airports_in_country("united states")) == 2
+    # Rows without a 3-letter IATA code are not airports, but still places
+    assert gazetteer.lookup_iata("TOO") is None
+    assert "smalltown" in gazetteer.places
+
+
+def test_fuzzy_and_substring_lookups(gazetteer):
+    assert gazetteer.resolve_city("Bostn") == "BOS"
+    assert gazetteer.resolve_city("Pariss") == "CDG"
+    assert gazetteer.resolve_city("Zzzzz") is None
+    assert gazetteer.city_containing("aul") == "sao paulo"
+    assert gazetteer.city_containing("ris") == "paris"
+    assert gazetteer.city_containing("qqq") is None
+
+
+def test_missing_file_is_empty(tmp_path):
+    g = AirportGazetteer(str(tmp_path / "nope.dat"))
+    assert not g.loaded
+    assert g.resolve_city("Boston") is None
+
+
+@pytest.fixture(scope="module")
+def real():
+    g = AirportGazetteer(DEFAULT_AIRPORTS_PATH)
+    if not g.loaded:
+        pytest.skip("data/airports.dat not available")
+    return g
+
+
+def full_scan(real, query, cutoff=0.8):
+    expected = get_close_matches(normalize_name(query), list(real.by_city), n=1, cutoff=cutoff)
+    return expected[0] if expected else None
+
+
+@pytest.mark.parametrize("query", [
+    "Bostn", "Pariss", "Londn", "San Fransisco", "Tokio", "Mumbay", "Barcelon", "xqzv",
+    # Short queries, where few trigrams are shared
+    "mars", "taz", "a", "ab",
+    # Tied ratios: difflib keeps the largest name
+    "tarora", "marin",
+])
+def test_closest_city_matches_a_full_difflib_scan(real, query):
+    assert real.closest_city(query) == full_scan(real, query)
+
+
+def test_closest_city_matches_difflib_on_random_typos(real):
+    rng = random.Random(5)
+    cities = sorted(real.by_city)
+    letters = "abcdefghijklmnopqrstuvwxyz "
+    for _ in range(150):
+        city = rng.choice(cities)
+        i = rng.randrange(len(city))
+        op = rng.randrange(3)
+        if op == 0:
+            query = city[:i] + rng.choice(letters) + city[i:]
+        elif op == 1:
+            query = city[:i] + city[i + 1:]
+        else:
+            query = city[:i] + rng.choice(letters) + city[i + 1:]
+        assert real.closest_city(query) == full_scan(real, query), query
+
+
+@pytest.mark.parametrize("cutoff", [0.5, 0.6, 0.9])
+def test_closest_city_honours_other_cutoffs(real, cutoff):
+    for query in ("mars", "bostn", "san fransisco", "q"):
+        assert real.closest_city(query, cutoff=cutoff) == full_scan(real, query, cutoff), query
+
+
+def test_min_shared_trigrams_bound():
+    # "mars" vs "madras": ratio 0.8 with 2 shared trigrams; the bound may not ask for more
+    assert 0 < _min_shared_trigrams(4, 6, 0.8) <= len(trigrams("mars") & trigrams("madras"))
+    # Lengths too far apart can never reach the cutoff
+    assert _min_shared_trigrams(3, 10, 0.8) is None
+
+
+@pytest.mark.parametrize("query", ["york", "angel", "bos", "san", "xx"])
+def test_city_containing_matches_a_linear_scan(real, query):
+    expected = next((normalize_name(a["city"]) for a in real.airports if query in normalize_name(a["city"])), None)
+    if normalize_name(query) in real.by_city:
+        expected = normalize_name(query)
+    assert real.city_containing(query) == expected
@@ -0,0 +1,119 @@
+import csv
+import random
+
+import pytest
+
+from amadeus_api import AmadeusAPI
+from gazetteer import AirportGazetteer
+from geo_index import GeoIndex, haversine_km
+
+
+def brute_force(points, lat, lon):
+    return sorted((haversine_km(lat, lon, p[0], p[1]), i) for i, p in enumerate(points))
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = random.Random(11)
+    pts = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(1500)]
+    # Clusters at the poles and across the antimeridian
+    pts += [(rng.uniform(85, 90), rng.uniform(-180, 180)) for _ in range(50)]
+    pts += [(rng.uniform(-10, 10), rng.choice([-1, 1]) * rng.uniform(179, 180)) for _ in range(50)]
+    return pts
+
+
+@pytest.fixture(scope="module")
+def index(points):
+    return GeoIndex(points, list(range(len(points))))
+
+
+def test_haversine_known_distance():
+    # BOS -> CDG is about 5,540 km
+    assert haversine_km(42.3643, -71.0052, 49.0097, 2.5479) == pytest.approx(5540, rel=0.01)
+    assert haversine_km(10, 179.9, 10, -179.9) == pytest.approx(21.9, rel=0.01)
+
+
+QUERIES = [(0, 0), (89.9, 10), (-89, -120), (5, 179.95), (5, -179.95), (42.36, -71.0), (-33.9, 151.2)]
+
+
+@pytest.mark.parametrize("lat, lon", QUERIES)
+def test_nearest_matches_brute_force(index, points, lat, lon):
+    expected = brute_force(points, lat, lon)
+    got = index.nearest(lat, lon, n=10)
+    assert [i for _, i in got] == [i for _, i in expected[:10]]
+    assert [km for km, _ in got] == pytest.approx([km for km, _ in expected[:10]], rel=1e-6)
+
+
+@pytest.mark.parametrize("lat, lon", QUERIES)
+@pytest.mark.parametrize("radius_km", [50, 500, 2500])
+def test_within_matches_brute_force(index, points, lat, lon, radius_km):
+    expected = [i for km, i in brute_force(points, lat, lon) if km <= radius_km]
+    assert [i for _, i in index.within(lat, lon, radius_km)] == expected
+
+
+def test_nearest_with_max_km(index, points):
+    lat, lon = 42.36, -71.0
+    expected = [i for km, i in brute_force(points, lat, lon) if km <= 800][:5]
+    assert [i for _, i in index.nearest(lat, lon, n=5, max_km=800)] == expected
+
+
+def test_empty_and_tiny_indexes():
+    assert GeoIndex([]).nearest(0, 0) == []
+    assert GeoIndex([]).within(0, 0, 100) == []
+    one = GeoIndex([(10.0, 20.0)])
+    assert one.nearest(10, 20, n=3) == [(0.0, (10.0, 20.0))]
+    assert one.nearest(10, 20, n=0) == []
+
+
+ROWS = [
+    [1, "Logan International", "Boston", "United States", "BOS", "KBOS", 42.3643, -71.0052],
+    [2, "T. F. Green", "Providence", "United States", "PVD", "KPVD", 41.7267, -71.4204],
+    [3, "Manchester-Boston", "Manchester", "United States", "MHT", "KMHT", 42.9326, -71.4357],
+    [4, "Bradley", "Windsor Locks", "United States", "BDL", "KBDL", 41.9389, -72.6832],
+    [5, "Town Airfield", "Smalltown", "United States", r"\N", "KXYZ", 42.60, -71.30],
+    [6, "Charles de Gaulle", "Paris", "France", "CDG", "LFPG", 49.0097, 2.5479],
+]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    with open(tmp_path / "airports.dat", "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(ROWS)
+    return tmp_path
+
+
+def test_gazetteer_spatial_queries(data_dir):
+    g = AirportGazetteer(str(data_dir / "airports.dat"))
+    assert [a["iata"] for a in g.nearest_airports(42.36, -71.0, n=2)] == ["BOS", "MHT"]
+    assert [a["iata"] for a in g.airports_within(42.36, -71.0, 100)] == ["BOS", "MHT", "PVD"]
+    assert g.coordinates("42.0, -71.0") == (42.0, -71.0)
+    assert g.coordinates("95,0") is None
+    assert g.coordinates("pvd") == (41.7267, -71.4204)
+
+
+def test_resolve_place(data_dir):
+    g = AirportGazetteer(str(data_dir / "airports.dat"))
+    assert g.resolve_place("Providence") == "PVD"
+    # A town with only an unlisted airfield resolves to the nearest airport
+    assert g.resolve_place("Smalltown") == "BOS"
+    assert g.resolve_place("Smalltown", max_km=10) is None
+    assert g.resolve_place("41.95,-72.6") == "BDL"
+    assert g.resolve_place("Pariss") == "CDG"
+
+
+def test_matrix_adds_nearby_origins(data_dir, monkeypatch):
+    api = AmadeusAPI("id", "secret", data_dir=str(data_dir), rate_limits=False, flight_matrix_max_cells=3)
+    monkeypatch.setattr(api, "resolve_iata", lambda q: q.upper())
+    searched = []
+
+    def cached(params, origin, dest, depart, ret):
+        searched.append(origin)
+        return {"offers": []}, 0.0, "MISS"
+
+    monkeypatch.setattr(api, "_cached_flight_offers", cached)
+    out = api.search_flights_matrix(["BOS"], "CDG", "2030-03-10", origin_radius_km=150)
+
+    # Nearest first, as many as fit in the cell budget (BDL, ~146 km, does not)
+    assert out["origins"] == ["BOS", "MHT", "PVD"]
+    assert [a["iata"] for a in out["nearby_origins"]] == ["MHT", "PVD"]
+    assert sorted(searched) == ["BOS", "MHT", "PVD"]
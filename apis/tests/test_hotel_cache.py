@@ -0,0 +1,66 @@
+from amadeus_api import AmadeusAPI
+from amadeus_fakes import FakeResponse, FakeSession
+
+LIST_PATH = "/v1/reference-data/locations/hotels/by-city"
+OFFERS_PATH = "/v3/shopping/hotel-offers"
+
+
+def hotel_item(hotel_id, price):
+    return {
+        "hotel": {"hotelId": hotel_id, "name": f"Hotel {hotel_id}", "rating": "4"},
+        "offers": [{"price": {"total": str(price), "currency": "USD"}}],
+    }
+
+
+def hotel_api(n_hotels=6, list_status=200, **kwargs):
+    ids = [f"H{i:03d}" for i in range(n_hotels)]
+
+    def handler(method, path, params, body):
+        if path == LIST_PATH:
+            if list_status >= 400:
+                return FakeResponse(list_status, {"errors": [{"code": 38196, "detail": "down"}]})
+            return FakeResponse(200, {"data": [{"hotelId": h} for h in ids]})
+        if path == OFFERS_PATH:
+            wanted = params["hotelIds"].split(",")
+            return FakeResponse(200, {"data": [hotel_item(h, 100 + ids.index(h)) for h in wanted]})
+        return FakeResponse(404, {})
+
+    session = FakeSession(handler)
+    api = AmadeusAPI("id", "secret", session=session, rate_limits=False, **kwargs)
+    return api, session
+
+
+def calls_to(session, path):
+    return [c for c in session.calls if c["path"] == path]
+
+
+def test_repeat_search_hits_both_tiers():
+    api, session = hotel_api(hotel_chunk_size=2, hotel_early_stop=False)
+    first = api.search_hotels_clean("PAR", "2030-03-10", "2030-03-12", max_results=3)
+    second = api.search_hotels_clean("PAR", "2030-03-10", "2030-03-12", max_results=3)
+
+    assert len(calls_to(session, LIST_PATH)) == 1
+    assert len(calls_to(session, OFFERS_PATH)) == 3
+    assert first["cache"] == {"hotel_list": "MISS", "offers": "MISS"}
+    assert second["cache"] == {"hotel_list": "HIT", "offers": "HIT"}
+    assert first["hotels"] == second["hotels"]
+    assert [h["id"] for h in first["hotels"]] == ["H000", "H001", "H002"]
+
+
+def test_new_dates_reuse_the_hotel_list():
+    api, session = hotel_api()
+    api.search_hotels_clean("PAR", "2030-03-10", "2030-03-12")
+    again = api.search_hotels_clean("PAR", "2030-04-01", "2030-04-03")
+
+    assert len(calls_to(session, LIST_PATH)) == 1
+    assert len(calls_to(session, OFFERS_PATH)) == 2
+    assert again["cache"] == {"hotel_list": "HIT", "offers": "MISS"}
+
+
+def test_hotel_list_errors_are_not_cached():
+    api, session = hotel_api(list_status=500)
+    for _ in range(2):
+        assert api.search_hotels_clean("PAR", "2030-03-10", "2030-03-12")["error"] == "Amadeus request failed"
+
+    assert len(calls_to(session, LIST_PATH)) == 2
+    assert not calls_to(session, OFFERS_PATH)
@@ -0,0 +1,154 @@
+import threading
+
+from amadeus_api import AmadeusAPI
+from amadeus_fakes import FakeResponse, FakeSession
+
+LIST_PATH = "/v1/reference-data/locations/hotels/by-city"
+OFFERS_PATH = "/v3/shopping/hotel-offers"
+
+
+def price_of(hotel_id):
+    # Later hotels are cheaper, so ranking across chunks matters
+    return 1000 - int(hotel_id[1:])
+
+
+def hotel_api(n_hotels, offers_handler=None, **kwargs):
+    ids = [f"H{i:03d}" for i in range(n_hotels)]
+
+    def default_offers(wanted):
+        return FakeResponse(200, {"data": [
+            {"hotel": {"hotelId": h, "name": h}, "offers": [{"price": {"total": str(price_of(h))}}]} for h in wanted
+        ]})
+
+    def handler(method, path, params, body):
+        if path == LIST_PATH:
+            return FakeResponse(200, {"data": [{"hotelId": h} for h in ids]})
+        if path == OFFERS_PATH:
+            return (offers_handler or default_offers)(params["hotelIds"].split(","))
+        return FakeResponse(404, {})
+
+    session = FakeSession(handler)
+    api = AmadeusAPI("id", "secret", session=session, rate_limits=False, **kwargs)
+    return api, session
+
+
+def offer_chunks(session):
+    return [c["params"]["hotelIds"].split(",") for c in session.calls if c["path"] == OFFERS_PATH]
+
+
+def search(api, **kwargs):
+    return api.search_hotels_clean("PAR", "2030-03-10", "2030-03-12", **kwargs)
+
+
+def test_ids_are_capped_and_chunked_in_list_order():
+    api, session = hotel_api(25, hotel_chunk_size=4, hotel_max_ids=10, hotel_early_stop=False)
+    search(api, max_results=3)
+    chunks = sorted(offer_chunks(session))
+    assert [len(c) for c in chunks] == [4, 4, 2]
+    assert [h for c in chunks for h in c] == [f"H{i:03d}" for i in range(10)]
+
+
+def test_without_early_stop_every_chunk_is_ranked():
+    api, session = hotel_api(12, hotel_chunk_size=4, hotel_early_stop=False)
+    result = search(api, max_results=2)
+    assert len(offer_chunks(session)) == 3
+    assert [h["id"] for h in result["hotels"]] == ["H011", "H010"]
+
+
+def test_early_stop_ranks_the_first_chunks_that_fill_the_page():
+    api, session = hotel_api(12, hotel_chunk_size=4, hotel_offers_concurrency=1)
+    result = search(api, max_results=2)
+    assert offer_chunks(session) == [["H000", "H001", "H002", "H003"]]
+    assert [h["id"] for h in result["hotels"]] == ["H003", "H002"]
+
+
+def test_early_stop_result_does_not_depend_on_completion_order():
+    # Chunk 0 is slowest; chunks 1 and 2 finish first but must wait their turn
+    release = threading.Event()
+
+    def offers(wanted):
+        if wanted[0] == "H000":
+            release.wait(5)
+        else:
+            release.set()
+        return FakeResponse(200, {"data": [
+            {"hotel": {"hotelId": h}, "offers": [{"price": {"total": str(price_of(h))}}]} for h in wanted
+        ]})
+
+    api, _ = hotel_api(12, offers, hotel_chunk_size=4, hotel_offers_concurrency=3)
+    result = search(api, max_results=2)
+    assert [h["id"] for h in result["hotels"]] == ["H003", "H002"]
+
+
+def test_failed_chunks_are_skipped():
+    def offers(wanted):
+        if wanted[0] == "H000":
+            return FakeResponse(400, {"errors": [{"code": 3664, "title": "NO ROOMS AVAILABLE"}]})
+        if wanted[0] == "H004":
+            raise ConnectionError("reset")
+        return FakeResponse(200, {"data": [
+            {"hotel": {"hotelId": h}, "offers": [{"price": {"total": str(price_of(h))}}]} for h in wanted
+        ]})
+
+    api, _ = hotel_api(12, offers, hotel_chunk_size=4, hotel_early_stop=False)
+    result = search(api, max_results=2)
+    assert [h["id"] for h in result["hotels"]] == ["H011", "H010"]
+
+
+def test_all_chunks_with_errors_is_an_error():
+    api, _ = hotel_api(8, lambda wanted: FakeResponse(400, {"errors": [{"code": 3664}]}), hotel_chunk_size=4)
+    result = search(api)
+    assert result["error"] == "Amadeus request failed"
+    assert result["details"]["errors"][0]["code"] == 3664
+
+
+def test_searches_share_one_bounded_pool():
+    lock = threading.Lock()
+    seen = {"now": 0, "max": 0, "threads": set()}
+
+    def offers(wanted):
+        with lock:
+            seen["now"] += 1
+            seen["max"] = max(seen["max"], seen["now"])
+            seen["threads"].add(threading.current_thread().name.rsplit("_", 1)[0])
+        threading.Event().wait(0.01)
+        with lock:
+            seen["now"] -= 1
+        return FakeResponse(200, {"data": []})
+
+    api, session = hotel_api(12, offers, hotel_chunk_size=2, hotel_offers_concurrency=4, hotel_early_stop=False, search_pool_size=2)
+    searches = [
+        threading.Thread(target=api.search_hotels_clean, args=("PAR", f"2030-03-1{d}", "2030-03-20")) for d in range(3)
+    ]
+    for t in searches:
+        t.start()
+    for t in searches:
+        t.join()
+
+    assert len(offer_chunks(session)) == 18
+    assert seen["max"] == 2
+    assert seen["threads"] == {"amadeus-search"}
+
+
+def test_early_stop_drops_unsubmitted_chunks_and_caches_submitted_ones():
+    release = threading.Event()
+
+    def offers(wanted):
+        if wanted[0] == "H004":
+            release.wait(5)
+        return FakeResponse(200, {"data": [
+            {"hotel": {"hotelId": h}, "offers": [{"price": {"total": str(price_of(h))}}]} for h in wanted
+        ]})
+
+    api, session = hotel_api(12, offers, hotel_chunk_size=4, hotel_offers_concurrency=2)
+    result = search(api, max_results=2)
+    assert [h["id"] for h in result["hotels"]] == ["H003", "H002"]
+
+    # Chunk 1 was in flight at the stop: it still completes and is cached; chunk 2 never goes out
+    release.set()
+    for _ in range(500):
+        if len(api.hotel_offers_cache.backend) == 2:
+            break
+        threading.Event().wait(0.01)
+    assert len(api.hotel_offers_cache.backend) == 2
+    assert sorted(c[0] for c in offer_chunks(session)) == ["H000", "H004"]
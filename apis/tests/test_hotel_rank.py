@@ -0,0 +1,126 @@
+import itertools
+import math
+import random
+
+import pytest
+
+from amadeus_api import HotelOffersMerge
+from hotel_rank import HotelRanker, OfferTable
+
+
+def item(hotel_id, prices, rating=None):
+    hotel = {"hotelId": hotel_id}
+    if rating is not None:
+        hotel["rating"] = rating
+    return {"hotel": hotel, "offers": [{"id": f"{hotel_id}-{k}", "price": {"total": p}} for k, p in enumerate(prices)]}
+
+
+def test_offer_table_picks_the_cheapest_parseable_offer():
+    table = OfferTable([
+        item("A", ["300.00", "120.50", None]),
+        item("B", ["n/a"], rating="5"),
+        item("C", []),
+    ])
+    assert list(table.cheapest) == [120.5, math.inf, math.inf]
+    assert table.offers[table.cheapest_offer[0]]["id"] == "A-1"
+    assert list(table.cheapest_offer[1:]) == [-1, -1]
+    assert list(table.within_budget()) == [1, 0, 0]
+    assert list(table.within_budget(100)) == [0, 0, 0]
+    assert table.ratings[1] == 5.0 and math.isnan(table.ratings[0])
+
+
+def test_rank_keys():
+    table = OfferTable([item("A", ["400"], "4"), item("B", ["300"], "2"), item("C", ["200"]), item("D", ["300"], "4")])
+    ranker = HotelRanker(4, rank_by="rating")
+    ranker.add(0, table)
+    assert [i["hotel"]["hotelId"] for i, _ in ranker.top()] == ["D", "A", "B", "C"]
+
+    ranker = HotelRanker(4, rank_by="value")
+    ranker.add(0, table)
+    # Unrated C counts as 3 stars: 200/3, then 75, 100 and 150 per star
+    assert [i["hotel"]["hotelId"] for i, _ in ranker.top()] == ["C", "D", "A", "B"]
+
+
+def test_unknown_rank_by_is_rejected():
+    with pytest.raises(ValueError):
+        HotelRanker(3, rank_by="distance")
+
+
+def brute_force_top(chunks, k, budget):
+    """Every in-budget hotel sorted by (price, chunk, position)."""
+    rows = []
+    for c, data in enumerate(chunks):
+        for i, it in enumerate(data):
+            prices = [float(o["price"]["total"]) for o in it["offers"]]
+            if prices and (budget is None or min(prices) <= budget):
+                rows.append((min(prices), c, i, it["hotel"]["hotelId"]))
+    return [r[3] for r in sorted(rows)[:k]]
+
+
+def random_chunks(rng, n_chunks, size):
+    return [
+        [item(f"H{c}-{i}", [str(rng.choice([80, 100, 120, 150, 200])) for _ in range(rng.randint(1, 3))]) for i in range(size)]
+        for c in range(n_chunks)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ranker_matches_a_full_sort(seed):
+    rng = random.Random(seed)
+    chunks = random_chunks(rng, 4, 10)
+    for k, budget in ((3, None), (7, 120.0), (50, 100.0)):
+        ranker = HotelRanker(k, budget=budget)
+        for c, data in enumerate(chunks):
+            ranker.add(c, OfferTable(data))
+        assert [i["hotel"]["hotelId"] for i, _ in ranker.top()] == brute_force_top(chunks, k, budget)
+
+
+def merged(chunks, order, k, early_stop, failed=()):
+    merge = HotelOffersMerge(HotelRanker(k), early_stop=early_stop)
+    for c in order:
+        if merge.done:
+            break
+        if c in failed:
+            merge.add(c, {"errors": [{"code": 1}]}, "MISS")
+        else:
+            merge.add(c, {"data": chunks[c]}, "MISS")
+    return [i["hotel"]["hotelId"] for i, _ in merge.ranked()], merge
+
+
+@pytest.mark.parametrize("early_stop", [True, False])
+def test_merge_is_independent_of_completion_order(early_stop):
+    chunks = random_chunks(random.Random(42), 4, 3)
+    expected, _ = merged(chunks, range(4), 4, early_stop)
+    for order in itertools.permutations(range(4)):
+        assert merged(chunks, order, 4, early_stop)[0] == expected
+
+
+def test_early_stop_uses_the_shortest_prefix():
+    chunks = random_chunks(random.Random(1), 4, 3)
+    ranked, merge = merged(chunks, [3, 2, 1, 0], 4, early_stop=True)
+    # Chunks 0 and 1 hold 6 hotels, enough for 4: chunks 2 and 3 are never ranked
+    assert ranked == brute_force_top(chunks[:2], 4, None)
+    assert merge.ranked_chunks == 2
+
+
+def test_merge_skips_failed_chunks_and_reports_worst_cache_status():
+    chunks = random_chunks(random.Random(3), 3, 2)
+    ranked, merge = merged(chunks, [2, 1, 0], 10, early_stop=False, failed={1})
+    assert ranked == brute_force_top([chunks[0], [], chunks[2]], 10, None)
+    assert not merge.failed
+
+    merge = HotelOffersMerge(HotelRanker(3))
+    merge.add(0, {"data": chunks[0]}, "HIT")
+    merge.add(1, {"data": chunks[1]}, "STALE")
+    assert merge.cache_status() == "STALE"
+
+
+def test_merge_failed_and_exceptions():
+    merge = HotelOffersMerge(HotelRanker(3))
+    merge.add(0, {"errors": [{"code": 1}]}, "MISS")
+    assert merge.failed
+
+    merge = HotelOffersMerge(HotelRanker(3))
+    merge.add_exception(0, TimeoutError("slow"))
+    with pytest.raises(TimeoutError):
+        merge.raise_if_nothing()
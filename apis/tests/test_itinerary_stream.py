@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import pytest
+
+import app
+
+
+def make_day(n):
+    return {
+        "day": n,
+        "title": f"Day {n} title",
+        "items": [{"start": f"{8 + i}:00", "end": f"{9 + i}:00", "text": f"item {i}"} for i in range(6)],
+    }
+
+
+ESTIMATE = {"source": "ESTIMATE", "data": {}, "notes": "test"}
+BODY = {"destination": "Paris", "dates": "2030-05-01 to 2030-05-03", "no_cache": True}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, "gather_provider_meta", lambda req: {"flights": ESTIMATE, "hotels": ESTIMATE, "transfers": ESTIMATE})
+    return app.app.test_client()
+
+
+def stream_events(client, body=BODY):
+    r = client.post("/api/generate-itinerary/stream", json=body)
+    assert r.status_code == 200
+    return [json.loads(line) for line in r.get_data(as_text=True).splitlines() if line.strip()]
+
+
+def cut_off_stream(days_before_failure):
+    def groq_stream(prompt):
+        yield '{"summary": {}, "itinerary": ['
+        for n in days_before_failure:
+            yield json.dumps(make_day(n)) + ","
+        raise RuntimeError("connection reset")
+    return groq_stream
+
+
+def test_stream_failure_keeps_sent_days_and_repairs_the_rest(client, monkeypatch):
+    monkeypatch.setattr(app, "groq_stream", cut_off_stream([1, 2]))
+    prompts = []
+
+    def llm(prompt):
+        prompts.append(prompt)
+        return {"itinerary": [make_day(3)]}
+
+    monkeypatch.setattr(app.parallel_planner, "llm", llm)
+    events = stream_events(client)
+
+    assert [e["day"]["day"] for e in events if e["type"] == "day"] == [1, 2, 3]
+    assert not [e for e in events if e["type"] == "error"]
+    done = events[-1]
+    assert done["type"] == "done"
+    assert [d["day"] for d in done["itinerary"]] == [1, 2, 3]
+    assert done["missing_days"] == []
+    # Only the day that never arrived is regenerated
+    assert len(prompts) == 1
+
+
+def test_stream_failure_with_failed_repair_reports_partial_days(client, monkeypatch):
+    monkeypatch.setattr(app, "groq_stream", cut_off_stream([1, 2]))
+
+    def llm(prompt):
+        raise RuntimeError("groq down")
+
+    monkeypatch.setattr(app.parallel_planner, "llm", llm)
+    events = stream_events(client)
+
+    assert [e["type"] for e in events].count("error") == 1
+    done = events[-1]
+    assert done["type"] == "done"
+    assert [d["day"] for d in done["itinerary"]] == [1, 2]
+    assert done["missing_days"] == [3]
+
+
+def test_stream_failure_is_not_cached(client, monkeypatch):
+    monkeypatch.setattr(app, "groq_stream", cut_off_stream([1, 2]))
+    monkeypatch.setattr(app.parallel_planner, "llm", lambda prompt: {"itinerary": [make_day(3)]})
+    puts = []
+    monkeypatch.setattr(app.llm_cache, "put", lambda *a, **k: puts.append(a))
+
+    stream_events(client, {**BODY, "no_cache": False, "message": "uncached run"})
+    assert puts == []
+
+
+def test_asgi_stream_failure_keeps_sent_days_and_repairs_the_rest(monkeypatch):
+    asgi_app = pytest.importorskip("asgi_app")
+
+    async def provider_meta(req, deadline_s=None):
+        return {"flights": ESTIMATE, "hotels": ESTIMATE, "transfers": ESTIMATE}
+
+    async def agroq_stream(prompt):
+        for chunk in cut_off_stream([1])(prompt):
+            yield chunk
+
+    async def llm(prompt):
+        return {"itinerary": [make_day(2), make_day(3)]}
+
+    monkeypatch.setattr(asgi_app, "agather_provider_meta", provider_meta)
+    monkeypatch.setattr(asgi_app, "agroq_stream", agroq_stream)
+    monkeypatch.setattr(asgi_app.planner, "llm", llm)
+
+    async def run():
+        r = await asgi_app.app.test_client().post("/api/generate-itinerary/stream", json=BODY)
+        return [json.loads(line) for line in (await r.get_data(as_text=True)).splitlines() if line.strip()]
+
+    events = asyncio.run(run())
+    done = events[-1]
+    assert done["type"] == "done"
+    assert [d["day"] for d in done["itinerary"]] == [1, 2, 3]
+    assert done["missing_days"] == []
@@ -0,0 +1,38 @@
+import app
+
+
+def test_key_ignores_case_whitespace_and_interest_order():
+    a = app.llm_cache_key("m", {"destination": "Paris ", "interests": ["Art", "food"]}, {"data": 1})
+    b = app.llm_cache_key("m", {"destination": "paris", "interests": ["food", "art"]}, {"data": 1})
+    assert a == b
+
+
+def test_key_changes_with_model_input_and_meta():
+    base = app.llm_cache_key("m", {"destination": "paris"}, {"data": 1})
+    assert app.llm_cache_key("n", {"destination": "paris"}, {"data": 1}) != base
+    assert app.llm_cache_key("m", {"destination": "rome"}, {"data": 1}) != base
+    assert app.llm_cache_key("m", {"destination": "paris"}, {"data": 2}) != base
+
+
+def test_key_ignores_volatile_meta_fields():
+    a = app.llm_cache_key("m", {}, {"data": 1, "saved_at": "2030-01-01", "cache": "MISS"})
+    b = app.llm_cache_key("m", {}, {"data": 1, "saved_at": "2031-01-01", "cache": "HIT", "cache_age_s": 5})
+    assert a == b
+
+
+def test_key_accepts_mixed_type_interests():
+    a = app.llm_cache_key("m", {"interests": ["art", None, 1, {"x": 1}]})
+    b = app.llm_cache_key("m", {"interests": [1, {"x": 1}, "ART", None]})
+    assert a == b
+
+
+def test_routes_accept_mixed_type_interests(monkeypatch):
+    estimate = {"source": "ESTIMATE", "data": {}, "notes": "test"}
+    monkeypatch.setattr(app, "gather_provider_meta", lambda req: {"flights": estimate, "hotels": estimate, "transfers": estimate})
+    monkeypatch.setattr(app, "groq_json", lambda prompt: {"itinerary": []})
+    monkeypatch.setattr(app.parallel_planner, "llm", lambda prompt: {})
+
+    r = app.app.test_client().post("/api/generate-itinerary", json={
+        "destination": "Paris", "dates": "2030-05-01 to 2030-05-01", "interests": ["art", None, 1], "no_cache": True,
+    })
+    assert r.status_code == 200
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from llm_stream import ItineraryDayScanner, sse_line_deltas
+
+
+def completion(days):
+    return json.dumps({"summary": {"note": 'braces } and "quotes" {'}, "itinerary": days, "flight_plan": {}})
+
+
+def days(n):
+    return [{"day": i, "title": f"Day {i} {{x}}", "items": [{"text": 'a "b" }'}]} for i in range(1, n + 1)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 17, 10_000])
+def test_scanner_yields_each_day_once_at_any_chunking(chunk_size):
+    text = completion(days(4))
+    scanner = ItineraryDayScanner()
+    got = []
+    for i in range(0, len(text), chunk_size):
+        got.extend(scanner.feed(text[i:i + chunk_size]))
+    assert got == days(4)
+    assert scanner.text == text
+    assert json.loads(scanner.text)["flight_plan"] == {}
+
+
+def test_scanner_key_split_across_chunks():
+    text = completion(days(1))
+    cut = text.index('"itinerary"') + 5
+    scanner = ItineraryDayScanner()
+    assert scanner.feed(text[:cut]) == []
+    assert scanner.feed(text[cut:]) == days(1)
+
+
+def test_scanner_skips_malformed_days():
+    scanner = ItineraryDayScanner()
+    got = scanner.feed('{"itinerary": [{"day": 1, "title": tru}, {"day": 2}]}')
+    assert got == [{"day": 2}]
+
+
+def test_scanner_only_buffers_the_day_being_read():
+    text = completion(days(200))
+    longest_day = max(len(json.dumps(d)) for d in days(200))
+    scanner = ItineraryDayScanner()
+    for i in range(0, len(text), 5):
+        scanner.feed(text[i:i + 5])
+        # Scanned text is not re-copied on every chunk
+        assert len(scanner._buf) <= longest_day + 5 + ItineraryDayScanner.KEY_OVERLAP
+    assert scanner.text == text
+
+
+def test_sse_line_deltas():
+    usage = {}
+    line = 'data: {"choices": [{"delta": {"content": "hi"}}], "x_groq": {"usage": {"total_tokens": 3}}}'
+    assert sse_line_deltas(line, usage) == ["hi"]
+    assert usage == {"total_tokens": 3}
+    assert sse_line_deltas(": keep-alive") == []
+    assert sse_line_deltas("data: [DONE]") is None
@@ -0,0 +1,69 @@
+import io
+import json
+import logging
+import queue
+
+import pytest
+
+import log
+
+
+@pytest.fixture
+def capture():
+    """Routes the itinerary loggers to a buffer; stopping the writer thread flushes it."""
+    stream = io.StringIO()
+
+    def configure(**kwargs):
+        log.configure(level="DEBUG", stream=stream, **kwargs)
+
+    def flush():
+        log._listener.stop()
+        log._listener.start()
+        return stream.getvalue()
+
+    yield configure, flush
+    log.configure()
+
+
+def test_redact_tokens_and_secrets():
+    line = "Authorization: Bearer abc.def-123 client_secret=s3cret api_key='k' gsk_abcdef"
+    out = log.redact(line)
+    assert "abc.def-123" not in out and "s3cret" not in out and "gsk_abcdef" not in out
+    assert "gsk_[REDACTED]" in out
+
+
+def test_records_are_written_by_the_listener_and_redacted(capture):
+    configure, flush = capture
+    configure()
+    log.get_logger("amadeus_api").info("token %s", "Bearer xyz")
+    out = flush()
+    assert "itinerary.amadeus_api" in out
+    assert "Bearer [REDACTED]" in out and "xyz" not in out
+
+
+def test_json_format_includes_extra_fields(capture):
+    configure, flush = capture
+    configure(fmt="json")
+    log.get_logger("app").warning("slow %s", "stage", extra={"stage": "llm", "ms": 12})
+    record = json.loads(flush().strip().splitlines()[-1])
+    assert record["msg"] == "slow stage"
+    assert record["level"] == "WARNING"
+    assert (record["stage"], record["ms"]) == ("llm", 12)
+
+
+def test_debug_sampling_only_drops_debug(capture):
+    configure, flush = capture
+    configure(debug_sample_rate=0.0)
+    logger = log.get_logger("app")
+    logger.debug("sampled out")
+    logger.info("kept")
+    out = flush()
+    assert "sampled out" not in out and "kept" in out
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = log.DroppingQueueHandler(queue.Queue(maxsize=1))
+    record = logging.LogRecord("x", logging.INFO, __file__, 1, "m", (), None)
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.dropped == 1
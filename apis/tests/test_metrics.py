@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app
+import metrics
+import timing
+from benchmark import parse_server_timing
+from cache import TTLCache
+
+
+def test_counter_renders_labels_and_escapes_values():
+    reg = metrics.Registry()
+    c = reg.counter("calls_total", "Calls.", ("route",))
+    c.inc(route="/a")
+    c.inc(2, route='/b"x')
+    assert c.value(route="/a") == 1
+    text = reg.render()
+    assert "# TYPE calls_total counter" in text
+    assert 'calls_total{route="/a"} 1' in text
+    assert 'calls_total{route="/b\\"x"} 2' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    reg = metrics.Registry()
+    h = reg.histogram("lat_seconds", "Latency.", buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 5.0):
+        h.observe(v)
+    lines = reg.render().splitlines()
+    assert 'lat_seconds_bucket{le="0.1"} 1' in lines
+    assert 'lat_seconds_bucket{le="1"} 2' in lines
+    assert 'lat_seconds_bucket{le="+Inf"} 3' in lines
+    assert "lat_seconds_sum 5.55" in lines
+    assert "lat_seconds_count 3" in lines
+
+
+def test_failing_collector_does_not_break_the_scrape():
+    reg = metrics.Registry()
+    reg.counter("ok_total", "Ok.").inc()
+
+    @reg.collector
+    def broken():
+        raise RuntimeError("boom")
+
+    @reg.collector
+    def gauge():
+        return [("size", "gauge", "Size.", [({"cache": "x"}, 3)])]
+
+    text = reg.render()
+    assert "ok_total 1" in text
+    assert 'size{cache="x"} 3' in text
+
+
+def test_upstream_records_exception_type():
+    before = metrics.UPSTREAM_SECONDS.render()
+    with pytest.raises(TimeoutError):
+        with metrics.upstream("test-svc", "ep"):
+            raise TimeoutError()
+    with metrics.upstream("test-svc", "ep") as call:
+        call.status = 200
+    after = "\n".join(metrics.UPSTREAM_SECONDS.render())
+    assert before != after
+    assert 'service="test-svc",endpoint="ep",status="TimeoutError"' in after
+    assert 'service="test-svc",endpoint="ep",status="200"' in after
+
+
+def test_record_llm_usage_ignores_garbage():
+    metrics.record_llm_usage("test-model", {"prompt_tokens": 10, "completion_tokens": 5})
+    metrics.record_llm_usage("test-model", {"prompt_tokens": "lots"})
+    metrics.record_llm_usage("test-model", None)
+    assert metrics.LLM_TOKENS.value(model="test-model", kind="prompt") == 10
+    assert metrics.LLM_TOKENS.value(model="test-model", kind="completion") == 5
+
+
+def test_tracked_cache_is_exported():
+    cache = TTLCache(maxsize=4, ttl=60)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    metrics.track_cache(cache, name="test-cache")
+    text = metrics.REGISTRY.render()
+    assert 'itinerary_cache_lookups_total{cache="test-cache",result="hit"} 1' in text
+    assert 'itinerary_cache_lookups_total{cache="test-cache",result="miss"} 1' in text
+    assert 'itinerary_cache_hit_ratio{cache="test-cache"} 0.5' in text
+
+
+def test_stage_timings_sum_and_follow_submitted_work():
+    timings = timing.begin()
+    with timing.stage("resolve"):
+        pass
+    with timing.stage("resolve"):
+        pass
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        timing.submit(pool, timing.timed("hotels", lambda: None)).result()
+        # Plain submit() runs outside the request's context
+        pool.submit(timing.timed("lost", lambda: None)).result()
+
+    stages = timings.as_dict()
+    assert set(stages) == {"resolve", "hotels", "total"}
+    assert set(parse_server_timing(timings.server_timing())) == set(stages)
+
+
+def test_metrics_route_and_server_timing_header():
+    client = app.app.test_client()
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.mimetype == "text/plain"
+    assert "# TYPE itinerary_http_request_seconds histogram" in r.get_data(as_text=True)
+    assert "total" in parse_server_timing(r.headers["Server-Timing"])
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'itinerary_http_request_seconds_count{route="/metrics",method="GET",status="200"}' in text
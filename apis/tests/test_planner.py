@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app
+from planner import AsyncItineraryPlanner, ParallelItineraryPlanner, collect_valid_days, normalize_day
+
+
+def make_day(n, items=6):
+    return {"day": n, "title": f"Day {n}", "items": [{"start": "9:00", "end": "10:00", "text": f"item {i}"} for i in range(items)]}
+
+
+def request(num_days, depart="2030-05-01"):
+    return {
+        "destination": "Paris", "origin": "BOS", "depart_date": depart, "return_date": depart,
+        "budget": "", "transport": "", "interests": [], "message": "", "num_days": num_days,
+    }
+
+
+def day_batch_llm(calls, fail_days=(), delay=0.0):
+    """Fake groq_json: answers day-batch prompts with the requested days, except fail_days."""
+    lock = threading.Lock()
+    state = {"in_flight": 0, "max_in_flight": 0}
+
+    def llm(prompt):
+        if "TRIP SKELETON" not in prompt:
+            return {"days": []}
+        wanted = prompt.split("MUST contain exactly", 1)[1].split(":", 1)[1].split(".", 1)[0]
+        numbers = [int(n) for n in wanted.split(",")]
+        with lock:
+            calls.append(numbers)
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            time.sleep(delay)
+            return {"itinerary": [make_day(n) for n in numbers if n not in fail_days]}
+        finally:
+            with lock:
+                state["in_flight"] -= 1
+
+    return llm, state
+
+
+def test_normalize_day_fixes_cheap_problems():
+    day = make_day(2, items=8)
+    day["day"] = "2"
+    day["title"] = ""
+    fixed = normalize_day(day, 2)
+    assert fixed["day"] == 2 and fixed["title"] == "Day 2" and len(fixed["items"]) == 6
+    assert normalize_day(make_day(2, items=5), 2) is None
+    assert normalize_day(make_day(3), 2) is None
+
+
+def test_collect_valid_days_keeps_first_valid_copy():
+    first, second = make_day(1), make_day(1)
+    second["title"] = "duplicate"
+    valid = collect_valid_days([first, second, make_day(2, items=2), "junk", make_day(9)], [1, 2, 3])
+    assert list(valid) == [1]
+    assert valid[1]["title"] == "Day 1"
+
+
+def test_plan_regenerates_only_missing_days():
+    calls = []
+    llm, _ = day_batch_llm(calls, fail_days={3})
+    planner = ParallelItineraryPlanner(llm, batch_size=2, max_concurrency=2, max_day_retries=2)
+    out = planner.plan(request(4), {"flights_meta": {}, "hotels_meta": {}, "transfers_meta": {}})
+
+    assert [d["day"] for d in out["itinerary"]] == [1, 2, 4]
+    assert out["missing_days"] == [3]
+    assert sorted(calls[:2]) == [[1, 2], [3, 4]]
+    assert calls[2:] == [[3], [3]]
+
+
+def test_repair_keeps_good_days():
+    calls = []
+    llm, _ = day_batch_llm(calls)
+    planner = ParallelItineraryPlanner(llm)
+    out = planner.repair(request(3), {"summary": {"x": 1}, "itinerary": [make_day(1), make_day(2, items=1)]})
+
+    assert [d["day"] for d in out["itinerary"]] == [1, 2, 3]
+    assert out["summary"] == {"x": 1}
+    assert sorted(calls) == [[2], [3]]
+
+
+def test_concurrency_is_shared_across_requests():
+    calls = []
+    llm, state = day_batch_llm(calls, delay=0.02)
+    planner = ParallelItineraryPlanner(llm, batch_size=1, max_concurrency=3)
+    data = {"flights_meta": {}, "hotels_meta": {}, "transfers_meta": {}}
+
+    with ThreadPoolExecutor(max_workers=4) as requests_pool:
+        plans = list(requests_pool.map(lambda _: planner.plan(request(6), data), range(4)))
+
+    assert all(len(p["itinerary"]) == 6 for p in plans)
+    assert len(calls) == 24
+    assert state["max_in_flight"] <= 3
+
+
+def test_async_concurrency_is_shared_across_requests():
+    state = {"in_flight": 0, "max_in_flight": 0}
+
+    async def llm(prompt):
+        if "TRIP SKELETON" not in prompt:
+            return {}
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+        n = int(prompt.split("Write the detailed schedule for day ", 1)[1].split(" ", 1)[0])
+        return {"itinerary": [make_day(n)]}
+
+    planner = AsyncItineraryPlanner(llm, batch_size=1, max_concurrency=2)
+
+    async def run():
+        return await asyncio.gather(*(planner.plan(request(5), {"flights_meta": {}, "hotels_meta": {}, "transfers_meta": {}}) for _ in range(3)))
+
+    for _ in range(2):  # a new event loop gets its own semaphore
+        plans = asyncio.run(run())
+        assert all(len(p["itinerary"]) == 5 for p in plans)
+    assert state["max_in_flight"] == 2
+
+
+def test_itinerary_request_caps_trip_length():
+    req, error = app.parse_itinerary_request({"destination": "Paris", "dates": "2030-01-01 to 2030-03-01"})
+    assert error is None
+    assert req["num_days"] == app.MAX_ITINERARY_DAYS
+
+
+def test_itinerary_request_rejects_reversed_dates():
+    client = app.app.test_client()
+    for route in ("/api/generate-itinerary", "/api/generate-itinerary/stream"):
+        r = client.post(route, json={"destination": "Paris", "dates": "2030-01-05 to 2030-01-01", "mode": "parallel"})
+        assert r.status_code == 400
+        assert "Return date" in r.get_json()["error"]
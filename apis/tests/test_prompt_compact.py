@@ -0,0 +1,62 @@
+from prompt_compact import (
+    compact_provider_data,
+    compact_results,
+    drop_empty,
+    dumps_compact,
+    estimate_tokens,
+    fit_to_budget,
+)
+
+
+def hotel(i):
+    return {
+        "id": f"H{i}",
+        "name": f"Hotel {i}",
+        "rating": "4",
+        "address": {"lines": ["1 Rue"], "cityName": "PARIS"},
+        "cheapestOffer": {"price": {"total": f"{100 + i}.00", "currency": "EUR"}, "boardType": None, "roomType": ""},
+    }
+
+
+def metas(n_hotels=3):
+    flights = {"source": "amadeus", "data": {"origin": "BOS", "destination": "CDG", "offers": []}}
+    hotels = {"source": "amadeus", "notes": None, "data": {"city_code": "PAR", "hotels": [hotel(i) for i in range(n_hotels)]}}
+    transfers = {"source": "estimate", "notes": "Transfer API error; using estimate.", "data": {}}
+    return flights, hotels, transfers
+
+
+def test_drop_empty_is_recursive_and_keeps_falsy_scalars():
+    obj = {"a": None, "b": "", "c": [], "d": {"e": {}, "f": [None, "", 0]}, "g": False, "h": 0}
+    assert drop_empty(obj) == {"d": {"f": [0]}, "g": False, "h": 0}
+
+
+def test_hotels_are_projected_to_what_the_planner_uses():
+    data = compact_provider_data(*metas(), max_tokens=10_000)
+    hotels = data["hotels_meta"]["data"]
+    assert hotels["city"] == "PAR"
+    assert hotels["hotels"][0] == {"name": "Hotel 0", "rating": "4", "total": 100, "cur": "EUR"}
+    # Empty provider data is dropped but its notes survive
+    assert data["transfers_meta"] == {"source": "estimate", "notes": "Transfer API error; using estimate."}
+
+
+def test_budget_trims_the_longest_list():
+    full = compact_provider_data(*metas(40), max_tokens=10_000)
+    capped = compact_provider_data(*metas(40), max_tokens=200)
+
+    size = sum(estimate_tokens(dumps_compact(v)) for v in capped.values())
+    assert size <= 200
+    kept = capped["hotels_meta"]["data"]["hotels"]
+    assert 1 <= len(kept) < 40
+    assert kept == full["hotels_meta"]["data"]["hotels"][: len(kept)]
+
+
+def test_budget_stops_at_one_entry():
+    sections = fit_to_budget({"results": [{"x": "y" * 400}, {"x": "z" * 400}]}, max_tokens=10)
+    assert len(sections["results"]) == 1
+
+
+def test_compact_results():
+    results = [{"a": 1, "b": None}] * 50
+    out = compact_results(results, max_tokens=50)
+    assert out and all(r == {"a": 1} for r in out)
+    assert estimate_tokens(dumps_compact(out)) <= 50
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import app
+from amadeus_api import AmadeusAPI
+from amadeus_fakes import FakeSession
+
+
+def test_providers_run_concurrently():
+    barrier = threading.Barrier(3, timeout=2)
+
+    def provider(name):
+        def fn():
+            barrier.wait()      # only returns once all three are running
+            return {"source": "REAL", "data": name, "notes": "From Amadeus."}
+        return fn
+
+    out = app.fan_out_providers({n: provider(n) for n in ("hotels", "flights", "transfers")}, deadline_s=5)
+    assert {n: m["data"] for n, m in out.items()} == {"hotels": "hotels", "flights": "flights", "transfers": "transfers"}
+
+
+def test_slow_provider_becomes_a_timeout_estimate():
+    release = threading.Event()
+
+    def slow():
+        release.wait(2)
+        return {"source": "REAL"}
+
+    start = time.perf_counter()
+    out = app.fan_out_providers({"hotels": slow, "flights": lambda: {"source": "REAL"}}, deadline_s=0.1)
+    release.set()
+    assert time.perf_counter() - start < 1
+    assert out["flights"] == {"source": "REAL"}
+    assert out["hotels"]["source"] == "ESTIMATE"
+    assert out["hotels"]["notes"].startswith("Hotel API timed out")
+
+
+def test_provider_meta_error_notes_match_the_original_wording():
+    assert app._provider_meta({"error": "x"}, "Hotel")["notes"] == "Hotel API error; using estimates."
+    assert app._provider_meta({"error": "x"}, "Flight")["notes"] == "Flight API error; using estimate."
+    assert app._provider_meta({"offers": []}, "Flight") == {"source": "REAL", "data": {"offers": []}, "notes": "From Amadeus."}
+
+
+def test_fetch_meta_never_raises(monkeypatch):
+    class Broken:
+        def search_hotels_clean(self, **kwargs):
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(app, "get_api", lambda: Broken())
+    meta = app.fetch_hotels_meta("Paris", "2030-01-01", "2030-01-03", None)
+    assert meta == {"source": "ESTIMATE", "data": {}, "notes": "Hotel API crashed: boom"}
+
+
+def test_full_pool_fails_fast(monkeypatch):
+    monkeypatch.setattr(app, "_provider_slots", threading.BoundedSemaphore(1))
+    release = threading.Event()
+
+    def slow():
+        release.wait(2)
+        return {"source": "REAL"}
+
+    start = time.perf_counter()
+    out = app.fan_out_providers({"hotels": slow, "flights": lambda: {"source": "REAL"}}, deadline_s=0.1)
+    release.set()
+    assert time.perf_counter() - start < 1
+    assert out["hotels"]["notes"].startswith("Hotel API timed out")
+    assert out["flights"] == {"source": "ESTIMATE", "data": {}, "notes": "Flight API skipped (server busy); using estimate."}
+
+
+def test_worker_slots_are_given_back():
+    before = app._provider_slots._value
+    app.fan_out_providers({n: (lambda: {"source": "REAL"}) for n in ("hotels", "flights")}, deadline_s=5)
+    time.sleep(0.05)
+    assert app._provider_slots._value == before
+
+
+def test_branches_get_the_remaining_deadline_as_their_timeout():
+    session = FakeSession()
+    api = AmadeusAPI("id", "secret", session=session, rate_limits=False)
+    api._tokens.get()
+    finished = threading.Event()
+    outcome = {}
+
+    def abandoned():
+        api._request("GET", "/v1/a", timeout=25)
+        time.sleep(0.3)             # outlives the deadline
+        try:
+            api._request("GET", "/v1/b", timeout=25)
+        except TimeoutError as e:
+            outcome["error"] = e
+        finished.set()
+        return {"source": "REAL"}
+
+    out = app.fan_out_providers({"hotels": abandoned}, deadline_s=0.2)
+    assert out["hotels"]["source"] == "ESTIMATE"
+    assert finished.wait(2)
+    # The first call got what was left of 0.2s, not 25s; the late one never went out
+    assert [c["path"] for c in session.calls] == ["/v1/a"]
+    assert 0 < session.calls[0]["timeout"] <= 0.2
+    assert isinstance(outcome["error"], TimeoutError)
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+
+import pytest
+
+import amadeus_api
+from amadeus_api import AmadeusAPI
+from amadeus_fakes import FakeResponse, FakeSession
+from ratelimit import (
+    AdaptiveConcurrency,
+    AsyncUpstreamLimiter,
+    TokenBucket,
+    UpstreamLimiter,
+    backoff_delay,
+    endpoint_family,
+    retry_after_seconds,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_delay_math():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=2, clock=clock)
+    # The burst is free, then each token costs 1/rate of debt
+    assert [bucket.reserve() for _ in range(4)] == pytest.approx([0.0, 0.0, 0.1, 0.2])
+
+    clock.now += 0.2
+    # Debt of 2 repaid, back to zero: the next token is 0.1s away
+    assert bucket.reserve() == pytest.approx(0.1)
+
+    clock.now += 10
+    # Refill is capped at the burst
+    assert [bucket.reserve() for _ in range(3)] == pytest.approx([0.0, 0.0, 0.1])
+
+
+def test_backoff_delay_is_capped_full_jitter():
+    for attempt in range(10):
+        for _ in range(50):
+            assert 0 <= backoff_delay(attempt, base=0.25, cap=2.0) <= min(2.0, 0.25 * 2 ** attempt)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("3", 3.0),
+    ("0.5", 0.5),
+    ("-4", 0.0),
+    ("120", 30.0),
+    ("Wed, 21 Oct 2015 07:28:00 GMT", None),
+    (None, None),
+])
+def test_retry_after_seconds(header, expected):
+    headers = {"Retry-After": header} if header is not None else {}
+    assert retry_after_seconds(FakeResponse(429, headers=headers)) == expected
+
+
+def test_endpoint_family():
+    assert endpoint_family("/v1/reference-data/locations/hotels/by-city") == "hotel-list"
+    assert endpoint_family("/v1/reference-data/locations") == "locations"
+    assert endpoint_family("/v1/shopping/transfer-offers") == "transfers"
+    assert endpoint_family("/v9/unknown") == "other"
+
+
+def test_aimd_limit():
+    clock = FakeClock()
+    c = AdaptiveConcurrency(4, min_limit=1, max_limit=6, decrease=0.5, cooldown=1.0, clock=clock)
+    c.on_overload()
+    assert c.limit == 2
+    # A second failure in the same window is the same burst
+    c.on_overload()
+    assert c.limit == 2
+    clock.now += 1.0
+    c.on_overload()
+    assert c.limit == 1
+    clock.now += 1.0
+    c.on_overload()
+    assert c.limit == 1
+
+    # +1/limit per success: about one step per limit's worth of calls
+    for _ in range(2):
+        c.on_success()
+    assert c.limit == 2
+    for _ in range(100):
+        c.on_success()
+    assert c.limit == 6
+
+
+def test_acquire_blocks_at_the_limit_until_released():
+    c = AdaptiveConcurrency(1)
+    c.acquire()
+    got = threading.Event()
+    t = threading.Thread(target=lambda: (c.acquire(), got.set()))
+    t.start()
+    assert not got.wait(0.05)
+    c.release()
+    assert got.wait(2)
+    t.join()
+    assert c.in_flight == 1
+
+
+def test_limiter_uses_the_stricter_bucket_and_counts_waits():
+    clock = FakeClock()
+    limiter = UpstreamLimiter("test", rate=100, burst=1, families={"flight-offers": 2}, clock=clock)
+    assert limiter._wait_time("flight-offers") == 0.0
+    assert limiter._wait_time("flight-offers") == pytest.approx(0.5)
+    assert limiter._wait_time("locations") == pytest.approx(0.02)
+    assert limiter.stats()["throttled_s"] == pytest.approx(0.52)
+
+    limiter.observe(503)
+    assert limiter.stats()["limit"] == 4
+    limiter.observe(404)
+    assert limiter.stats()["limit"] == 4
+
+
+def test_async_limiter_slot():
+    limiter = AsyncUpstreamLimiter("test", rate=1000, burst=10, concurrency=2)
+    peak = []
+
+    async def one():
+        async with limiter.slot("other"):
+            peak.append(limiter.concurrency.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(one() for _ in range(6)))
+
+    asyncio.run(main())
+    assert max(peak) == 2
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_client_retries_429_after_retry_after(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(amadeus_api.time, "sleep", sleeps.append)
+    responses = iter([
+        FakeResponse(429, {"errors": []}, headers={"Retry-After": "2"}),
+        FakeResponse(429, {"errors": []}),
+        FakeResponse(200, {"data": []}),
+    ])
+    session = FakeSession(lambda *a: next(responses))
+    api = AmadeusAPI("id", "secret", session=session, rate_limits=False, max_throttle_retries=2)
+
+    assert api._request("GET", "/v1/x").status_code == 200
+    assert len(session.calls) == 3
+    assert sleeps[0] == 2.0
+    assert 0 <= sleeps[1] <= 0.5
+
+
+def test_client_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(amadeus_api.time, "sleep", lambda s: None)
+    session = FakeSession(lambda *a: FakeResponse(429, {"errors": []}))
+    api = AmadeusAPI("id", "secret", session=session, rate_limits=False, max_throttle_retries=1)
+    assert api._request("GET", "/v1/x").status_code == 429
+    assert len(session.calls) == 2
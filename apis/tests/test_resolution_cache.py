@@ -0,0 +1,109 @@
+from amadeus_api import AmadeusAPI
+from amadeus_fakes import FakeResponse, FakeSession
+from cache import MISSING, TTLCache, cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires_entries():
+    clock = Clock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.set("k", "v")
+    clock.now = 9.9
+    assert cache.get("k") == "v"
+    clock.now = 10
+    assert cache.get("k") is MISSING
+
+
+def test_ttl_cache_negative_entries_use_negative_ttl():
+    clock = Clock()
+    cache = TTLCache(ttl=100, negative_ttl=5, clock=clock)
+    cache.set("nowhere", None)
+    assert cache.get("nowhere") is None
+    assert cache.stats()["negative_hits"] == 1
+    clock.now = 5
+    assert cache.get("nowhere") is MISSING
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_ttl_cache_zero_ttl_is_not_stored():
+    cache = TTLCache(ttl=0)
+    cache.set("k", "v")
+    assert len(cache) == 0
+
+
+def test_cache_key_ignores_param_order():
+    assert cache_key("f", {"a": 1, "b": 2}) == cache_key("f", {"b": 2, "a": 1})
+    assert cache_key("f", {"a": 1}) != cache_key("g", {"a": 1})
+
+
+# ---------------------------
+# AmadeusAPI.resolve_iata through resolution_cache
+# ---------------------------
+def locations_api(answers):
+    """Fake /v1/reference-data/locations: keyword -> (status, data)."""
+    def handler(method, path, params, body):
+        status, data = answers.get(params["keyword"].strip().lower(), (200, []))
+        return FakeResponse(status, {"data": data})
+    return handler
+
+
+def make_api(handler, clock=None):
+    session = FakeSession(handler)
+    cache = TTLCache(ttl=3600, negative_ttl=60, clock=clock or Clock())
+    return AmadeusAPI("id", "secret", session=session, rate_limits=False, resolution_cache=cache), session
+
+
+def test_resolution_is_cached_per_normalized_query():
+    api, session = make_api(locations_api({"paris": (200, [{"subType": "CITY", "iataCode": "PAR"}])}))
+    assert api.resolve_iata("Paris") == "PAR"
+    assert api.resolve_iata("  PARIS ") == "PAR"
+    assert api.resolve_iata("cdg") == "CDG"        # codes never hit the API
+    assert len(session.calls) == 1
+
+
+def test_unknown_place_is_cached_negatively():
+    clock = Clock()
+    api, session = make_api(locations_api({}), clock)
+    assert api.resolve_iata("Xyzzyqx Qwv") is None
+    assert api.resolve_iata("xyzzyqx qwv") is None
+    assert len(session.calls) == 1
+    assert api.resolution_cache.negative_hits == 1
+
+    clock.now += 61
+    api.resolve_iata("Xyzzyqx Qwv")
+    assert len(session.calls) == 2
+
+
+def test_local_fallback_after_an_api_error_uses_the_short_ttl():
+    clock = Clock()
+    api, session = make_api(locations_api({"boston": (500, [])}), clock)
+    assert api.resolve_iata("Boston") == "BOS"
+    assert api.resolve_iata("Boston") == "BOS"
+    assert len(session.calls) == 1
+
+    clock.now += 61
+    assert api.resolve_iata("Boston") == "BOS"
+    assert len(session.calls) == 2
+
+
+def test_an_empty_shared_cache_is_used_not_replaced():
+    cache = TTLCache()
+    api = AmadeusAPI("id", "secret", session=FakeSession(), rate_limits=False, resolution_cache=cache)
+    assert api.resolution_cache is cache
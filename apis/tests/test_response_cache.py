@@ -0,0 +1,175 @@
+import asyncio
+import sys
+import threading
+import time
+
+import pytest
+
+from cache import MISSING, DiskBackend, MemoryBackend, ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def wall_clock(monkeypatch):
+    """ResponseCache ages entries by time.time(); drive it by hand."""
+    clock = Clock()
+    clock.now = 1_000_000.0
+    monkeypatch.setattr(time, "time", clock)
+    return clock
+
+
+def wait_for_revalidation(cache):
+    deadline = time.monotonic() + 2
+    while cache._refreshing and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_hit_stale_and_miss(wall_clock):
+    cache = ResponseCache(MemoryBackend(), ttl=10, stale_ttl=20)
+    calls = []
+
+    def fetch():
+        calls.append(wall_clock.now)
+        return {"n": len(calls)}
+
+    assert cache.get_or_fetch("k", fetch) == ({"n": 1}, 0.0, "MISS")
+    wall_clock.now += 5
+    assert cache.get_or_fetch("k", fetch)[2] == "HIT"
+
+    wall_clock.now += 10      # stale: old value now, one refetch in the background
+    value, age, status = cache.get_or_fetch("k", fetch)
+    assert (value, status) == ({"n": 1}, "STALE")
+    assert age == pytest.approx(15)
+    wait_for_revalidation(cache)
+    assert cache.get_or_fetch("k", fetch)[:3:2] == ({"n": 2}, "HIT")
+
+    wall_clock.now += 31      # beyond ttl + stale_ttl
+    assert cache.get_or_fetch("k", fetch)[2] == "MISS"
+    assert len(calls) == 3
+
+
+def test_stale_entries_revalidate_once(wall_clock):
+    cache = ResponseCache(MemoryBackend(), ttl=10, stale_ttl=20)
+    cache.put("k", "old")
+    wall_clock.now += 15
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        release.wait(2)
+        return "new"
+
+    for _ in range(5):
+        assert cache.get_or_fetch("k", slow_fetch)[:3:2] == ("old", "STALE")
+    release.set()
+    wait_for_revalidation(cache)
+    assert len(calls) == 1
+    assert cache.get("k") == "new"
+
+
+def test_uncacheable_values_are_not_stored(wall_clock):
+    cache = ResponseCache(MemoryBackend(), ttl=10)
+    cache.get_or_fetch("k", lambda: {"error": "x"}, cacheable=lambda v: "error" not in v)
+    assert cache.get("k") is MISSING
+
+
+def test_zero_ttl_bypasses(wall_clock):
+    cache = ResponseCache(MemoryBackend(), ttl=0)
+    assert cache.get_or_fetch("k", lambda: 1) == (1, 0.0, "BYPASS")
+    cache.put("k", 1)
+    assert cache.get("k") is MISSING
+
+
+def test_disk_backend_round_trip_and_max_age(tmp_path, wall_clock):
+    backend = DiskBackend(str(tmp_path), max_age=60)
+    backend.set("k", wall_clock.now, {"a": [1, 2]})
+    assert DiskBackend(str(tmp_path)).get("k") == (wall_clock.now, {"a": [1, 2]})
+    assert len(backend) == 1
+    wall_clock.now += 61
+    assert backend.get("k") is None
+    assert len(backend) == 0
+
+
+class RecordingDiskBackend(DiskBackend):
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.current_thread())
+        return super().get(key)
+
+    def set(self, key, stored_at, value):
+        self.threads.append(threading.current_thread())
+        super().set(key, stored_at, value)
+
+
+def test_async_disk_io_runs_off_the_event_loop(tmp_path):
+    backend = RecordingDiskBackend(str(tmp_path))
+    cache = ResponseCache(backend, ttl=60)
+
+    async def fetch():
+        return {"v": 1}
+
+    async def run():
+        loop_thread = threading.current_thread()
+        assert await cache.aget_or_fetch("k", fetch) == ({"v": 1}, 0.0, "MISS")
+        assert (await cache.aget_or_fetch("k", fetch))[2] == "HIT"
+        await cache.aput("j", [1])
+        assert await cache.aget("j") == [1]
+        return loop_thread
+
+    loop_thread = asyncio.run(run())
+    assert len(backend.threads) == 5
+    assert loop_thread not in backend.threads
+
+
+def test_async_stale_entries_revalidate_as_a_task(wall_clock):
+    cache = ResponseCache(MemoryBackend(), ttl=10, stale_ttl=20)
+    cache.put("k", "old")
+    wall_clock.now += 15
+
+    async def fetch():
+        return "new"
+
+    async def run():
+        assert (await cache.aget_or_fetch("k", fetch))[:3:2] == ("old", "STALE")
+        await asyncio.gather(*cache._tasks)
+        return await cache.aget("k")
+
+    assert asyncio.run(run()) == "new"
+
+
+def test_counters_are_exact_under_concurrent_lookups():
+    # Switch threads as often as possible so unlocked += would lose counts
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        cache = ResponseCache(MemoryBackend(), ttl=60, stale_ttl=0)
+        cache.put("hit", 1)
+        barrier = threading.Barrier(8)
+
+        def worker(n):
+            barrier.wait()
+            for i in range(2000):
+                cache.get_or_fetch("hit", lambda: 1)
+                cache.get(f"miss-{n}-{i}")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (16000, 16000)
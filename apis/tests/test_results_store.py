@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+
+import pytest
+
+import results_store
+from results_store import ResultsWriter, atomic_write_json
+
+
+def query(dest="CDG", date="2030-03-10"):
+    return {"originLocationCode": "BOS", "destinationLocationCode": dest, "departureDate": date}
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_atomic_write_leaves_no_temp_file_on_failure(tmp_path):
+    path = tmp_path / "out" / "a.json"
+    atomic_write_json(path, {"a": 1})
+    assert read(path) == {"a": 1}
+
+    with pytest.raises(TypeError):
+        atomic_write_json(path, {"a": 1}, indent=object())
+    assert read(path) == {"a": 1}
+    assert os.listdir(tmp_path / "out") == ["a.json"]
+
+
+def test_filename_is_stable_per_query():
+    a = ResultsWriter.filename_for({"departureDate": "2030-03-10", "originLocationCode": "BOS", "destinationLocationCode": "CDG"})
+    assert a == ResultsWriter.filename_for(query())
+    assert a.startswith("BOS-CDG-2030-03-10-")
+    assert a != ResultsWriter.filename_for(query(date="2030-03-11"))
+    assert ResultsWriter.filename_for({"x": "../../etc"}).count("/") == 0
+
+
+def test_one_file_per_query_plus_latest(tmp_path):
+    latest = tmp_path / "latest.json"
+    writer = ResultsWriter(str(tmp_path / "results"), latest_path=str(latest))
+    writer.submit({"query": query("CDG"), "n": 1})
+    writer.submit({"query": query("LHR"), "n": 2})
+    writer.submit({"query": query("CDG"), "n": 3})
+    assert writer.flush()
+
+    files = sorted(os.listdir(tmp_path / "results"))
+    assert len(files) == 2
+    by_dest = {read(tmp_path / "results" / f)["query"]["destinationLocationCode"]: read(tmp_path / "results" / f) for f in files}
+    assert by_dest["CDG"]["n"] == 3
+    assert read(latest)["n"] == 3
+
+
+def test_backed_up_writer_drops_new_queries(tmp_path, monkeypatch):
+    gate = threading.Event()
+    real_write = results_store.atomic_write_json
+
+    def slow_write(*args, **kwargs):
+        gate.wait(5)
+        return real_write(*args, **kwargs)
+
+    monkeypatch.setattr(results_store, "atomic_write_json", slow_write)
+    writer = ResultsWriter(str(tmp_path), max_pending=2)
+    assert writer.submit({"query": query("AAA")})
+    # Wait until the writer has taken the first batch
+    while writer.stats()["pending"]:
+        threading.Event().wait(0.001)
+    assert writer.submit({"query": query("BBB")})
+    assert writer.submit({"query": query("CCC")})
+    assert writer.submit({"query": query("BBB"), "newer": True})
+    assert not writer.submit({"query": query("DDD")})
+    gate.set()
+    assert writer.flush()
+    assert writer.stats() == {"pending": 0, "written": 3, "dropped": 1, "failures": 0}
+
+
+def test_sweep_applies_count_and_age_limits(tmp_path):
+    for i in range(5):
+        path = tmp_path / f"f{i}.json"
+        path.write_text("{}")
+        os.utime(path, (1_000_000 + i, 1_000_000 + i))
+    (tmp_path / "recent.json").write_text("{}")
+    (tmp_path / "notes.txt").write_text("keep")
+
+    ResultsWriter(str(tmp_path), max_files=3, max_age_s=None).sweep()
+    assert sorted(os.listdir(tmp_path)) == ["f3.json", "f4.json", "notes.txt", "recent.json"]
+
+    ResultsWriter(str(tmp_path), max_files=100, max_age_s=3600).sweep()
+    assert sorted(os.listdir(tmp_path)) == ["notes.txt", "recent.json"]
+
+
+def test_write_failures_are_counted_not_raised(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    writer = ResultsWriter(str(blocker / "sub"))
+    writer.submit({"query": query()})
+    assert writer.flush()
+    assert writer.stats()["failures"] == 1
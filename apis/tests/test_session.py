@@ -0,0 +1,37 @@
+from amadeus_api import AmadeusAPI, build_session
+from amadeus_fakes import FakeResponse, FakeSession
+
+
+def test_build_session_mounts_a_pooled_retrying_adapter():
+    session = build_session(pool_connections=3, pool_maxsize=17, pool_block=True, max_retries=4)
+    adapter = session.get_adapter("https://test.api.amadeus.com/v1/x")
+    assert adapter._pool_connections == 3
+    assert adapter._pool_maxsize == 17
+    assert adapter._pool_block is True
+    retry = adapter.max_retries
+    assert retry.total == 4 and retry.read == 0
+    assert set(retry.status_forcelist) == {502, 503, 504}
+    assert "POST" not in retry.allowed_methods
+
+
+def test_token_and_api_calls_share_one_session():
+    session = FakeSession()
+    api = AmadeusAPI("id", "secret", session=session, rate_limits=False)
+    api._request("GET", "/v1/reference-data/locations", params={"keyword": "BOS"})
+    api._request("GET", "/v1/reference-data/locations", params={"keyword": "PVD"})
+
+    assert api.session is session
+    assert session.tokens_issued == 1
+    assert [c["auth"] for c in session.calls] == ["Bearer t1", "Bearer t1"]
+
+
+def test_401_refreshes_the_token_and_retries_once():
+    def handler(method, path, params, body):
+        return FakeResponse(401 if session.tokens_issued == 1 else 200, {"data": []})
+
+    session = FakeSession(handler)
+    api = AmadeusAPI("id", "secret", session=session, rate_limits=False)
+    resp = api._request("GET", "/v1/reference-data/locations", params={"keyword": "BOS"})
+
+    assert resp.status_code == 200
+    assert [c["auth"] for c in session.calls] == ["Bearer t1", "Bearer t2"]
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from amadeus_api import AmadeusAPI
+from amadeus_fakes import FakeResponse, FakeSession
+from singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    sf = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(sf.do, "k", slow) for _ in range(8)]
+        while sf.shared < 7:
+            threading.Event().wait(0.001)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert {value for value, _ in results} == {"value"}
+    assert sf.stats() == {"in_flight": 0, "calls": 1, "shared": 7}
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    sf = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(sf.do, "k", failing) for _ in range(3)]
+        while sf.shared < 2:
+            threading.Event().wait(0.001)
+        release.set()
+        for f in futures:
+            with pytest.raises(ValueError):
+                f.result()
+
+    # The next call runs again
+    assert sf.do("k", lambda: 1) == (1, False)
+
+
+def test_different_keys_do_not_wait_on_each_other():
+    sf = SingleFlight()
+    assert sf.do("a", lambda: sf.do("b", lambda: 2)[0]) == (2, False)
+    assert sf.stats()["calls"] == 2
+
+
+def test_async_callers_share_one_call():
+    async def main():
+        sf = AsyncSingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(sf.do("k", slow) for _ in range(5)))
+        return sf, calls, results
+
+    sf, calls, results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [shared for _, shared in results].count(True) == 4
+    assert sf.stats()["in_flight"] == 0
+
+
+def test_async_waiters_restart_after_the_leader_is_cancelled():
+    async def main():
+        sf = AsyncSingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        leader = asyncio.create_task(sf.do("k", slow))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(sf.do("k", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await waiter, calls
+
+    (value, shared), calls = asyncio.run(main())
+    assert len(calls) == 2
+    assert (value, shared) == (2, False)
+
+
+def test_client_coalesces_identical_gets_only():
+    release = threading.Event()
+
+    def handler(method, path, params, body):
+        release.wait(5)
+        return FakeResponse(200, {"data": []})
+
+    session = FakeSession(handler)
+    api = AmadeusAPI("id", "secret", session=session, rate_limits=False)
+    api._tokens.get()
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        same = [pool.submit(api._request, "GET", "/v1/x", params={"a": 1}) for _ in range(4)]
+        other = pool.submit(api._request, "GET", "/v1/x", params={"a": 2})
+        post = pool.submit(api._request, "POST", "/v1/x", json_body={"a": 1})
+        while api._inflight.stats()["shared"] < 3:
+            threading.Event().wait(0.001)
+        release.set()
+        assert len({id(f.result()) for f in same}) == 1
+        other.result(), post.result()
+
+    assert len(session.calls) == 3
@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+from amadeus_api import AmadeusAPI
+from llm_stream import ItineraryDayScanner, sse_line_deltas
+from standin_server import StandInConfig, create_standin_app, groq_answer, start_in_thread
+
+
+@pytest.fixture
+def standin():
+    config = StandInConfig(latency_ms=0, jitter_ms=0, groq_latency_ms=0, groq_tokens_per_s=1e9)
+    app = create_standin_app(config)
+    return app.test_client(), config
+
+
+def bearer(client):
+    resp = client.post(
+        "/v1/security/oauth2/token",
+        data={"grant_type": "client_credentials"},
+        headers={"Authorization": "Basic aWQ6c2VjcmV0"},
+    )
+    assert resp.status_code == 200
+    return {"Authorization": f"Bearer {resp.get_json()['access_token']}"}
+
+
+def test_data_endpoints_need_a_valid_token(standin):
+    client, _ = standin
+    resp = client.get("/v1/reference-data/locations/hotels/by-city?cityCode=PAR")
+    assert resp.status_code == 401
+    assert resp.get_json()["errors"][0]["code"] == 38190
+
+
+def test_tokens_expire(standin):
+    client, config = standin
+    config.update(token_ttl_s=0)
+    resp = client.get("/v1/reference-data/locations/hotels/by-city?cityCode=PAR", headers=bearer(client))
+    assert resp.status_code == 401
+
+
+def test_payload_sizes_are_configurable(standin):
+    client, config = standin
+    config.update(hotels_per_city=30, offers_per_hotel=3)
+    auth = bearer(client)
+    hotels = client.get("/v1/reference-data/locations/hotels/by-city?cityCode=PAR", headers=auth).get_json()["data"]
+    assert len(hotels) == 30
+    assert len({h["hotelId"] for h in hotels}) == 30
+
+    ids = ",".join(h["hotelId"] for h in hotels[:5])
+    offers = client.get(f"/v3/shopping/hotel-offers?hotelIds={ids}&checkInDate=2030-03-10", headers=auth).get_json()["data"]
+    assert [o["hotel"]["hotelId"] for o in offers] == ids.split(",")
+    assert all(len(o["offers"]) == 3 for o in offers)
+
+
+def test_flight_offers_follow_the_search(standin):
+    client, config = standin
+    config.update(flight_offers=7)
+    resp = client.get(
+        "/v2/shopping/flight-offers?originLocationCode=BOS&destinationLocationCode=LIS&departureDate=2030-05-02",
+        headers=bearer(client),
+    )
+    offers = resp.get_json()["data"]
+    assert len(offers) == 7
+    for o in offers:
+        assert len(o["itineraries"]) == 1
+        segs = o["itineraries"][0]["segments"]
+        assert segs[0]["departure"]["iataCode"] == "BOS"
+        assert segs[-1]["arrival"]["iataCode"] == "LIS"
+        assert segs[0]["departure"]["at"].startswith("2030-05-02")
+
+
+def test_error_injection_and_config_endpoint(standin):
+    client, _ = standin
+    assert client.post("/_standin/config", json={"error_141_rate": 1.0}).status_code == 200
+    assert client.post("/_standin/config", json={"nope": 1}).status_code == 400
+
+    resp = client.get("/v2/shopping/flight-offers?originLocationCode=BOS&destinationLocationCode=LIS", headers=bearer(client))
+    assert resp.status_code == 500
+    assert client.get("/_standin/stats").get_json()["errors"] == {"flight-offers:141": 1}
+
+
+def test_groq_answers_match_the_prompt(standin):
+    _, config = standin
+    state = create_standin_app(config).config["STANDIN_STATE"]
+    plan = json.loads(groq_answer("destination: Lisbon\ndates: 2030-05-02 to 2030-05-05", state))
+    assert [d["day"] for d in plan["itinerary"]] == [1, 2, 3, 4]
+
+    batch = json.loads(groq_answer("Return day object(s): 2, 3", state))
+    assert [d["day"] for d in batch["itinerary"]] == [2, 3]
+
+
+def test_streamed_completion_is_valid_sse(standin):
+    client, _ = standin
+    resp = client.post(
+        "/openai/v1/chat/completions",
+        json={"stream": True, "messages": [{"role": "user", "content": "destination: Rome\ndates: 2030-01-01 to 2030-01-02"}]},
+        headers={"Authorization": "Bearer standin"},
+    )
+    scanner, usage, days = ItineraryDayScanner(), {}, []
+    for line in resp.get_data(as_text=True).splitlines():
+        deltas = sse_line_deltas(line, usage)
+        if deltas is None:
+            break
+        for delta in deltas:
+            days.extend(scanner.feed(delta))
+    assert [d["day"] for d in days] == [1, 2]
+    assert usage["completion_tokens"] > 0
+
+
+def test_client_runs_against_the_threaded_server():
+    server, base_url = start_in_thread(StandInConfig(latency_ms=0, jitter_ms=0))
+    try:
+        api = AmadeusAPI("id", "secret", hostname=base_url, rate_limits=False)
+        result = api.search_hotels_clean("PAR", "2030-03-10", "2030-03-12", max_results=3)
+        assert len(result["hotels"]) == 3
+        assert api._tokens.refresh_count == 1
+    finally:
+        server.shutdown()
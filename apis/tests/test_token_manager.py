@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from token_manager import AsyncTokenManager, TokenManager
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Fetcher:
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("auth endpoint down")
+        return f"token-{self.calls}", self.ttl
+
+
+def wait_for_background(tm):
+    deadline = time.monotonic() + 2
+    while tm._bg_running and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_first_token_is_fetched_lazily():
+    fetch = Fetcher()
+    tm = TokenManager(fetch, clock=Clock())
+    assert fetch.calls == 0
+    assert tm.get() == "token-1"
+    assert tm.get() == "token-1"
+    assert fetch.calls == 1
+
+
+def test_refresh_ahead_keeps_serving_the_current_token():
+    clock, fetch = Clock(), Fetcher(ttl=600)
+    tm = TokenManager(fetch, refresh_margin=120, clock=clock)
+    tm.get()
+
+    clock.now += 500          # inside the refresh window, still valid
+    assert tm.get() == "token-1"
+    wait_for_background(tm)
+    assert fetch.calls == 2
+    assert tm.get() == "token-2"
+
+
+def test_short_lived_tokens_refresh_halfway():
+    clock, fetch = Clock(), Fetcher(ttl=60)
+    tm = TokenManager(fetch, refresh_margin=120, clock=clock)
+    tm.get()
+    clock.now += 29
+    tm.get()
+    assert fetch.calls == 1
+    clock.now += 2
+    tm.get()
+    wait_for_background(tm)
+    assert fetch.calls == 2
+
+
+def test_failed_background_refresh_backs_off():
+    clock, fetch = Clock(), Fetcher(ttl=600)
+    tm = TokenManager(fetch, refresh_margin=120, retry_after=15, clock=clock)
+    tm.get()
+    fetch.fail = True
+
+    clock.now += 500
+    for _ in range(20):
+        assert tm.get() == "token-1"
+        wait_for_background(tm)
+    assert fetch.calls == 2
+    assert tm.refresh_failures == 1
+
+    clock.now += 15
+    tm.get()
+    wait_for_background(tm)
+    assert fetch.calls == 3
+
+
+def test_expired_token_refreshes_in_the_foreground_and_raises():
+    clock, fetch = Clock(), Fetcher(ttl=600)
+    tm = TokenManager(fetch, clock=clock)
+    tm.get()
+    fetch.fail = True
+    clock.now += 601
+    with pytest.raises(RuntimeError):
+        tm.get()
+    fetch.fail = False
+    assert tm.get() == "token-3"
+
+
+def test_concurrent_401s_share_one_refresh():
+    fetch = Fetcher()
+    tm = TokenManager(fetch)
+    stale = tm.get()
+
+    barrier = threading.Barrier(8)
+    results = []
+
+    def on_401():
+        barrier.wait()
+        results.append(tm.invalidate(stale))
+
+    threads = [threading.Thread(target=on_401) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert fetch.calls == 2
+    assert set(results) == {"token-2"}
+
+
+def test_async_failed_background_refresh_backs_off():
+    clock = Clock()
+    state = {"calls": 0, "fail": False}
+
+    async def fetch():
+        state["calls"] += 1
+        if state["fail"]:
+            raise RuntimeError("auth endpoint down")
+        return f"token-{state['calls']}", 600
+
+    tm = AsyncTokenManager(fetch, refresh_margin=120, retry_after=15, clock=clock)
+
+    async def run():
+        await tm.get()
+        state["fail"] = True
+        clock.now += 500
+        for _ in range(20):
+            assert await tm.get() == "token-1"
+            await asyncio.sleep(0)
+        assert state["calls"] == 2
+
+        clock.now += 15
+        state["fail"] = False
+        await tm.get()
+        await asyncio.sleep(0)
+        assert await tm.get() == "token-3"
+
+    asyncio.run(run())
@@ -0,0 +1,100 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+import metrics
+
+# Per-request stage timings; set by the app at the start of a request
+_current = contextvars.ContextVar("stage_timings", default=None)
+# time.monotonic() by which the current unit of work should be finished
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class StageTimings:
+    """
+    Wall-clock time per pipeline stage for one request (resolve, hotels, flights,
+    transfers, llm, post, ...). Stages that run several times are summed; stages
+    running concurrently overlap, so they do not add up to the total.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def as_dict(self) -> dict:
+        """{stage: milliseconds}, plus "total" since the request started."""
+        with self._lock:
+            out = {k: round(v * 1000, 2) for k, v in self.durations.items()}
+        out["total"] = round((time.perf_counter() - self.started) * 1000, 2)
+        return out
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: `resolve;dur=12.3, llm;dur=840.0, total;dur=901.2`."""
+        return ", ".join(f"{k};dur={v}" for k, v in self.as_dict().items())
+
+
+def begin() -> StageTimings:
+    timings = StageTimings()
+    _current.set(timings)
+    return timings
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def stage(name):
+    """Times the block into the current request's StageTimings and the stage histogram."""
+    timings = _current.get()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        metrics.STAGE_SECONDS.observe(elapsed, stage=name)
+        if timings is not None:
+            timings.add(name, elapsed)
+
+
+@contextmanager
+def deadline(seconds):
+    """Work in the block (and pool tasks it submit()s) should be done within `seconds`; see time_left()."""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left(timeout):
+    """
+    `timeout` capped to what is left of the current deadline (unchanged without one).
+    Raises TimeoutError once the deadline has passed, so abandoned work stops
+    at its next upstream call instead of holding its thread.
+    """
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return timeout
+    left = expires_at - time.monotonic()
+    if left <= 0:
+        raise TimeoutError("deadline exceeded")
+    return left if timeout is None else min(timeout, left)
+
+
+def timed(name, fn):
+    def run(*args, **kwargs):
+        with stage(name):
+            return fn(*args, **kwargs)
+    return run
+
+
+def submit(pool, fn, *args, **kwargs):
+    """pool.submit() that carries the caller's context (and so its StageTimings) into the worker thread."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
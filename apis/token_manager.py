@@ -0,0 +1,202 @@
+import time
+import asyncio
+import threading
+
+from log import get_logger
+
+log = get_logger(__name__)
+
+
+class TokenManager:
+    """
+    Keeps an OAuth access token fresh.
+    - the first token is fetched lazily, on first use (no network at construction)
+    - once a token is within `refresh_margin` seconds of expiry, one background
+      thread refreshes it while callers keep using the still-valid token
+    - refreshes are single-flight: concurrent callers (e.g. many threads that all
+      got a 401 with the same token) wait for one refresh instead of each doing one
+    - a failed refresh-ahead is retried after `retry_after` seconds (or halfway to
+      expiry, if sooner), not on every call while the auth endpoint is down
+
+    `fetch` must return (access_token, expires_in_seconds).
+    """
+
+    def __init__(self, fetch, refresh_margin=120, default_ttl=1799, retry_after=15, clock=time.monotonic):
+        self._fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl
+        self.retry_after = retry_after
+        self._clock = clock
+
+        self._token = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._lock = threading.Lock()          # held while a refresh is in flight
+        self._bg_lock = threading.Lock()
+        self._bg_running = False
+
+        self.refresh_count = 0
+        self.refresh_failures = 0
+
+    @property
+    def token(self):
+        """Current token without triggering a fetch (may be None or stale)."""
+        return self._token
+
+    @property
+    def expires_in(self) -> float:
+        return max(0.0, self._expires_at - self._clock())
+
+    def get(self) -> str:
+        token, expires_at = self._token, self._expires_at
+        now = self._clock()
+
+        if token and now < self._refresh_at:
+            return token
+
+        if token and now < expires_at:
+            # Still valid: refresh ahead of expiry without making this caller wait
+            self._refresh_in_background()
+            return token
+
+        return self._refresh_if_current(token)
+
+    def invalidate(self, stale_token) -> str:
+        """Called after a 401: refresh once unless another thread already replaced `stale_token`."""
+        return self._refresh_if_current(stale_token, force=True)
+
+    def refresh(self) -> str:
+        with self._lock:
+            self._do_refresh()
+            return self._token
+
+    # -----------------------------
+    # Internals
+    # -----------------------------
+    def _refresh_if_current(self, seen_token, force=False) -> str:
+        with self._lock:
+            fresh = self._token and self._clock() < self._expires_at
+            if fresh and (self._token != seen_token or not force):
+                # Someone refreshed while we were waiting for the lock
+                return self._token
+            self._do_refresh()
+            return self._token
+
+    def _do_refresh(self):
+        try:
+            token, expires_in = self._fetch()
+        except Exception:
+            self._refresh_failed()
+            raise
+        self._set_token(token, expires_in)
+
+    def _refresh_failed(self):
+        self.refresh_failures += 1
+        # Back off the next refresh-ahead; an expired token still refreshes on demand
+        now = self._clock()
+        self._refresh_at = now + min(self.retry_after, max(0.0, self._expires_at - now) / 2)
+
+    def _set_token(self, token, expires_in):
+        try:
+            ttl = float(expires_in)
+        except (TypeError, ValueError):
+            ttl = self.default_ttl
+
+        ttl = max(0.0, ttl)
+        now = self._clock()
+        self._token = token
+        self._expires_at = now + ttl
+        # Short-lived tokens refresh halfway through instead of continuously
+        self._refresh_at = now + ttl - min(self.refresh_margin, ttl / 2)
+        self.refresh_count += 1
+
+    def _refresh_in_background(self):
+        with self._bg_lock:
+            if self._bg_running:
+                return
+            self._bg_running = True
+
+        def run():
+            try:
+                with self._lock:
+                    if self._clock() < self._refresh_at:
+                        return
+                    self._do_refresh()
+            except Exception as e:
+                log.warning("⚠️ Background token refresh failed: %s", e)
+            finally:
+                with self._bg_lock:
+                    self._bg_running = False
+
+        threading.Thread(target=run, name="token-refresh", daemon=True).start()
+
+
+class AsyncTokenManager(TokenManager):
+    """
+    TokenManager for asyncio code: `fetch` is a coroutine function returning
+    (access_token, expires_in_seconds); get/invalidate/refresh are awaited.
+    Same single-flight and refresh-ahead behavior, with an asyncio.Lock and a
+    background task instead of a thread.
+    """
+
+    def __init__(self, fetch, refresh_margin=120, default_ttl=1799, retry_after=15, clock=time.monotonic):
+        super().__init__(fetch, refresh_margin=refresh_margin, default_ttl=default_ttl, retry_after=retry_after, clock=clock)
+        self._alock = None           # created lazily, inside the running loop
+        self._bg_task = None
+
+    def _lock_for_loop(self):
+        if self._alock is None:
+            self._alock = asyncio.Lock()
+        return self._alock
+
+    async def get(self) -> str:
+        token, expires_at = self._token, self._expires_at
+        now = self._clock()
+
+        if token and now < self._refresh_at:
+            return token
+
+        if token and now < expires_at:
+            self._refresh_in_background()
+            return token
+
+        return await self._refresh_if_current(token)
+
+    async def invalidate(self, stale_token) -> str:
+        return await self._refresh_if_current(stale_token, force=True)
+
+    async def refresh(self) -> str:
+        async with self._lock_for_loop():
+            await self._do_refresh()
+            return self._token
+
+    async def _refresh_if_current(self, seen_token, force=False) -> str:
+        async with self._lock_for_loop():
+            fresh = self._token and self._clock() < self._expires_at
+            if fresh and (self._token != seen_token or not force):
+                return self._token
+            await self._do_refresh()
+            return self._token
+
+    async def _do_refresh(self):
+        try:
+            token, expires_in = await self._fetch()
+        except Exception:
+            self._refresh_failed()
+            raise
+        self._set_token(token, expires_in)
+
+    def _refresh_in_background(self):
+        if self._bg_task is not None and not self._bg_task.done():
+            return
+
+        async def run():
+            try:
+                async with self._lock_for_loop():
+                    if self._clock() < self._refresh_at:
+                        return
+                    await self._do_refresh()
+            except Exception as e:
+                log.warning("⚠️ Background token refresh failed: %s", e)
+
+        self._bg_task = asyncio.get_running_loop().create_task(run())
@@ -96,33 +96,40 @@ async function handleSendMessage() {
       }
     };
 
-    const res = await fetch("/api/generate-itinerary", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(payload),
+    // ✅ Stream the itinerary: header as soon as travel data is in, then one day at a time
+    let streamedDays = 0;
+    let streamError = null;
+    let missingDays = [];
+
+    await streamItinerary(payload, (event) => {
+      if (event.type === "travel_data") {
+        console.log("DEBUG summary vars:", { flightsData, hotelsData, transfersData });
+        printTravelHeaderToChat(flightsData, hotelsData, transfersData);
+      } else if (event.type === "day") {
+        printDayToChat(event.day, streamedDays);
+        streamedDays++;
+      } else if (event.type === "error") {
+        streamError = event.error;
+      } else if (event.type === "done") {
+        console.log("itinerary response:", event);
+        missingDays = event.missing_days || [];
+      }
     });
 
-    const itineraryResp = await res.json();
-    console.log("itinerary response:", itineraryResp);
-
-    if (!res.ok || itineraryResp.error) {
-      displayMessage("🗓️ ❌ " + (itineraryResp.error || "Itinerary generation failed"), "bot");
+    if (streamedDays === 0) {
+      displayMessage("🗓️ ❌ " + (streamError || "Itinerary generation failed"), "bot");
       return;
     }
 
-    // ✅ FIX: this used to be data.itinerary (data undefined)
-    const llm = itineraryResp.llm;
-    console.log("DEBUG summary vars:", { flightsData, hotelsData, transfersData });
-
-    printTravelHeaderToChat(flightsData, hotelsData, transfersData);
-
-// itinerary is returned at top-level
-printItineraryToChat(itineraryResp.itinerary);
-
-// if your backend does NOT return summary/cost stuff, don't call this yet
-// printTripSummaryToChat(itineraryResp);
-
+    // ⚠️ Some days could not be generated: say so instead of "Done"
+    if (streamError || missingDays.length) {
+      const which = missingDays.length ? ` (missing day${missingDays.length > 1 ? "s" : ""} ${missingDays.join(", ")})` : "";
+      displayMessage(`⚠️ Your itinerary is incomplete${which}: ${streamError || "some days could not be generated"}`, "bot");
+      return;
+    }
 
+    // ✅ Tell the user it’s finished
+    displayMessage("✅ Done! Your itinerary is ready.", "bot");
 
   } catch (error) {
     console.error("Error:", error);
@@ -430,6 +437,62 @@ function renderItinerary(days) {
   });
 }
 
+// Reads the NDJSON stream from /api/generate-itinerary/stream, one event per line
+async function streamItinerary(payload, onEvent) {
+  const res = await fetch("/api/generate-itinerary/stream", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload),
+  });
+
+  if (!res.ok || !res.body) {
+    let err = {};
+    try { err = await res.json(); } catch (_) {}
+    throw new Error(err.error || `HTTP ${res.status}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let nl;
+    while ((nl = buffer.indexOf("\n")) >= 0) {
+      const line = buffer.slice(0, nl).trim();
+      buffer = buffer.slice(nl + 1);
+      if (line) onEvent(JSON.parse(line));
+    }
+  }
+  if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
+
+function formatDayForChat(dayObj, idx) {
+  const dayNumber = dayObj.day ?? (idx + 1);
+
+  let title = (dayObj.title ?? "").trim();
+  title = title.replace(/^day\s*\d+\s*[-—:]?\s*/i, "");
+
+  let text = `\n🗓️ Day ${dayNumber}${title ? " — " + title : ""}\n`;
+
+  const schedule = Array.isArray(dayObj.schedule) ? dayObj.schedule : [];
+
+  schedule.forEach(item => {
+    const time = item.time || "";
+    const activity = item.activity || "";
+    text += `• ${time}: ${activity}\n`;
+  });
+
+  return text;
+}
+
+function printDayToChat(dayObj, idx) {
+  displayMessage(formatDayForChat(dayObj, idx).trim().replace(/\n/g, "<br>"), "bot");
+}
+
 function printItineraryToChat(days) {
   if (!Array.isArray(days) || days.length === 0) {
     displayMessage("❌ No itinerary was generated.", "bot");
@@ -439,22 +502,7 @@ function printItineraryToChat(days) {
   let text = "";
 
   days.forEach((dayObj, idx) => {
-    const dayNumber = dayObj.day ?? (idx + 1);
-
-    let title = (dayObj.title ?? "").trim();
-    title = title.replace(/^day\s*\d+\s*[-—:]?\s*/i, "");
-
-    text += `\n🗓️ Day ${dayNumber}${title ? " — " + title : ""}\n`;
-
-    const schedule = Array.isArray(dayObj.schedule) ? dayObj.schedule : [];
-
-    schedule.forEach(item => {
-      const time = item.time || "";
-      const activity = item.activity || "";
-      text += `• ${time}: ${activity}\n`;
-    });
-
-    text += "\n";
+    text += formatDayForChat(dayObj, idx) + "\n";
   });
 
   displayMessage(text.replace(/\n/g, "<br>"), "bot");